@@ -1,37 +1,66 @@
 from flask import Flask
-from pymongo import MongoClient
+from app.services.repository import Repository
+from app.services.indexes import ensure_indexes, check_query_plans
 from app.services.ai_assistant import OllamaAssistant
+from app.services.event_cache import EventCache
+from app.services.freebusy import FreeBusyService
+from app.services.search import SearchService
+from app.services.ai_jobs import AIJobQueue
+from app.services.daily_fact import DailyFactService
+from app.services.interaction_log import InteractionLog
 from app.config.config import Config
 
-# Initialize these as None, they'll be set in create_app
-users_collection = None
-events_collection = None
-llm_info_collection = None
-daily_facts_collection = None
-
 def create_app():
     app = Flask(__name__)
     app.config.from_object(Config)
 
-    # MongoDB connection
-    client = MongoClient(app.config['MONGO_URI'])
-    db = client['calendar']
-    
-    # Set the global collections
-    global users_collection, events_collection, llm_info_collection, daily_facts_collection
-    users_collection = db['users']
-    events_collection = db['events']
-    llm_info_collection = db['llm_info']
-    daily_facts_collection = db['daily_facts']
+    # The one MongoDB client; every route and service goes through app.repo
+    repo = Repository()
+    repo.init_app(app)
+    app.repo = repo
+
+    # Every collection's indexes (TTL indexes are ensured by their services)
+    ensure_indexes(repo.db)
+
+    # Month event cache, free/busy and search indexes, shared with the
+    # assistant so its writes keep them current
+    event_cache = EventCache()
+    event_cache.init_app(app)
+    app.event_cache = event_cache
+
+    freebusy = FreeBusyService()
+    freebusy.init_app(app)
+    app.freebusy = freebusy
+
+    search = SearchService()
+    search.init_app(app)
+    app.search = search
+
+    # Chat interaction log with its per-user rollups, retention and archival
+    interaction_log = InteractionLog()
+    interaction_log.init_app(app)
+    app.interaction_log = interaction_log
 
     # Initialize AI assistant
     ai_assistant = OllamaAssistant()
     ai_assistant.init_app(app)
-
-    # Inject DB and AI into app context
-    app.db = db
     app.ai_assistant = ai_assistant
 
+    # Worker pool that runs chat requests off the request thread
+    ai_jobs = AIJobQueue()
+    ai_jobs.init_app(app)
+    app.ai_jobs = ai_jobs
+
+    # Daily fact served from memory, generated once per day in the background
+    daily_facts = DailyFactService()
+    daily_facts.init_app(app)
+    app.daily_facts = daily_facts
+
+    # In development, refuse to start if any query would scan a whole
+    # collection; checked once every service has ensured its own indexes
+    if app.config['MONGO_CHECK_QUERY_PLANS']:
+        check_query_plans(repo.db)
+
     # Register blueprints
     from app.routes.auth import auth_bp
     from app.routes.main import main_bp
@@ -10,7 +10,53 @@ class Config:
     MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017/calendar")
     OLLAMA_API_URL = os.getenv("OLLAMA_API_URL", "http://localhost:11434/api/generate")
     OLLAMA_MODEL_NAME = os.getenv("OLLAMA_MODEL_NAME", "llama3.2")
+    OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
     AI_ASSISTANT_SECRET = os.getenv("AI_ASSISTANT_SECRET", "changeme_secret")
     GROQ_API_KEY = os.getenv("GROQ_API_KEY")
     GROQ_URL = os.getenv("GROQ_URL")
-    GROQ_MODEL = os.getenv("GROQ_MODEL")
\ No newline at end of file
+    GROQ_MODEL = os.getenv("GROQ_MODEL")
+    EVENT_CACHE_SIZE = int(os.getenv("EVENT_CACHE_SIZE", "1024"))
+    DEFAULT_EVENT_DURATION_MINUTES = int(os.getenv("DEFAULT_EVENT_DURATION_MINUTES", "60"))
+    FREEBUSY_MAX_USERS = int(os.getenv("FREEBUSY_MAX_USERS", "1024"))
+    SEARCH_MAX_USERS = int(os.getenv("SEARCH_MAX_USERS", "256"))
+    LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "3.05"))
+    OLLAMA_READ_TIMEOUT = float(os.getenv("OLLAMA_READ_TIMEOUT", "120"))
+    GROQ_READ_TIMEOUT = float(os.getenv("GROQ_READ_TIMEOUT", "10"))
+    LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+    LLM_BREAKER_THRESHOLD = int(os.getenv("LLM_BREAKER_THRESHOLD", "3"))
+    LLM_BREAKER_COOLDOWN = float(os.getenv("LLM_BREAKER_COOLDOWN", "30"))
+    LLM_HEDGING = os.getenv("LLM_HEDGING", "false").lower() == "true"
+    LLM_HEDGE_WORKERS = int(os.getenv("LLM_HEDGE_WORKERS", "16"))
+    LLM_HEDGE_DELAY = float(os.getenv("LLM_HEDGE_DELAY", "2.0"))
+    LLM_HEDGE_MIN_DELAY = float(os.getenv("LLM_HEDGE_MIN_DELAY", "0.25"))
+    LLM_HEDGE_MAX_DELAY = float(os.getenv("LLM_HEDGE_MAX_DELAY", "8.0"))
+    RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "1024"))
+    RESPONSE_CACHE_TTL = int(os.getenv("RESPONSE_CACHE_TTL", "300"))
+    INTENT_FAST_PATH = os.getenv("INTENT_FAST_PATH", "true").lower() == "true"
+    CONVERSATION_MAX_USERS = int(os.getenv("CONVERSATION_MAX_USERS", "1024"))
+    CONVERSATION_TURNS = int(os.getenv("CONVERSATION_TURNS", "3"))
+    AI_JOB_WORKERS = int(os.getenv("AI_JOB_WORKERS", "4"))
+    AI_JOB_MAX_PENDING = int(os.getenv("AI_JOB_MAX_PENDING", "64"))
+    # How /chat_with_ai answers requests that don't choose: "jobs" (queue and
+    # poll), "stream" (Server-Sent Events) or "sync" (one blocking response)
+    AI_CHAT_MODE = os.getenv("AI_CHAT_MODE", "jobs").lower()
+    DAILY_FACT_LEAD_MINUTES = int(os.getenv("DAILY_FACT_LEAD_MINUTES", "10"))
+    DAILY_FACT_LEASE_SECONDS = int(os.getenv("DAILY_FACT_LEASE_SECONDS", "120"))
+    MONGO_DB_NAME = os.getenv("MONGO_DB_NAME", "calendar")
+    MONGO_APP_NAME = os.getenv("MONGO_APP_NAME", "calendar-ai")
+    MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "50"))
+    MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "0"))
+    MONGO_MAX_IDLE_TIME_MS = int(os.getenv("MONGO_MAX_IDLE_TIME_MS", "300000"))
+    MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", "10000"))
+    MONGO_CONNECT_TIMEOUT_MS = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "5000"))
+    MONGO_SOCKET_TIMEOUT_MS = int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", "0")) or None
+    MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000"))
+    MONGO_WRITE_CONCERN = os.getenv("MONGO_WRITE_CONCERN")
+    MONGO_JOURNAL = os.getenv("MONGO_JOURNAL", "false").lower() == "true"
+    MONGO_READ_PREFERENCE = os.getenv("MONGO_READ_PREFERENCE", "primary")
+    MONGO_CHECK_QUERY_PLANS = os.getenv("MONGO_CHECK_QUERY_PLANS", "false").lower() == "true"
+    LLM_INFO_RETENTION_DAYS = int(os.getenv("LLM_INFO_RETENTION_DAYS", "90"))
+    LLM_INFO_ROLLUP_MESSAGES = int(os.getenv("LLM_INFO_ROLLUP_MESSAGES", "20"))
+    LLM_INFO_ARCHIVE_DIR = os.getenv("LLM_INFO_ARCHIVE_DIR")
+    LLM_INFO_ARCHIVE_AFTER_DAYS = int(os.getenv("LLM_INFO_ARCHIVE_AFTER_DAYS", "1"))
+    LLM_INFO_ARCHIVE_INTERVAL_MINUTES = int(os.getenv("LLM_INFO_ARCHIVE_INTERVAL_MINUTES", "360"))
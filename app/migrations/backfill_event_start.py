@@ -0,0 +1,43 @@
+"""Backfill the 'start' datetime on events saved before it existed.
+
+Run once against an existing database:
+
+    python -m app.migrations.backfill_event_start
+"""
+from pymongo import UpdateOne
+from app.config.config import Config
+from app.services.repository import Repository
+from app.services.indexes import ensure_indexes
+from app.utils.dates import event_start
+
+BATCH_SIZE = 1000
+
+
+def backfill(db, batch_size=BATCH_SIZE):
+    """Set 'start' on every event that is missing it, in batches"""
+    ensure_indexes(db)
+    events = db['events']
+
+    updated = skipped = 0
+    ops = []
+    cursor = events.find({'start': {'$exists': False}}, {'date': 1, 'time': 1})
+    for doc in cursor:
+        try:
+            start = event_start(doc.get('date'), doc.get('time'))
+        except (ValueError, TypeError):
+            print(f"Skipping event {doc['_id']} with invalid date: {doc.get('date')}")
+            skipped += 1
+            continue
+        ops.append(UpdateOne({'_id': doc['_id']}, {'$set': {'start': start}}))
+        if len(ops) >= batch_size:
+            updated += events.bulk_write(ops, ordered=False).modified_count
+            ops = []
+    if ops:
+        updated += events.bulk_write(ops, ordered=False).modified_count
+
+    print(f"Backfilled start on {updated} events, skipped {skipped}")
+    return updated, skipped
+
+
+if __name__ == '__main__':
+    backfill(Repository().connect(vars(Config)).db)
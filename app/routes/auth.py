@@ -1,14 +1,13 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, session, current_app
 from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime
-from app import users_collection, events_collection, llm_info_collection
+from pymongo.errors import DuplicateKeyError
 
 auth_bp = Blueprint('auth', __name__)
 
 @auth_bp.route('/login', methods=['GET', 'POST'])
 def login():
-    db = current_app.db
-    users = users_collection
+    users = current_app.repo.users
 
     if request.method == 'POST':
         username = request.form['username']
@@ -25,8 +24,7 @@ def login():
 
 @auth_bp.route('/signup', methods=['GET', 'POST'])
 def signup():
-    db = current_app.db
-    users = users_collection
+    users = current_app.repo.users
 
     if request.method == 'POST':
         username = request.form['username']
@@ -36,11 +34,16 @@ def signup():
             return redirect(url_for('auth.signup'))
 
         hashed_password = generate_password_hash(password, method='pbkdf2:sha256')
-        user_id = users.insert_one({
-            'username': username,
-            'password': hashed_password,
-            'created_at': datetime.now()
-        }).inserted_id
+        try:
+            user_id = users.insert_one({
+                'username': username,
+                'password': hashed_password,
+                'created_at': datetime.now()
+            }).inserted_id
+        except DuplicateKeyError:
+            # Lost a race with another signup for the same name (usernames are unique)
+            flash('Username already exists.', 'danger')
+            return redirect(url_for('auth.signup'))
 
         session['user_id'] = str(user_id)
         session['username'] = username
@@ -50,8 +53,7 @@ def signup():
 
 @auth_bp.route('/change_password', methods=['GET', 'POST'])
 def change_password():
-    db = current_app.db
-    users = users_collection
+    users = current_app.repo.users
 
     if request.method == 'POST':
         # Use session username if logged in, else get from form
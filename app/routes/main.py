@@ -1,8 +1,19 @@
-from flask import Blueprint, render_template, request, redirect, url_for, jsonify, session, current_app
+from flask import Blueprint, render_template, request, redirect, url_for, jsonify, session, current_app, Response, stream_with_context
 import calendar
+import io
+import json
 from datetime import datetime
 from bson import ObjectId
+from pymongo import InsertOne, UpdateOne, DeleteOne, ReturnDocument
+from pymongo.errors import BulkWriteError
 import traceback
+from app.utils.dates import event_start, month_bounds, parse_datetime
+from app.services.recurrence import ALLOWED_RECURRENCES, find_occurrences
+from app.services.ai_assistant import MongoJSONEncoder
+from app.utils.pagination import encode_cursor, decode_cursor, after_cursor
+from app.services.ical import read_events, write_calendar, exported_event_id
+from app.services.ai_jobs import QueueFull, serialize_job
+from app.services.todo_actions import new_item, ensure_item_ids, toggle_item_pipeline, move_item_pipeline, todo_lists_changed
 
 main_bp = Blueprint('main', __name__)
 
@@ -14,8 +25,11 @@ def home():
     today = datetime.now()
     cal = calendar.monthcalendar(today.year, today.month)
     
-    # Get the daily fact
-    daily_fact = current_app.ai_assistant.get_daily_fact()
+    # Today's fact if it's ready; never waits for the LLM
+    daily_fact = current_app.daily_facts.get()
+
+    # Embedded in the page so the client doesn't fetch the month again
+    user_events = get_month_events(session['user_id'], today.year, today.month)
 
     return render_template('index.html',
                            month=today.strftime("%B"),
@@ -24,13 +38,11 @@ def home():
                            current_year=today.year,
                            calendar=cal,
                            highlight_day=today.day,
-                           daily_fact=daily_fact)
+                           daily_fact=daily_fact,
+                           events=user_events)
 
 @main_bp.route('/calendar/<int:year>/<int:month>')
 def calendar_view(year, month):
-    db = current_app.db
-    events = db['events']
-
     if 'user_id' not in session:
         return redirect(url_for('auth.login'))
 
@@ -46,24 +58,60 @@ def calendar_view(year, month):
     month_name = calendar.month_name[month]
     today = datetime.now()
 
-    user_events = list(events.find({
-        'user_id': session['user_id'],
-        'date': {'$regex': f'^{year}-{month:02d}'}
-    }))
+    user_events = get_month_events(session['user_id'], year, month)
 
     return render_template('index.html', calendar=cal, month=month_name, year=year,
                            current_month=month, current_year=year,
                            highlight_day=today.day if month == today.month and year == today.year else None,
                            events=user_events)
 
+def event_saved(user_id, event):
+    """Bring the in-memory event views up to date after one event is written"""
+    current_app.event_cache.invalidate(user_id)
+    current_app.freebusy.upsert_event(user_id, event)
+    current_app.search.index_event(user_id, event)
+
+def event_deleted(user_id, event_id):
+    current_app.event_cache.invalidate(user_id)
+    current_app.freebusy.remove_event(user_id, event_id)
+    current_app.search.remove_event(user_id, event_id)
+
+def events_bulk_changed(user_id):
+    """Drop a user's in-memory event views after batch writes or imports"""
+    current_app.event_cache.invalidate(user_id)
+    current_app.freebusy.invalidate(user_id)
+    current_app.search.invalidate(user_id)
+
+def prepare_event_data(data, user_id):
+    """Validate and normalise an event payload; returns (event, error)"""
+    # Validate and parse the date
+    try:
+        event_date = datetime.strptime(data.get('date'), '%Y-%m-%d')
+    except (ValueError, TypeError) as e:
+        print(f"Date parsing error: {str(e)}")  # Debug log
+        return None, 'Invalid date format. Expected YYYY-MM-DD.'
+
+    # Validate recurrence
+    if data.get('recurrence', 'none') not in ALLOWED_RECURRENCES:
+        return None, 'Invalid recurrence type'
+
+    event = dict(data)
+    event['date'] = event_date.strftime('%Y-%m-%d')  # reformat to standard
+    event['start'] = event_start(event['date'], event.get('time'))
+    # Add user and creation info
+    event.update({
+        'user_id': user_id,
+        'created_at': datetime.now()
+    })
+    return event, None
+
 @main_bp.route('/save_event', methods=['POST'])
 def save_event():
     try:
         if 'user_id' not in session:
             return jsonify({'error': 'Not logged in'}), 401
 
-        db = current_app.db
-        events = db['events']
+        events = current_app.repo.events
         data = request.get_json()
 
         if not data:
@@ -71,24 +119,9 @@ def save_event():
 
         print(f"Received event data: {data}")  # Debug log
 
-        # Validate and parse the date
-        try:
-            event_date = datetime.strptime(data.get('date'), '%Y-%m-%d')
-            data['date'] = event_date.strftime('%Y-%m-%d')  # reformat to standard
-        except (ValueError, TypeError) as e:
-            print(f"Date parsing error: {str(e)}")  # Debug log
-            return jsonify({'error': 'Invalid date format. Expected YYYY-MM-DD.'}), 400
-
-        # Validate recurrence
-        allowed_recurrences = ['none', 'monthly', 'quarterly', 'half yearly', 'yearly']
-        if data.get('recurrence', 'none') not in allowed_recurrences:
-            return jsonify({'error': 'Invalid recurrence type'}), 400
-
-        # Add user and creation info
-        data.update({
-            'user_id': session['user_id'],
-            'created_at': datetime.now()
-        })
+        data, error = prepare_event_data(data, session['user_id'])
+        if error:
+            return jsonify({'error': error}), 400
 
         print(f"Final event data to save: {data}")  # Debug log
 
@@ -121,12 +154,14 @@ def save_event():
                         return jsonify({'error': 'Unauthorized to modify this event'}), 403
                     else:
                         return jsonify({'error': 'No changes made to the event'}), 400
+                event_saved(session['user_id'], dict(update_data, _id=object_id))
                 return jsonify({'success': True})
             else:
                 # Create new event
                 print("Creating new event")  # Debug log
                 result = events.insert_one(data)
                 print(f"Insert result: inserted_id={result.inserted_id}")  # Debug log
+                event_saved(session['user_id'], data)
                 return jsonify({'success': True, 'event_id': str(result.inserted_id)})
         except Exception as e:
             print(f"Database error details: {str(e)}")  # Debug log
@@ -148,8 +183,7 @@ def delete_event():
         if not data or 'event_id' not in data:
             return jsonify({'error': 'No event ID provided'}), 400
 
-        db = current_app.db
-        events = db['events']
+        events = current_app.repo.events
         
         result = events.delete_one({
             '_id': ObjectId(data['event_id']),
@@ -157,6 +191,7 @@ def delete_event():
         })
         
         if result.deleted_count:
+            event_deleted(session['user_id'], data['event_id'])
             return jsonify({'success': True})
         else:
             return jsonify({'error': 'Event not found'}), 404
@@ -165,21 +200,365 @@ def delete_event():
         print(traceback.format_exc())
         return jsonify({'error': 'An error occurred while deleting the event'}), 500
 
+BATCH_MAX_OPERATIONS = 500
+
+def batch_event_data(op, user_id):
+    """prepare_event_data for a batch operation's 'event', which must be an object if given"""
+    event = op.get('event')
+    if event is None:
+        event = {}
+    if not isinstance(event, dict):
+        return None, 'Event data must be an object'
+    return prepare_event_data(event, user_id)
+
+@main_bp.route('/api/events/batch', methods=['POST'])
+def batch_events():
+    """Apply many create/update/delete operations in one unordered bulk_write"""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Not logged in'}), 401
+
+    data = request.get_json(silent=True)
+    operations = data.get('operations') if isinstance(data, dict) else None
+    if not isinstance(operations, list) or not operations:
+        return jsonify({'error': 'A non-empty operations list is required'}), 400
+    if len(operations) > BATCH_MAX_OPERATIONS:
+        return jsonify({'error': f'At most {BATCH_MAX_OPERATIONS} operations per batch'}), 400
+
+    user_id = session['user_id']
+    events = current_app.repo.events
+    results = [None] * len(operations)
+    writes = []
+    write_index = []  # bulk_write position -> operation position
+    pending = []
+
+    for i, op in enumerate(operations):
+        kind = op.get('op') if isinstance(op, dict) else None
+        if kind == 'create':
+            event, error = batch_event_data(op, user_id)
+            if error:
+                results[i] = {'index': i, 'status': 'error', 'error': error}
+                continue
+            # Assign the id up front so the result needs no read-back
+            event['_id'] = ObjectId()
+            writes.append(InsertOne(event))
+            write_index.append(i)
+            results[i] = {'index': i, 'status': 'created', 'event_id': str(event['_id'])}
+        elif kind in ('update', 'delete'):
+            try:
+                pending.append((i, kind, ObjectId(op.get('event_id')), op))
+            except Exception:
+                results[i] = {'index': i, 'status': 'error', 'error': 'Invalid event ID format'}
+        else:
+            results[i] = {'index': i, 'status': 'error', 'error': f'Unknown operation: {kind}'}
+
+    # One lookup resolves which referenced events exist and belong to the user
+    owned = set()
+    if pending:
+        owned = {doc['_id'] for doc in events.find(
+            {'_id': {'$in': [object_id for _, _, object_id, _ in pending]}, 'user_id': user_id},
+            {'_id': 1}
+        )}
+
+    for i, kind, object_id, op in pending:
+        if object_id not in owned:
+            results[i] = {'index': i, 'status': 'error', 'error': 'Event not found'}
+            continue
+        selector = {'_id': object_id, 'user_id': user_id}
+        if kind == 'delete':
+            writes.append(DeleteOne(selector))
+            results[i] = {'index': i, 'status': 'deleted', 'event_id': str(object_id)}
+        else:
+            event, error = batch_event_data(op, user_id)
+            if error:
+                results[i] = {'index': i, 'status': 'error', 'error': error}
+                continue
+            update_data = {k: v for k, v in event.items() if k != '_id'}
+            writes.append(UpdateOne(selector, {'$set': update_data}))
+            results[i] = {'index': i, 'status': 'updated', 'event_id': str(object_id)}
+        write_index.append(i)
+
+    if writes:
+        try:
+            events.bulk_write(writes, ordered=False)
+        except BulkWriteError as e:
+            for error in e.details.get('writeErrors', []):
+                i = write_index[error['index']]
+                results[i] = {'index': i, 'status': 'error', 'error': error.get('errmsg', 'Write failed')}
+        except Exception as e:
+            print(f"Error in batch_events: {str(e)}")
+            print(traceback.format_exc())
+            return jsonify({'error': f'Database error: {str(e)}'}), 500
+        finally:
+            events_bulk_changed(user_id)
+
+    return jsonify({'results': results})
+
+def get_month_events(user_id, year, month, version=None):
+    """A month's event occurrences ready for JSON, served from the event cache when fresh"""
+    cache = current_app.event_cache
+    if version is None:
+        version = cache.version(user_id)
+    cached = cache.get(user_id, year, month, version)
+    if cached is not None:
+        return cached
+
+    start, end = month_bounds(year, month)
+    # Includes occurrences of recurring series that started in earlier months
+    event_list = find_occurrences(current_app.repo.events, user_id, start, end)
+    for e in event_list:
+        e['_id'] = str(e['_id'])
+    cache.set(user_id, year, month, event_list, version)
+    return event_list
+
 @main_bp.route('/get_events', methods=['GET'])
 def get_events():
-    db = current_app.db
-    events = db['events']
+    user_id = session['user_id']
     year, month = int(request.args['year']), int(request.args['month'])
-    event_list = list(events.find({
+
+    # The ETag is the user's shared write version, so an unchanged month is
+    # answered with one _id lookup instead of the month's query
+    version = current_app.event_cache.version(user_id)
+    etag = current_app.event_cache.etag(version, year, month)
+    if etag in request.if_none_match:
+        response = Response(status=304)
+    else:
+        response = jsonify(get_month_events(user_id, year, month, version))
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+# Fields clients may request from /api/events; start and _id are always sent for paging
+EVENT_API_FIELDS = {'title', 'description', 'date', 'time', 'recurrence', 'type', 'start'}
+EVENT_API_DEFAULT_LIMIT = 500
+EVENT_API_MAX_LIMIT = 5000
+
+@main_bp.route('/api/events', methods=['GET'])
+def api_events():
+    """Stream a user's stored events in [start, end), paged by a (start, _id) keyset cursor"""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Not logged in'}), 401
+
+    try:
+        start = parse_datetime(request.args['start'])
+        end = parse_datetime(request.args['end'])
+    except (KeyError, ValueError):
+        return jsonify({'error': 'start and end are required as YYYY-MM-DD or ISO datetimes'}), 400
+
+    fields = request.args.get('fields')
+    if fields:
+        requested = {f.strip() for f in fields.split(',') if f.strip()}
+        unknown = requested - EVENT_API_FIELDS
+        if unknown:
+            return jsonify({'error': f"Unknown fields: {', '.join(sorted(unknown))}"}), 400
+    else:
+        requested = EVENT_API_FIELDS
+    projection = {f: 1 for f in requested | {'start'}}
+
+    try:
+        limit = min(int(request.args.get('limit', EVENT_API_DEFAULT_LIMIT)), EVENT_API_MAX_LIMIT)
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
+    if limit < 1:
+        return jsonify({'error': 'limit must be positive'}), 400
+
+    query = {
         'user_id': session['user_id'],
-        'date': {'$regex': f'^{year}-{month:02d}'}
-    }).sort([
-        ('date', 1),  # Sort by date ascending
-        ('time', 1)   # Then by time ascending
-    ]))
-    for e in event_list:
-        e['_id'] = str(e['_id'])
-    return jsonify(event_list)
+        'start': {'$gte': start, '$lt': end}
+    }
+    if request.args.get('cursor'):
+        try:
+            query.update(after_cursor(*decode_cursor(request.args['cursor'])))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+    cursor = current_app.repo.events.find(query, projection) \
+        .sort([('start', 1), ('_id', 1)]).limit(limit)
+    ndjson = request.args.get('format') == 'ndjson' or \
+        'application/x-ndjson' in request.headers.get('Accept', '')
+    encoder = MongoJSONEncoder()
+
+    def generate():
+        # The next cursor is only known once the page is exhausted, so it
+        # goes after the events: last NDJSON line, or trailing object key.
+        count, last = 0, None
+        yield '' if ndjson else '{"events": ['
+        for event in cursor:
+            if 'start' not in requested:
+                last = (event.pop('start'), event['_id'])
+            else:
+                last = (event['start'], event['_id'])
+            if ndjson:
+                yield encoder.encode(event) + '\n'
+            else:
+                yield (',' if count else '') + encoder.encode(event)
+            count += 1
+        next_cursor = encode_cursor(*last) if count == limit else None
+        if ndjson:
+            yield json.dumps({'next_cursor': next_cursor}) + '\n'
+        else:
+            yield '], "next_cursor": ' + json.dumps(next_cursor) + '}'
+
+    mimetype = 'application/x-ndjson' if ndjson else 'application/json'
+    return Response(stream_with_context(generate()), mimetype=mimetype)
+
+
+ICS_IMPORT_BATCH_SIZE = 1000
+# Warnings listed in an import's response; the rest are only counted
+ICS_IMPORT_MAX_WARNINGS = 100
+
+def ical_import_write(event, user_id, now):
+    """Write for one imported event, keyed on its UID so importing a file again updates instead of duplicating"""
+    uid = event.pop('ical_uid', None)
+    event['user_id'] = user_id
+    if not uid:
+        return InsertOne(dict(event, created_at=now))
+    event_id = exported_event_id(uid)
+    if event_id:
+        # One of our own exports: update the event it came from
+        selector = {'_id': event_id, 'user_id': user_id}
+    else:
+        selector = {'user_id': user_id, 'ical_uid': uid}
+    update = {'$set': event, '$setOnInsert': {'created_at': now}}
+    unset = {name: '' for name in ('time', 'until') if name not in event}
+    if unset:
+        update['$unset'] = unset
+    return UpdateOne(selector, update, upsert=True)
+
+def apply_ical_import(events, writes):
+    """(created, updated, failed) for one batch of import writes"""
+    try:
+        result = events.bulk_write(writes, ordered=False).bulk_api_result
+        failed = 0
+    except BulkWriteError as e:
+        result = e.details
+        failed = len(result.get('writeErrors', []))
+    return result.get('nInserted', 0) + result.get('nUpserted', 0), result.get('nMatched', 0), failed
+
+@main_bp.route('/api/events/import', methods=['POST'])
+def import_events():
+    """Import VEVENTs from an uploaded .ics file (or raw text/calendar body)"""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Not logged in'}), 401
+
+    upload = request.files.get('file')
+    stream = upload.stream if upload else request.stream
+    lines = io.TextIOWrapper(stream, encoding='utf-8', errors='replace', newline='')
+
+    user_id = session['user_id']
+    events = current_app.repo.events
+    imported = updated = skipped = 0
+    warnings, warning_count = [], 0
+    batch = []
+    try:
+        for event, notes in read_events(lines):
+            warning_count += len(notes)
+            warnings.extend(notes[:ICS_IMPORT_MAX_WARNINGS - len(warnings)])
+            if event is None:
+                skipped += 1
+                continue
+            batch.append(ical_import_write(event, user_id, datetime.now()))
+            if len(batch) >= ICS_IMPORT_BATCH_SIZE:
+                created, changed, failed = apply_ical_import(events, batch)
+                imported, updated, skipped = imported + created, updated + changed, skipped + failed
+                batch = []
+        if batch:
+            created, changed, failed = apply_ical_import(events, batch)
+            imported, updated, skipped = imported + created, updated + changed, skipped + failed
+    except Exception as e:
+        print(f"Error importing events: {str(e)}")
+        print(traceback.format_exc())
+        return jsonify({'error': 'Error importing events', 'imported': imported, 'updated': updated}), 500
+    finally:
+        if imported or updated:
+            events_bulk_changed(user_id)
+
+    return jsonify({'success': True, 'imported': imported, 'updated': updated, 'skipped': skipped,
+                    'warnings': warnings, 'warning_count': warning_count})
+
+@main_bp.route('/api/events/export.ics', methods=['GET'])
+def export_events():
+    """Stream all of a user's events as an iCalendar file"""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Not logged in'}), 401
+
+    cursor = current_app.repo.events.find(
+        {'user_id': session['user_id']},
+        {'title': 1, 'description': 1, 'start': 1, 'recurrence': 1, 'until': 1, 'type': 1, 'ical_uid': 1}
+    ).sort([('start', 1), ('_id', 1)])
+    response = Response(stream_with_context(write_calendar(cursor)), mimetype='text/calendar')
+    response.headers['Content-Disposition'] = 'attachment; filename=calendar.ics'
+    return response
+
+
+def serialize_interval(interval):
+    return {
+        'start': interval.start.isoformat(),
+        'end': interval.end.isoformat(),
+        'event_id': interval.event_id,
+        'title': interval.title
+    }
+
+@main_bp.route('/api/freebusy', methods=['GET'])
+def freebusy():
+    """Busy intervals and free gaps for [start, end)"""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Not logged in'}), 401
+    try:
+        start = parse_datetime(request.args['start'])
+        end = parse_datetime(request.args['end'])
+    except (KeyError, ValueError):
+        return jsonify({'error': 'start and end are required as YYYY-MM-DD or ISO datetimes'}), 400
+    if end <= start:
+        return jsonify({'error': 'end must be after start'}), 400
+
+    service = current_app.freebusy
+    busy = service.busy(session['user_id'], start, end)
+    free = service.free(session['user_id'], start, end)
+    return jsonify({
+        'busy': [serialize_interval(iv) for iv in busy],
+        'free': [{'start': s.isoformat(), 'end': e.isoformat()} for s, e in free]
+    })
+
+@main_bp.route('/api/freebusy/next-free', methods=['GET'])
+def next_free_slot():
+    """First free slot of ?minutes= after ?after= (default now), optionally within day hours"""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Not logged in'}), 401
+    try:
+        minutes = int(request.args.get('minutes', 30))
+        after = parse_datetime(request.args['after']) if 'after' in request.args else datetime.now()
+        within_days = min(int(request.args.get('within_days', 14)), 366)
+        day_start = datetime.strptime(request.args['day_start'], '%H:%M').time() if 'day_start' in request.args else None
+        day_end = datetime.strptime(request.args['day_end'], '%H:%M').time() if 'day_end' in request.args else None
+    except ValueError:
+        return jsonify({'error': 'Invalid minutes, after, within_days, day_start or day_end'}), 400
+    if minutes < 1:
+        return jsonify({'error': 'minutes must be positive'}), 400
+
+    slot = current_app.freebusy.next_free_slot(session['user_id'], minutes, after,
+                                               within_days=within_days, day_start=day_start, day_end=day_end)
+    if not slot:
+        return jsonify({'slot': None})
+    return jsonify({'slot': {'start': slot[0].isoformat(), 'end': slot[1].isoformat()}})
+
+
+@main_bp.route('/api/search', methods=['GET'])
+def search():
+    """Ranked search over the user's events and to-do items; ?q=, optional ?limit= and ?prefix=0"""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Not logged in'}), 401
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({'results': []})
+    try:
+        limit = min(max(int(request.args.get('limit', 20)), 1), 100)
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
+    prefix = request.args.get('prefix', '1') != '0'
+
+    results = current_app.search.search(session['user_id'], query, limit=limit, prefix=prefix)
+    return jsonify({'results': results})
 
 
 #TO-DO____________________________________________________________________________________________________________
@@ -190,11 +569,74 @@ def get_todo_lists():
     if 'user_id' not in session:
         return jsonify({'error': 'Not logged in'}), 401
     user_id = session['user_id']
-    lists = list(current_app.db.todo_lists.find({'user_id': user_id}))
+    todo_lists = current_app.repo.todo_lists
+    lists = list(todo_lists.find({'user_id': user_id}))
     for lst in lists:
+        ensure_item_ids(todo_lists, lst)
         lst['_id'] = str(lst['_id'])
     return jsonify(lists)
 
+@main_bp.route('/api/todo-lists/summary', methods=['GET'])
+def get_todo_list_summaries():
+    """Each list's name with its item and completed counts, computed in Mongo; no items are sent"""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Not logged in'}), 401
+    items = {'$ifNull': ['$items', []]}
+    summaries = list(current_app.repo.todo_lists.aggregate([
+        {'$match': {'user_id': session['user_id']}},
+        {'$project': {
+            'name': 1,
+            'item_count': {'$size': items},
+            'completed_count': {'$size': {'$filter': {'input': items, 'cond': {'$eq': ['$$this.completed', True]}}}},
+        }},
+    ]))
+    for summary in summaries:
+        summary['_id'] = str(summary['_id'])
+    return jsonify(summaries)
+
+TODO_ITEMS_DEFAULT_LIMIT = 50
+TODO_ITEMS_MAX_LIMIT = 200
+
+@main_bp.route('/api/todo-list/<list_id>/items', methods=['GET'])
+def get_todo_items(list_id):
+    """One page of a list's items (?offset=&limit=), sliced in Mongo"""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Not logged in'}), 401
+    try:
+        offset = int(request.args.get('offset', 0))
+        limit = min(int(request.args.get('limit', TODO_ITEMS_DEFAULT_LIMIT)), TODO_ITEMS_MAX_LIMIT)
+    except ValueError:
+        return jsonify({'error': 'offset and limit must be integers'}), 400
+    if offset < 0 or limit < 1:
+        return jsonify({'error': 'offset must be non-negative and limit positive'}), 400
+
+    todo_lists = current_app.repo.todo_lists
+    selector = {'_id': ObjectId(list_id), 'user_id': session['user_id']}
+    page = next(todo_lists.aggregate([
+        {'$match': selector},
+        {'$project': {
+            'name': 1,
+            'total': {'$size': {'$ifNull': ['$items', []]}},
+            'items': {'$slice': [{'$ifNull': ['$items', []]}, offset, limit]},
+        }},
+    ]), None)
+    if page is None:
+        return jsonify({'error': 'List not found'}), 404
+    if not all('id' in item for item in page['items']):
+        # Items from before item ids existed; assign them, then take the page again
+        todo_list = ensure_item_ids(todo_lists, todo_lists.find_one(selector))
+        page['items'] = todo_list.get('items', [])[offset:offset + limit]
+
+    next_offset = offset + len(page['items'])
+    return jsonify({
+        '_id': list_id,
+        'name': page['name'],
+        'items': page['items'],
+        'offset': offset,
+        'total': page['total'],
+        'next_offset': next_offset if next_offset < page['total'] else None,
+    })
+
 @main_bp.route('/api/todo-list', methods=['POST'])
 def create_todo_list():
     if 'user_id' not in session:
@@ -203,11 +645,14 @@ def create_todo_list():
     if not data or 'name' not in data:
         return jsonify({'error': 'List name required'}), 400
     user_id = session['user_id']
-    list_id = current_app.db.todo_lists.insert_one({
+    todo_list = {
         'user_id': user_id,
         'name': data['name'],
         'items': []
-    }).inserted_id
+    }
+    list_id = current_app.repo.todo_lists.insert_one(todo_list).inserted_id
+    todo_lists_changed(current_app.repo.todo_versions, user_id)
+    current_app.search.index_todo_list(user_id, todo_list)
     return jsonify({'_id': str(list_id)})
 
 @main_bp.route('/api/todo-list/<list_id>', methods=['PUT'])
@@ -217,12 +662,14 @@ def rename_todo_list(list_id):
     data = request.get_json()
     if not data or 'name' not in data:
         return jsonify({'error': 'New name required'}), 400
-    result = current_app.db.todo_lists.update_one(
+    result = current_app.repo.todo_lists.update_one(
         {'_id': ObjectId(list_id), 'user_id': session['user_id']},
         {'$set': {'name': data['name']}}
     )
     if result.matched_count == 0:
         return jsonify({'error': 'List not found'}), 404
+    todo_lists_changed(current_app.repo.todo_versions, session['user_id'])
+    current_app.search.rename_todo_list(session['user_id'], list_id, data['name'])
     return jsonify({'status': 'updated'})
 
 @main_bp.route('/api/todo-list/<list_id>/item', methods=['POST'])
@@ -232,59 +679,119 @@ def add_todo_item(list_id):
     data = request.get_json()
     if not data or 'text' not in data:
         return jsonify({'error': 'Item text required'}), 400
-    result = current_app.db.todo_lists.update_one(
+    item = new_item(data['text'])
+    todo_list = current_app.repo.todo_lists.find_one_and_update(
         {'_id': ObjectId(list_id), 'user_id': session['user_id']},
-        {'$push': {'items': {'text': data['text'], 'completed': False}}}
+        {'$push': {'items': item}},
+        projection={'name': 1}
     )
-    if result.matched_count == 0:
+    if todo_list is None:
         return jsonify({'error': 'List not found'}), 404
-    return jsonify({'status': 'added'})
+    todo_lists_changed(current_app.repo.todo_versions, session['user_id'])
+    current_app.search.index_todo_item(session['user_id'], list_id, todo_list['name'], item)
+    return jsonify({'status': 'added', 'id': item['id']})
 
-@main_bp.route('/api/todo-list/<list_id>/item/<int:index>', methods=['PUT'])
-def toggle_complete(list_id, index):
+@main_bp.route('/api/todo-list/<list_id>/item/<item_id>', methods=['PUT'])
+def toggle_complete(list_id, item_id):
+    """Set an item's completed flag, or flip it when the body doesn't say which; one atomic update"""
     if 'user_id' not in session:
         return jsonify({'error': 'Not logged in'}), 401
-    list_doc = current_app.db.todo_lists.find_one({'_id': ObjectId(list_id), 'user_id': session['user_id']})
-    if not list_doc or index < 0 or index >= len(list_doc['items']):
-        return jsonify({'error': 'List or item not found'}), 404
-    item = list_doc['items'][index]
-    item['completed'] = not item['completed']
-    current_app.db.todo_lists.update_one(
-        {'_id': ObjectId(list_id)},
-        {'$set': {f'items.{index}': item}}
+    data = request.get_json(silent=True) or {}
+    selector = {'_id': ObjectId(list_id), 'user_id': session['user_id'], 'items.id': item_id}
+    completed = data.get('completed')
+    if isinstance(completed, bool):
+        result = current_app.repo.todo_lists.update_one(selector, {'$set': {'items.$.completed': completed}})
+        if result.matched_count == 0:
+            return jsonify({'error': 'List or item not found'}), 404
+    else:
+        # The write returns just the flipped item, so the index needs no re-read
+        todo_list = current_app.repo.todo_lists.find_one_and_update(
+            selector, toggle_item_pipeline(item_id),
+            projection={'items': {'$elemMatch': {'id': item_id}}},
+            return_document=ReturnDocument.AFTER)
+        if todo_list is None:
+            return jsonify({'error': 'List or item not found'}), 404
+        completed = todo_list['items'][0].get('completed', False)
+    todo_lists_changed(current_app.repo.todo_versions, session['user_id'])
+    current_app.search.set_todo_item_completed(session['user_id'], list_id, item_id, completed)
+    return jsonify({'status': 'toggled', 'completed': completed})
+
+@main_bp.route('/api/todo-list/<list_id>/item/<item_id>/position', methods=['PUT'])
+def move_todo_item(list_id, item_id):
+    if 'user_id' not in session:
+        return jsonify({'error': 'Not logged in'}), 401
+    data = request.get_json(silent=True) or {}
+    position = data.get('position')
+    if not isinstance(position, int) or isinstance(position, bool) or position < 0:
+        return jsonify({'error': 'position must be a non-negative integer'}), 400
+    result = current_app.repo.todo_lists.update_one(
+        {'_id': ObjectId(list_id), 'user_id': session['user_id'], 'items.id': item_id},
+        move_item_pipeline(item_id, position)
     )
-    return jsonify({'status': 'toggled'})
+    if result.matched_count == 0:
+        return jsonify({'error': 'List or item not found'}), 404
+    todo_lists_changed(current_app.repo.todo_versions, session['user_id'])
+    # Search results don't carry positions, so the index is unaffected
+    return jsonify({'status': 'moved'})
 
-@main_bp.route('/api/todo-list/<list_id>/item/<int:index>', methods=['DELETE'])
-def delete_todo_item(list_id, index):
+@main_bp.route('/api/todo-list/<list_id>/item/<item_id>', methods=['DELETE'])
+def delete_todo_item(list_id, item_id):
     if 'user_id' not in session:
         return jsonify({'error': 'Not logged in'}), 401
-    list_doc = current_app.db.todo_lists.find_one({'_id': ObjectId(list_id), 'user_id': session['user_id']})
-    if not list_doc or index < 0 or index >= len(list_doc['items']):
-        return jsonify({'error': 'List or item not found'}), 404
-    items = list_doc['items']
-    items.pop(index)
-    current_app.db.todo_lists.update_one(
-        {'_id': ObjectId(list_id)},
-        {'$set': {'items': items}}
+    result = current_app.repo.todo_lists.update_one(
+        {'_id': ObjectId(list_id), 'user_id': session['user_id'], 'items.id': item_id},
+        {'$pull': {'items': {'id': item_id}}}
     )
+    if result.matched_count == 0:
+        return jsonify({'error': 'List or item not found'}), 404
+    todo_lists_changed(current_app.repo.todo_versions, session['user_id'])
+    current_app.search.remove_todo_item(session['user_id'], list_id, item_id)
     return jsonify({'status': 'deleted'})
 
 @main_bp.route('/api/todo-list/<list_id>', methods=['DELETE'])
 def delete_todo_list(list_id):
     if 'user_id' not in session:
         return jsonify({'error': 'Not logged in'}), 401
-    result = current_app.db.todo_lists.delete_one({
+    result = current_app.repo.todo_lists.delete_one({
         '_id': ObjectId(list_id),
         'user_id': session['user_id']
     })
     if result.deleted_count == 0:
         return jsonify({'error': 'List not found'}), 404
+    todo_lists_changed(current_app.repo.todo_versions, session['user_id'])
+    current_app.search.remove_todo_list(session['user_id'], list_id)
     return jsonify({'status': 'deleted'})
 
 
 #CHAT AI_______________________________________________________________________________________________________________
 
+def sse_event(name, payload):
+    return f"event: {name}\ndata: {json.dumps(payload, cls=MongoJSONEncoder)}\n\n"
+
+def stream_chat_response(assistant, user_message, user_id):
+    """Server-Sent Events: 'token' events while the reply streams, then one 'done' (or 'error')"""
+    def generate():
+        try:
+            for kind, payload in assistant.stream_calendar_request(user_message, user_id):
+                if kind == 'token':
+                    yield sse_event('token', {'text': payload})
+                elif isinstance(payload, dict) and 'error' in payload:
+                    yield sse_event('error', payload)
+                else:
+                    yield sse_event('done', payload)
+        except Exception as e:
+            print(f"Error streaming chat response: {str(e)}")
+            yield sse_event('error', {
+                'error': 'An error occurred while processing your request',
+                'output_llm': 'I apologize, but I encountered an error processing your request. Please try again.'
+            })
+
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    # Stop nginx and similar proxies from buffering the stream
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
 @main_bp.route('/chat_with_ai', methods=['POST'])
 def chat_with_ai():
     try:
@@ -306,6 +813,25 @@ def chat_with_ai():
 
         user_message = data['message']
         print(f"Processing message from user {session['user_id']}: {user_message}")  # Debug log
+
+        if data.get('stream') or 'text/event-stream' in request.headers.get('Accept', ''):
+            mode = 'stream'
+        elif 'async' in data:
+            mode = 'jobs' if data['async'] else 'sync'
+        else:
+            mode = current_app.config['AI_CHAT_MODE']
+
+        # Streaming and sync answers hold this request thread for the whole LLM call
+        if mode == 'stream':
+            return stream_chat_response(assistant, user_message, session['user_id'])
+
+        # Run on the job pool and let the client poll /api/ai-jobs/<job_id>
+        if mode == 'jobs':
+            try:
+                job_id = current_app.ai_jobs.submit(session['user_id'], user_message)
+            except QueueFull:
+                return jsonify({'error': 'The assistant is busy, please try again shortly'}), 503
+            return jsonify({'job_id': job_id, 'status_url': url_for('main.ai_job', job_id=job_id)}), 202
         
         response = assistant.process_calendar_request(user_message, session['user_id'])
         print(f"AI Assistant response: {response}")  # Debug log
@@ -335,18 +861,50 @@ def chat_with_ai():
 
 @main_bp.route('/process_pending_event', methods=['POST'])
 def process_pending_event():
-    assistant = current_app.ai_assistant
-    event_id = request.get_json().get('event_id')
-    assistant.mark_event_processed(event_id)
+    """Acknowledge a finished AI job once the client has applied its result"""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Not logged in'}), 401
+    data = request.get_json() or {}
+    job_id = data.get('job_id') or data.get('event_id')
+    if not current_app.ai_jobs.acknowledge(job_id, session['user_id']):
+        return jsonify({'error': 'No finished job with that ID'}), 404
     return jsonify({'success': True})
 
+@main_bp.route('/api/ai-jobs')
+def ai_jobs():
+    """The user's AI jobs that are queued or still running"""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Not logged in'}), 401
+    jobs = [serialize_job(job) for job in current_app.ai_jobs.pending(session['user_id'])]
+    return jsonify({'jobs': jobs})
+
+@main_bp.route('/api/ai-jobs/<job_id>')
+def ai_job(job_id):
+    """State and, once finished, result of an AI job; ?wait=N long-polls up to N seconds"""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Not logged in'}), 401
+    job = current_app.ai_jobs.get(job_id, session['user_id'], wait=request.args.get('wait', 0, type=float))
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    return Response(json.dumps(serialize_job(job), cls=MongoJSONEncoder), mimetype='application/json')
+
+@main_bp.route('/api/ai/cache-stats')
+def ai_cache_stats():
+    """Hit/miss counters of this worker's assistant response cache"""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Not logged in'}), 401
+    return jsonify(current_app.ai_assistant.response_cache.stats())
+
 @main_bp.route('/get_daily_fact')
 def get_daily_fact():
     """Endpoint to get the daily fact"""
     if 'username' not in session:
         return jsonify({'error': 'Not logged in'}), 401
     
-    fact = current_app.ai_assistant.get_daily_fact()
+    fact = current_app.daily_facts.get()
+    if fact is None:
+        # Being generated in the background; the client retries shortly
+        return jsonify({'fact': None, 'pending': True})
     return jsonify({'fact': fact})
 
 @main_bp.route('/get_chat_history')
@@ -356,27 +914,7 @@ def get_chat_history():
         return jsonify({'error': 'Not logged in'}), 401
     
     try:
-        # Get last 3 interactions from llm_info
-        recent_interactions = list(current_app.db['llm_info'].find(
-            {'user_id': session['user_id']},
-            sort=[('created_at', -1)],
-            limit=3
-        ))
-        
-        # Convert to chat history format
-        history = []
-        for interaction in reversed(recent_interactions):  # Reverse to get chronological order
-            if 'user_message' in interaction:
-                history.append({
-                    "role": "user",
-                    "content": interaction['user_message']
-                })
-            if 'output_llm' in interaction:
-                history.append({
-                    "role": "assistant",
-                    "content": interaction['output_llm']
-                })
-        
+        history = current_app.ai_assistant.conversations.messages(session['user_id'])
         return jsonify({'history': history})
     except Exception as e:
         print(f"Error getting chat history: {str(e)}")
@@ -0,0 +1,191 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import ASCENDING
+
+PENDING_STATES = ['queued', 'running']
+# Longest a client may block in one long-poll
+MAX_WAIT = 30
+# How often a process refreshes heartbeat_at on the jobs it holds, queued or running
+HEARTBEAT_EVERY = 30
+# Unfinished jobs whose heartbeat is this old belong to a process that died
+STALE_AFTER = timedelta(seconds=4 * HEARTBEAT_EVERY)
+
+
+class QueueFull(Exception):
+    """Raised by submit() when the local worker pool already has max_pending jobs"""
+
+
+class AIJobQueue:
+    """Runs assistant chat requests on a bounded local worker pool.
+
+    Every job is persisted in the ai_jobs collection and moves through
+    queued -> running -> done | failed, so any worker process can report
+    on it. Requests get a job id straight away and poll, or long-poll, for
+    the result instead of holding a request thread for the LLM call.
+
+    The process holding a job refreshes its heartbeat_at while it is
+    queued or running, however long it waits behind other jobs; only a job
+    whose heartbeat has stopped is failed as interrupted, and each state
+    change applies only from the state it expects, so a job failed that
+    way is never picked up or overwritten afterwards.
+    """
+
+    def __init__(self, workers=4, max_pending=64):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.jobs = None
+        self.assistant = None
+        self.pool = None
+        self.slots = None
+        self.finished = {}  # job_id -> threading.Event, for jobs queued or running here
+        self.lock = threading.Lock()
+        self.stopping = threading.Event()
+
+    def init_app(self, app):
+        """Initialize the queue with app configuration"""
+        self.workers = app.config.get('AI_JOB_WORKERS', self.workers)
+        self.max_pending = app.config.get('AI_JOB_MAX_PENDING', self.max_pending)
+        self.jobs = app.repo.ai_jobs
+        self.assistant = app.ai_assistant
+        self.pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='ai-job')
+        self.slots = threading.BoundedSemaphore(self.max_pending)
+        threading.Thread(target=self._heartbeat, name='ai-job-heartbeat', daemon=True).start()
+
+    def submit(self, user_id, message):
+        """Queue a chat message and return its job id"""
+        if not self.slots.acquire(blocking=False):
+            raise QueueFull()
+        try:
+            now = datetime.now()
+            job_id = self.jobs.insert_one({
+                'user_id': user_id,
+                'message': message,
+                'state': 'queued',
+                'created_at': now,
+                'updated_at': now,
+                'heartbeat_at': now,
+            }).inserted_id
+            with self.lock:
+                self.finished[job_id] = threading.Event()
+            self.pool.submit(self._run, job_id, user_id, message)
+        except Exception:
+            self.slots.release()
+            raise
+        return str(job_id)
+
+    def _set_state(self, job_id, state, **fields):
+        """Move a job on from the state before `state`; False if it has left that state"""
+        now = datetime.now()
+        fields.update({'state': state, 'updated_at': now})
+        if state in ('done', 'failed'):
+            fields['finished_at'] = now
+            expected = 'running'
+        else:
+            fields['started_at'] = now
+            expected = 'queued'
+        result = self.jobs.update_one({'_id': job_id, 'state': expected}, {'$set': fields})
+        return result.matched_count == 1
+
+    def _run(self, job_id, user_id, message):
+        try:
+            if not self._set_state(job_id, 'running'):
+                print(f"AI job {job_id} is no longer queued; skipping it")  # Debug log
+                return
+            result = self.assistant.process_calendar_request(message, user_id, job_id=job_id)
+            if 'error' in result:
+                self._set_state(job_id, 'failed', result=result, error=result['error'])
+            else:
+                self._set_state(job_id, 'done', result=result)
+        except Exception as e:
+            print(f"AI job {job_id} failed: {e}")
+            self._set_state(job_id, 'failed', error=str(e))
+        finally:
+            self.slots.release()
+            with self.lock:
+                event = self.finished.pop(job_id, None)
+            if event:
+                event.set()
+
+    def beat(self):
+        """Refresh heartbeat_at on every job this process holds"""
+        with self.lock:
+            held = list(self.finished)
+        if held:
+            self.jobs.update_many({'_id': {'$in': held}, 'state': {'$in': PENDING_STATES}},
+                                  {'$set': {'heartbeat_at': datetime.now()}})
+
+    def _heartbeat(self):
+        while not self.stopping.wait(HEARTBEAT_EVERY):
+            try:
+                self.beat()
+            except Exception as e:
+                print(f"Error refreshing AI job heartbeats: {e}")
+
+    def _find(self, job_id, user_id):
+        job = self.jobs.find_one({'_id': job_id, 'user_id': user_id})
+        # Jobs saved before heartbeats existed only have updated_at
+        beat = job and job.get('heartbeat_at', job['updated_at'])
+        if job and job['state'] in PENDING_STATES and datetime.now() - beat > STALE_AFTER:
+            self.jobs.update_one({'_id': job_id, 'state': job['state'], 'heartbeat_at': job.get('heartbeat_at')},
+                                 {'$set': {'state': 'failed', 'error': 'Job was interrupted',
+                                           'finished_at': datetime.now()}})
+            job = self.jobs.find_one({'_id': job_id, 'user_id': user_id})
+        return job
+
+    def get(self, job_id, user_id, wait=0):
+        """The user's job, waiting up to `wait` seconds for it to finish; None if unknown"""
+        try:
+            job_id = ObjectId(job_id)
+        except (InvalidId, TypeError):
+            return None
+        wait = min(max(wait, 0), MAX_WAIT)
+        with self.lock:
+            event = self.finished.get(job_id)
+        if event is not None and wait:
+            event.wait(wait)
+            return self._find(job_id, user_id)
+
+        # Running in another process (or not waiting): poll the record
+        deadline = time.monotonic() + wait
+        while True:
+            job = self._find(job_id, user_id)
+            if not job or job['state'] not in PENDING_STATES or time.monotonic() >= deadline:
+                return job
+            time.sleep(0.5)
+
+    def pending(self, user_id):
+        """The user's jobs that are queued or still running, oldest first"""
+        return list(self.jobs.find({'user_id': user_id, 'state': {'$in': PENDING_STATES}},
+                                   sort=[('created_at', ASCENDING)]))
+
+    def acknowledge(self, job_id, user_id):
+        """Record that the client has handled a finished job's result"""
+        try:
+            job_id = ObjectId(job_id)
+        except (InvalidId, TypeError):
+            return False
+        result = self.jobs.update_one(
+            {'_id': job_id, 'user_id': user_id, 'state': {'$nin': PENDING_STATES}},
+            {'$set': {'delivered_at': datetime.now()}})
+        return result.matched_count == 1
+
+
+def serialize_job(job):
+    """JSON-ready view of a job record"""
+    view = {
+        'job_id': str(job['_id']),
+        'state': job['state'],
+        'created_at': job['created_at'].isoformat(),
+    }
+    for field in ('started_at', 'finished_at', 'delivered_at'):
+        if job.get(field):
+            view[field] = job[field].isoformat()
+    if 'result' in job:
+        view['result'] = job['result']
+    if 'error' in job:
+        view['error'] = job['error']
+    return view
@@ -0,0 +1,71 @@
+import threading
+from collections import OrderedDict, deque
+
+
+class ConversationStore:
+    """Each user's last few chat interactions, kept in memory.
+
+    A user's ring buffer is loaded from their interaction log rollup the
+    first time it is needed and then written through by record(). Every
+    worker process holds its own buffers, so each one remembers the rollup
+    version (its interaction count) it matches, and a read first checks
+    that version with one _id lookup: a buffer another worker's write has
+    made stale is reloaded instead of served. Idle users are evicted LRU
+    once more than `max_users` are held.
+    """
+
+    def __init__(self, max_users=1024, turns=3):
+        self.max_users = max_users
+        self.turns = turns
+        self.log = None
+        self.buffers = OrderedDict()  # user_id -> (rollup version, deque of turns)
+        self.lock = threading.Lock()
+
+    def init_app(self, app):
+        """Initialize the store with app configuration"""
+        self.max_users = app.config.get('CONVERSATION_MAX_USERS', self.max_users)
+        self.turns = app.config.get('CONVERSATION_TURNS', self.turns)
+        self.log = app.interaction_log
+
+    def recent(self, user_id):
+        """The user's last interactions, oldest first, as (user_message, output_llm) pairs"""
+        version = self.log.version(user_id)
+        with self.lock:
+            entry = self.buffers.get(user_id)
+            if entry is not None and entry[0] == version:
+                self.buffers.move_to_end(user_id)
+                return list(entry[1])
+
+        # The version and the turns come from one read, so they always agree
+        version, turns = self.log.recent_at_version(user_id, self.turns)
+        buffer = deque(turns, maxlen=self.turns)
+        with self.lock:
+            self.buffers[user_id] = (version, buffer)
+            self.buffers.move_to_end(user_id)
+            while len(self.buffers) > self.max_users:
+                self.buffers.popitem(last=False)
+            return list(buffer)
+
+    def messages(self, user_id):
+        """The recent interactions as chat messages: [{"role": ..., "content": ...}]"""
+        history = []
+        for user_message, output_llm in self.recent(user_id):
+            if user_message is not None:
+                history.append({"role": "user", "content": user_message})
+            if output_llm is not None:
+                history.append({"role": "assistant", "content": output_llm})
+        return history
+
+    def record(self, user_id, user_message, output_llm, version):
+        """Append an interaction that has just been saved to the interaction log at `version`"""
+        with self.lock:
+            entry = self.buffers.get(user_id)
+            if entry is None:
+                return
+            if entry[0] == version - 1:
+                entry[1].append((user_message, output_llm))
+                self.buffers[user_id] = (version, entry[1])
+                self.buffers.move_to_end(user_id)
+            else:
+                # Another write landed in between; the next read reloads
+                del self.buffers[user_id]
@@ -0,0 +1,125 @@
+import os
+import socket
+import threading
+import uuid
+from datetime import datetime, timedelta
+from app.services import leases
+
+
+class DailyFactService:
+    """Serves the "Did You Know?" fact without ever waiting on the LLM.
+
+    Today's fact is cached in process once read. On a miss the caller gets
+    None straight away while a background thread generates the fact; a
+    lease document in Mongo makes sure only one thread across all worker
+    processes calls the LLM for a given day, and a failed attempt is only
+    retried once the lease expires. The lease is renewed every third of
+    `lease_seconds` while the LLM call runs, however long its timeouts,
+    retries and hedging make it, and the fact is only stored if this
+    worker still holds the lease at that point. A scheduler thread generates
+    tomorrow's fact `lead_minutes` before midnight so the first visitors
+    of the day find it ready.
+    """
+
+    def __init__(self, lead_minutes=10, lease_seconds=120):
+        self.lead_minutes = lead_minutes
+        self.lease_seconds = lease_seconds
+        self.facts = None
+        self.leases = None
+        self.assistant = None
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.cache = {}
+        self.inflight = set()
+        self.lock = threading.Lock()
+        self.stopping = threading.Event()
+
+    def init_app(self, app):
+        """Initialize the service with app configuration and start the scheduler"""
+        self.lead_minutes = app.config.get('DAILY_FACT_LEAD_MINUTES', self.lead_minutes)
+        self.lease_seconds = app.config.get('DAILY_FACT_LEASE_SECONDS', self.lease_seconds)
+        self.facts = app.repo.daily_facts
+        self.leases = app.repo.leases
+        self.assistant = app.ai_assistant
+        threading.Thread(target=self._schedule, name='daily-fact', daemon=True).start()
+
+    @staticmethod
+    def _key(day):
+        return day.strftime('%Y-%m-%d')
+
+    def get(self, now=None):
+        """Today's fact, or None while it is still being generated"""
+        day = (now or datetime.now()).date()
+        key = self._key(day)
+        with self.lock:
+            if key in self.cache:
+                return self.cache[key]
+
+        doc = self.facts.find_one({'date': key})
+        if doc and doc.get('fact'):
+            self._remember(key, doc['fact'])
+            return doc['fact']
+        self.ensure(day)
+        return None
+
+    def _remember(self, key, fact):
+        with self.lock:
+            self.cache[key] = fact
+            # Only today and tomorrow are ever useful
+            for old in sorted(self.cache)[:-2]:
+                del self.cache[old]
+
+    def ensure(self, day):
+        """Start generating the fact for `day` in the background unless already underway here"""
+        key = self._key(day)
+        with self.lock:
+            if key in self.inflight:
+                return
+            self.inflight.add(key)
+        threading.Thread(target=self._generate, args=(day,), name=f'daily-fact-{key}', daemon=True).start()
+
+    def _generate(self, day):
+        key = self._key(day)
+        try:
+            if self.facts.find_one({'date': key}, {'_id': 1}):
+                return
+            lease_id = f'daily_fact:{key}'
+            if not leases.acquire(self.leases, lease_id, self.owner, self.lease_seconds):
+                return
+            done = threading.Event()
+            threading.Thread(target=self._renew, args=(lease_id, done),
+                             name=f'daily-fact-lease-{key}', daemon=True).start()
+            try:
+                fact = self.assistant.generate_daily_fact(
+                    datetime.combine(day, datetime.min.time()),
+                    may_store=lambda: leases.renew(self.leases, lease_id, self.owner, self.lease_seconds))
+            finally:
+                done.set()
+            if fact:
+                self._remember(key, fact)
+            # On failure the lease is left to expire, which rate-limits retries
+        except Exception as e:
+            print(f"Error generating daily fact for {key}: {e}")
+        finally:
+            with self.lock:
+                self.inflight.discard(key)
+
+    def _renew(self, lease_id, done):
+        """Keep the lease alive until `done` is set or another worker has taken it"""
+        while not done.wait(self.lease_seconds / 3):
+            if not leases.renew(self.leases, lease_id, self.owner, self.lease_seconds):
+                print(f"Lost lease {lease_id} while generating")  # Debug log
+                return
+
+    def _schedule(self):
+        self.ensure(datetime.now().date())
+        while not self.stopping.is_set():
+            now = datetime.now()
+            tomorrow = now.date() + timedelta(days=1)
+            run_at = datetime.combine(tomorrow, datetime.min.time()) - timedelta(minutes=self.lead_minutes)
+            if run_at <= now:
+                # Already inside the lead window: do tonight's run now
+                self.ensure(tomorrow)
+                run_at += timedelta(days=1)
+            if self.stopping.wait((run_at - now).total_seconds()):
+                break
+            self.ensure(run_at.date() + timedelta(days=1))
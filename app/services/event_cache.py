@@ -0,0 +1,71 @@
+import threading
+import uuid
+from collections import OrderedDict
+from pymongo.errors import DuplicateKeyError
+
+
+class EventCache:
+    """Bounded LRU cache of serialised month event lists, keyed by (user_id, year, month).
+
+    Each user has a version counter in the event_versions collection that
+    every event write increments, so all worker processes agree on it.
+    Entries remember the version they were built at: a hit costs one _id
+    read of the counter instead of the month's range query, and
+    invalidating a user is a single $inc. The version doubles as the
+    month's ETag, so a month nobody has written to since the client
+    fetched it is answered with 304 whichever worker served it before.
+    """
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.versions = None
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def init_app(self, app):
+        """Initialize the cache with app configuration"""
+        self.max_entries = app.config.get('EVENT_CACHE_SIZE', self.max_entries)
+        self.versions = app.repo.event_versions
+
+    def version(self, user_id):
+        """The user's current event version, as an opaque string"""
+        doc = self.versions.find_one({'_id': user_id})
+        # The epoch is set when the counter is created, so a counter that is
+        # dropped and recreated never repeats an earlier version
+        return f"{doc['epoch']}.{doc['count']}" if doc else '0'
+
+    @staticmethod
+    def etag(version, year, month):
+        return f"{version}-{year}-{month:02d}"
+
+    def get(self, user_id, year, month, version):
+        """Cached events for the month, or None if missing or built at another version"""
+        key = (user_id, year, month)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[0] != version:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, user_id, year, month, events, version):
+        """Store events read at `version`; if a write has happened since, it simply never matches"""
+        key = (user_id, year, month)
+        with self.lock:
+            self.entries[key] = (version, events)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def invalidate(self, user_id):
+        """Mark every cached month of a user as stale, in every worker"""
+        update = {'$inc': {'count': 1}, '$setOnInsert': {'epoch': uuid.uuid4().hex[:8]}}
+        try:
+            self.versions.update_one({'_id': user_id}, update, upsert=True)
+        except DuplicateKeyError:
+            # Another write created this user's counter at the same moment
+            self.versions.update_one({'_id': user_id}, update)
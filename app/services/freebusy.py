@@ -0,0 +1,173 @@
+import bisect
+import threading
+from collections import OrderedDict, namedtuple
+from datetime import datetime, timedelta
+from app.services.recurrence import find_occurrences, expand_event
+
+Interval = namedtuple('Interval', ['start', 'end', 'event_id', 'title'])
+
+# Busy intervals are indexed per user over a window of at least this size
+MIN_WINDOW = timedelta(days=31)
+# Longest event duration honoured; also how far before a window we look for
+# events that started earlier but are still running inside it
+MAX_DURATION = timedelta(days=1)
+
+EVENT_PROJECTION = {'title': 1, 'date': 1, 'time': 1, 'start': 1, 'recurrence': 1, 'until': 1, 'duration': 1}
+
+
+class IntervalIndex:
+    """Intervals kept sorted by start, with the longest length tracked.
+
+    An overlap query for [a, b) only has to look at intervals starting in
+    [a - longest, b), which two bisects find, so lookups cost
+    O(log n + k) for k candidates. The lists are never changed in place:
+    replace() builds new ones and swaps them in with one assignment, so
+    readers need no lock and always see a single consistent version.
+    """
+
+    def __init__(self, intervals=()):
+        ordered = sorted(intervals, key=lambda iv: iv.start)
+        longest = max((iv.end - iv.start for iv in ordered), default=timedelta(0))
+        self.state = ([iv.start for iv in ordered], ordered, longest)
+
+    def replace(self, event_id, intervals):
+        """Swap in a version with event_id's intervals replaced by `intervals`"""
+        _, current, longest = self.state
+        # Mostly sorted already, so the sort is close to linear
+        ordered = sorted([iv for iv in current if iv.event_id != event_id] + list(intervals),
+                         key=lambda iv: iv.start)
+        longest = max([longest] + [iv.end - iv.start for iv in intervals])
+        self.state = ([iv.start for iv in ordered], ordered, longest)
+
+    def overlapping(self, start, end):
+        starts, intervals, longest = self.state
+        lo = bisect.bisect_left(starts, start - longest)
+        hi = bisect.bisect_left(starts, end)
+        return [iv for iv in intervals[lo:hi] if iv.end > start]
+
+
+class FreeBusyService:
+    """Per-user busy-interval indexes over event occurrences, recurrences expanded.
+
+    Indexes are built lazily for the window a query needs, kept in a
+    bounded LRU, and updated by upsert_event/remove_event when events are
+    written, so repeated availability checks never go back to Mongo.
+    Writers hold the lock; readers work on an index's current version.
+    """
+
+    def __init__(self, default_duration=60, max_users=1024):
+        self.default_duration = default_duration
+        self.max_users = max_users
+        self.events = None
+        # user_id -> (covered_start, covered_end, IntervalIndex)
+        self.indexes = OrderedDict()
+        self.versions = {}
+        self.lock = threading.Lock()
+
+    def init_app(self, app):
+        """Initialize the service with app configuration"""
+        self.default_duration = app.config.get('DEFAULT_EVENT_DURATION_MINUTES', self.default_duration)
+        self.max_users = app.config.get('FREEBUSY_MAX_USERS', self.max_users)
+        self.events = app.repo.events
+
+    def duration(self, event):
+        """Length of an event; events without a 'duration' in minutes get the default"""
+        minutes = event.get('duration')
+        if not isinstance(minutes, (int, float)) or minutes <= 0:
+            minutes = self.default_duration
+        return min(timedelta(minutes=minutes), MAX_DURATION)
+
+    def _intervals(self, event, window_start, window_end):
+        for occurrence in expand_event(event, window_start, window_end):
+            yield Interval(occurrence['start'], occurrence['start'] + self.duration(event),
+                           str(event['_id']), event.get('title', ''))
+
+    def _index_for(self, user_id, start, end):
+        with self.lock:
+            entry = self.indexes.get(user_id)
+            if entry and entry[0] <= start and end <= entry[1]:
+                self.indexes.move_to_end(user_id)
+                return entry[2]
+            version = self.versions.get(user_id, 0)
+
+        covered_start, covered_end = start, max(end, start + MIN_WINDOW)
+        build_start = covered_start - MAX_DURATION
+        index = IntervalIndex(
+            Interval(occurrence['start'], occurrence['start'] + self.duration(occurrence),
+                     str(occurrence['_id']), occurrence.get('title', ''))
+            for occurrence in find_occurrences(self.events, user_id, build_start, covered_end, EVENT_PROJECTION))
+
+        with self.lock:
+            # A write landed mid-build; serve this result but don't keep it
+            if version == self.versions.get(user_id, 0):
+                self.indexes[user_id] = (covered_start, covered_end, index)
+                self.indexes.move_to_end(user_id)
+                while len(self.indexes) > self.max_users:
+                    self.indexes.popitem(last=False)
+        return index
+
+    def busy(self, user_id, start, end):
+        """Busy intervals overlapping [start, end), ordered by start"""
+        return self._index_for(user_id, start, end).overlapping(start, end)
+
+    def conflicts(self, user_id, start, end, exclude_event_id=None):
+        """Events overlapping [start, end), optionally ignoring one event being edited"""
+        return [iv for iv in self.busy(user_id, start, end) if iv.event_id != exclude_event_id]
+
+    def free(self, user_id, start, end):
+        """Free (start, end) gaps in [start, end) between merged busy intervals"""
+        gaps, cursor = [], start
+        for interval in self.busy(user_id, start, end):
+            if interval.start > cursor:
+                gaps.append((cursor, interval.start))
+            cursor = max(cursor, interval.end)
+        if cursor < end:
+            gaps.append((cursor, end))
+        return gaps
+
+    def next_free_slot(self, user_id, minutes, after, within_days=14, day_start=None, day_end=None):
+        """Start and end of the first free slot of `minutes` after `after`, or None.
+
+        Slots are confined to [day_start, day_end) on each day (default:
+        the whole day) and the search gives up after `within_days`.
+        """
+        length = timedelta(minutes=minutes)
+        day = datetime(after.year, after.month, after.day)
+        # Warm one index covering the whole search instead of one per day
+        self._index_for(user_id, day, day + timedelta(days=within_days + 1))
+        for offset in range(within_days + 1):
+            current = day + timedelta(days=offset)
+            window_start = datetime.combine(current.date(), day_start) if day_start else current
+            window_end = datetime.combine(current.date(), day_end) if day_end else current + timedelta(days=1)
+            window_start = max(window_start, after)
+            if window_end - window_start < length:
+                continue
+            for gap_start, gap_end in self.free(user_id, window_start, window_end):
+                if gap_end - gap_start >= length:
+                    return gap_start, gap_start + length
+        return None
+
+    def upsert_event(self, user_id, event):
+        """Replace an event's intervals in the user's cached index after a write"""
+        with self.lock:
+            self.versions[user_id] = self.versions.get(user_id, 0) + 1
+            entry = self.indexes.get(user_id)
+            if not entry or not isinstance(event.get('start'), datetime):
+                return
+            covered_start, covered_end, index = entry
+            index.replace(str(event['_id']),
+                          list(self._intervals(event, covered_start - MAX_DURATION, covered_end)))
+
+    def remove_event(self, user_id, event_id):
+        """Drop a deleted event from the user's cached index"""
+        with self.lock:
+            self.versions[user_id] = self.versions.get(user_id, 0) + 1
+            entry = self.indexes.get(user_id)
+            if entry:
+                entry[2].replace(str(event_id), [])
+
+    def invalidate(self, user_id):
+        """Forget a user's index, e.g. after bulk writes"""
+        with self.lock:
+            self.versions[user_id] = self.versions.get(user_id, 0) + 1
+            self.indexes.pop(user_id, None)
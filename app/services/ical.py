@@ -0,0 +1,275 @@
+"""Streaming iCalendar (RFC 5545) reader and writer for events.
+
+Only the parts that map onto the calendar's event model are handled:
+UID, SUMMARY, DESCRIPTION, DTSTART, RRULE and CATEGORIES on VEVENTs.
+Anything the model cannot hold - weekly or daily rules, BYDAY and
+similar parts, EXDATEs, changed single occurrences - is reported as a
+warning rather than silently dropped. Both directions work one line /
+one event at a time so large calendars never have to fit in memory.
+"""
+from datetime import datetime, time, timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from bson import ObjectId
+from bson.errors import InvalidId
+from app.utils.enums import EventType
+from app.utils.dates import DATE_FORMAT, TIME_FORMAT
+from app.services.recurrence import nth_occurrence
+
+# (FREQ, INTERVAL) pairs that correspond to the app's recurrence values
+RRULE_TO_RECURRENCE = {
+    ('MONTHLY', 1): 'monthly',
+    ('MONTHLY', 3): 'quarterly',
+    ('MONTHLY', 6): 'half yearly',
+    ('YEARLY', 1): 'yearly',
+    ('MONTHLY', 12): 'yearly',
+}
+RECURRENCE_TO_RRULE = {
+    'monthly': 'FREQ=MONTHLY',
+    'quarterly': 'FREQ=MONTHLY;INTERVAL=3',
+    'half yearly': 'FREQ=MONTHLY;INTERVAL=6',
+    'yearly': 'FREQ=YEARLY',
+}
+EVENT_TYPES = [t.value for t in EventType]
+# UIDs of exported events are the event id with this suffix
+UID_SUFFIX = '@calendar-ai'
+
+
+def _unfold(lines):
+    """Join RFC 5545 folded continuation lines back onto their logical line"""
+    current = None
+    for raw in lines:
+        line = raw.rstrip('\r\n')
+        if line[:1] in (' ', '\t') and current is not None:
+            current += line[1:]
+            continue
+        if current is not None:
+            yield current
+        current = line
+    if current:
+        yield current
+
+
+def _unescape(value):
+    result, i = [], 0
+    while i < len(value):
+        ch = value[i]
+        if ch == '\\' and i + 1 < len(value):
+            nxt = value[i + 1]
+            result.append('\n' if nxt in 'nN' else nxt)
+            i += 2
+        else:
+            result.append(ch)
+            i += 1
+    return ''.join(result)
+
+
+def _escape(value):
+    return (value.replace('\\', '\\\\').replace(';', '\\;')
+            .replace(',', '\\,').replace('\r\n', '\\n').replace('\n', '\\n'))
+
+
+def _params(raw):
+    """Property parameters such as TZID=Europe/Paris as a dict"""
+    params = {}
+    for part in raw.split(';'):
+        if '=' in part:
+            name, value = part.split('=', 1)
+            params[name.upper()] = value.strip('"')
+    return params
+
+
+def _parse_datetime(value, tzid=None):
+    """(naive datetime, warning) for a DATE or DATE-TIME value.
+
+    Stored events are naive server-local times, so UTC ('Z') and TZID
+    times are converted to local time; floating times are taken as they
+    are. A TZID Python doesn't know is kept as wall time, with a warning.
+    """
+    if 'T' not in value:
+        return datetime.strptime(value[:8], '%Y%m%d'), None
+    at = datetime.strptime(value[:15], '%Y%m%dT%H%M%S')
+    if value.endswith('Z'):
+        zone = timezone.utc
+    elif tzid:
+        try:
+            zone = ZoneInfo(tzid)
+        except (ZoneInfoNotFoundError, ValueError):
+            return at, f"unknown time zone {tzid}; times kept as written"
+    else:
+        return at, None
+    return at.replace(tzinfo=zone).astimezone().replace(tzinfo=None), None
+
+
+def _implied_by_start(name, value, start):
+    """Whether a BY* rule part only restates what DTSTART already fixes"""
+    return (name == 'BYMONTHDAY' and value == str(start.day)) or \
+        (name == 'BYMONTH' and value == str(start.month))
+
+
+def _parse_rrule(value, start):
+    """(recurrence, until, warning) for an RRULE starting at `start`.
+
+    COUNT and UNTIL become the series' last occurrence. Rules with no
+    matching recurrence, or with BY* parts that change which days occur,
+    come back as 'none' with a warning; the event is kept as a single one.
+    """
+    parts = {}
+    for part in value.split(';'):
+        if '=' in part:
+            name, part_value = part.split('=', 1)
+            parts[name.upper()] = part_value.upper()
+    single = f"RRULE {value} is not supported; imported as a single event"
+    try:
+        interval = int(parts.get('INTERVAL', 1))
+        count = int(parts['COUNT']) if 'COUNT' in parts else None
+        until = _parse_datetime(parts['UNTIL'])[0] if 'UNTIL' in parts else None
+    except ValueError:
+        return 'none', None, single
+    recurrence = RRULE_TO_RECURRENCE.get((parts.get('FREQ', ''), interval))
+    if recurrence is None or any(name.startswith('BY') and not _implied_by_start(name, part_value, start)
+                                 for name, part_value in parts.items()):
+        return 'none', None, single
+
+    if count is not None:
+        until = nth_occurrence(start, recurrence, max(count, 1))
+    elif until is not None and 'T' not in parts['UNTIL']:
+        # A date-only UNTIL includes that whole day
+        until = datetime.combine(until.date(), time.max)
+    if until is not None and until <= start:
+        return 'none', None, None
+    return recurrence, until, None
+
+
+def _to_event(props, params):
+    """(event or None, warnings) for one VEVENT's properties"""
+    label = props.get('SUMMARY') or 'Untitled Event'
+    if 'DTSTART' not in props:
+        return None, [f"{label}: skipped, it has no DTSTART"]
+    if 'RECURRENCE-ID' in props:
+        return None, [f"{label}: skipped, changes to single occurrences of a series are not supported"]
+    try:
+        start, warning = _parse_datetime(props['DTSTART'], params.get('DTSTART', {}).get('TZID'))
+    except ValueError:
+        return None, [f"{label}: skipped, unreadable DTSTART {props['DTSTART']}"]
+    warnings = [warning] if warning else []
+
+    recurrence, until = 'none', None
+    if 'RRULE' in props:
+        recurrence, until, warning = _parse_rrule(props['RRULE'], start)
+        if warning:
+            warnings.append(warning)
+    for name in ('EXDATE', 'RDATE'):
+        if name in props and recurrence != 'none':
+            warnings.append(f"{name} is not supported and was ignored")
+
+    categories = [c.strip().lower() for c in props.get('CATEGORIES', '').split(',')]
+    event_type = next((c for c in categories if c in EVENT_TYPES), EventType.EVENT.value)
+    event = {
+        'title': props.get('SUMMARY') or 'Untitled Event',
+        'description': props.get('DESCRIPTION', ''),
+        'date': start.strftime(DATE_FORMAT),
+        'start': start,
+        'recurrence': recurrence,
+        'type': event_type,
+    }
+    if 'T' in props['DTSTART']:
+        # A DATE value is an all-day event, which has no time
+        event['time'] = start.strftime(TIME_FORMAT)
+    if until is not None:
+        event['until'] = until
+    if props.get('UID'):
+        event['ical_uid'] = props['UID']
+    return event, [f"{label}: {warning}" for warning in warnings]
+
+
+def exported_event_id(uid):
+    """The event id inside a UID this app exported, or None for other UIDs"""
+    if not uid or not uid.endswith(UID_SUFFIX):
+        return None
+    try:
+        return ObjectId(uid[:-len(UID_SUFFIX)])
+    except InvalidId:
+        return None
+
+
+def read_events(lines):
+    """Yield (event_dict | None, warnings) for each VEVENT in an iterable of text lines.
+
+    None marks a VEVENT that could not be mapped (e.g. no usable DTSTART);
+    warnings say why, or what was dropped from one that was mapped, so
+    callers can report them without the reader holding any state.
+    """
+    props, params, nested = None, None, 0
+    for line in _unfold(lines):
+        if line == 'BEGIN:VEVENT':
+            props, params, nested = {}, {}, 0
+        elif line == 'END:VEVENT':
+            if props is not None:
+                yield _to_event(props, params)
+            props = None
+        elif props is None or ':' not in line:
+            continue
+        elif line.startswith('BEGIN:'):
+            # Nested components such as VALARM reuse property names
+            nested += 1
+        elif line.startswith('END:'):
+            nested -= 1
+        elif not nested:
+            name_params, value = line.split(':', 1)
+            name, _, raw_params = name_params.partition(';')
+            name = name.upper()
+            if name in ('SUMMARY', 'DESCRIPTION', 'CATEGORIES', 'UID'):
+                value = _unescape(value)
+            props[name] = value
+            params[name] = _params(raw_params)
+
+
+def _fold(line):
+    """Fold a content line to 75 octets per RFC 5545"""
+    encoded = line.encode('utf-8')
+    if len(encoded) <= 75:
+        return line + '\r\n'
+    parts, limit = [], 75
+    while encoded:
+        cut = min(limit, len(encoded))
+        # Never split inside a multi-byte UTF-8 sequence
+        while cut < len(encoded) and (encoded[cut] & 0xC0) == 0x80:
+            cut -= 1
+        parts.append(encoded[:cut].decode('utf-8'))
+        encoded = encoded[cut:]
+        limit = 74
+    return '\r\n '.join(parts) + '\r\n'
+
+
+def write_calendar(events, stamp=None):
+    """Yield an iCalendar document chunk by chunk from an iterable of event documents"""
+    stamp = (stamp or datetime.now(timezone.utc)).strftime('%Y%m%dT%H%M%SZ')
+    yield 'BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//Calendar AI//EN\r\n'
+    for event in events:
+        start = event.get('start')
+        if not isinstance(start, datetime):
+            continue
+        # Events without a time are all-day, written as DATE values
+        all_day = not event.get('time')
+        at = '%Y%m%d' if all_day else '%Y%m%dT%H%M%S'
+        lines = [
+            'BEGIN:VEVENT',
+            f"UID:{_escape(event.get('ical_uid') or str(event['_id']) + UID_SUFFIX)}",
+            f"DTSTAMP:{stamp}",
+            f"DTSTART;VALUE=DATE:{start.strftime(at)}" if all_day else f"DTSTART:{start.strftime(at)}",
+            f"SUMMARY:{_escape(event.get('title', ''))}",
+        ]
+        if event.get('description'):
+            lines.append(f"DESCRIPTION:{_escape(event['description'])}")
+        if event.get('type'):
+            lines.append(f"CATEGORIES:{_escape(event['type'].upper())}")
+        rrule = RECURRENCE_TO_RRULE.get(event.get('recurrence'))
+        if rrule:
+            until = event.get('until')
+            if isinstance(until, datetime):
+                # UNTIL takes the same value type as DTSTART
+                rrule += f";UNTIL={until.strftime(at)}"
+            lines.append(f"RRULE:{rrule}")
+        lines.append('END:VEVENT')
+        yield ''.join(_fold(line) for line in lines)
+    yield 'END:VCALENDAR\r\n'
@@ -0,0 +1,170 @@
+"""Every index the app relies on, and a check that its queries use them.
+
+ensure_indexes() runs at startup. check_query_plans() explains each
+query shape from query_shapes() and fails if any of them would scan a
+whole collection; create_app runs it, once every service has ensured
+its own indexes, when MONGO_CHECK_QUERY_PLANS is set (development and CI).
+"""
+from datetime import datetime, timedelta
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+from app.services.recurrence import RECURRENCE_MONTHS
+from app.utils.dates import range_query
+
+# Server error code for an index that exists with different options
+INDEX_OPTIONS_CONFLICT = 85
+
+INDEXES = {
+    'users': [
+        # Login, signup and password changes all look users up by name
+        IndexModel([('username', ASCENDING)], unique=True),
+    ],
+    'events': [
+        # Month/week/day views are range scans over each user's event start times;
+        # the trailing _id lets /api/events page on (start, _id) without sorting
+        IndexModel([('user_id', ASCENDING), ('start', ASCENDING), ('_id', ASCENDING)]),
+        # Recurring series that started before a window are found separately
+        IndexModel([('user_id', ASCENDING), ('recurrence', ASCENDING), ('start', ASCENDING)]),
+        # iCalendar imports upsert on the file's UID; only imported events have one
+        IndexModel([('user_id', ASCENDING), ('ical_uid', ASCENDING)], unique=True,
+                   partialFilterExpression={'ical_uid': {'$exists': True}}),
+    ],
+    'llm_info': [
+        # Chat history: a user's latest interactions
+        IndexModel([('user_id', ASCENDING), ('created_at', DESCENDING)]),
+    ],
+    'todo_lists': [
+        # The assistant addresses lists by name; names aren't unique per user
+        IndexModel([('user_id', ASCENDING), ('name', ASCENDING)]),
+    ],
+    'daily_facts': [
+        IndexModel([('date', ASCENDING)], unique=True),
+    ],
+    'ai_jobs': [
+        IndexModel([('user_id', ASCENDING), ('state', ASCENDING), ('created_at', ASCENDING)]),
+    ],
+    'leases': [
+        # Expired leases are removed a day after they lapse
+        IndexModel([('expires_at', ASCENDING)], expireAfterSeconds=86400),
+    ],
+}
+
+# Indexes earlier versions created that a manifest index now covers; each
+# one only costs writes, so ensure_indexes() drops them
+RETIRED_INDEXES = {
+    # Replaced by (user_id, start, _id), which serves the same range scans
+    'events': ['user_id_1_start_1'],
+}
+
+
+def ensure_indexes(db):
+    """Create missing INDEXES and drop RETIRED_INDEXES; returns [(collection, index name, error)] for failures.
+
+    A failure, such as existing duplicates blocking a unique index, is
+    reported rather than raised so the app still starts.
+    """
+    failed = []
+    for name, index_names in RETIRED_INDEXES.items():
+        existing = db[name].index_information()
+        for index_name in index_names:
+            if index_name not in existing:
+                continue
+            try:
+                db[name].drop_index(index_name)
+                print(f"Dropped retired index {name}.{index_name}")
+            except OperationFailure as e:
+                print(f"Could not drop index {name}.{index_name}: {e}")
+                failed.append((name, index_name, str(e)))
+    for name, models in INDEXES.items():
+        for model in models:
+            try:
+                db[name].create_indexes([model])
+            except OperationFailure as e:
+                index_name = model.document['name']
+                print(f"Could not create index {name}.{index_name}: {e}")
+                failed.append((name, index_name, str(e)))
+    return failed
+
+
+def ensure_ttl_index(collection, field, seconds):
+    """Create a TTL index on `field`, or change its expiry if one exists with another value.
+
+    TTL expiry is configurable, so these live outside INDEXES and are
+    ensured by the service that owns the collection.
+    """
+    try:
+        collection.create_index([(field, ASCENDING)], expireAfterSeconds=seconds)
+    except OperationFailure as e:
+        if e.code != INDEX_OPTIONS_CONFLICT:
+            raise
+        collection.database.command('collMod', collection.name, index={
+            'keyPattern': {field: 1}, 'expireAfterSeconds': seconds})
+
+
+def query_shapes():
+    """(collection, description, filter, sort) for every query the app issues, with sample values"""
+    user_id = 'explain-user'
+    now = datetime.now()
+    return [
+        ('users', 'login by username', {'username': 'explain-user'}, None),
+        ('events', 'events in a window', range_query(user_id, now, now + timedelta(days=31)),
+         [('start', ASCENDING), ('_id', ASCENDING)]),
+        ('events', 'recurring series before a window', {
+            'user_id': user_id,
+            'recurrence': {'$in': list(RECURRENCE_MONTHS)},
+            'start': {'$lt': now},
+        }, None),
+        ('events', "all of a user's events", {'user_id': user_id}, None),
+        ('events', 'one event', {'_id': ObjectId(), 'user_id': user_id}, None),
+        ('events', 'event by iCalendar UID', {'user_id': user_id, 'ical_uid': 'explain@example.com'}, None),
+        ('event_versions', "a user's event version", {'_id': user_id}, None),
+        ('llm_info', 'recent interactions', {'user_id': user_id}, [('created_at', DESCENDING)]),
+        ('llm_info', 'interactions on a day', {'created_at': {'$gte': now - timedelta(days=1), '$lt': now}},
+         [('created_at', ASCENDING)]),
+        ('todo_lists', "a user's lists", {'user_id': user_id}, None),
+        ('todo_lists', 'list by name', {'user_id': user_id, 'name': 'Groceries'}, None),
+        ('todo_lists', 'lists by name', {'user_id': user_id, 'name': {'$in': ['Groceries', 'Work']}}, None),
+        ('todo_lists', 'one list', {'_id': ObjectId(), 'user_id': user_id}, None),
+        ('todo_versions', "a user's to-do version", {'_id': user_id}, None),
+        ('daily_facts', 'fact for a day', {'date': now.strftime('%Y-%m-%d')}, None),
+        ('ai_jobs', 'pending jobs', {'user_id': user_id, 'state': {'$in': ['queued', 'running']}},
+         [('created_at', ASCENDING)]),
+        ('ai_jobs', 'one job', {'_id': ObjectId(), 'user_id': user_id}, None),
+        ('leases', 'expired lease', {'_id': 'daily_fact:explain', 'expires_at': {'$lt': now}}, None),
+    ]
+
+
+def _stages(plan):
+    """Every stage name in an explain plan tree"""
+    if isinstance(plan, dict):
+        if 'stage' in plan:
+            yield plan['stage']
+        for value in plan.values():
+            yield from _stages(value)
+    elif isinstance(plan, list):
+        for value in plan:
+            yield from _stages(value)
+
+
+def collection_scans(db):
+    """Descriptions of the query shapes whose winning plan includes a COLLSCAN"""
+    scans = []
+    for name, description, query, sort in query_shapes():
+        cursor = db[name].find(query).limit(1)
+        if sort:
+            cursor = cursor.sort(sort)
+        plan = cursor.explain().get('queryPlanner', {}).get('winningPlan', {})
+        if 'COLLSCAN' in _stages(plan):
+            scans.append(f"{name}: {description}")
+    return scans
+
+
+class QueryPlanError(RuntimeError):
+    """Raised by check_query_plans() when a query shape scans a whole collection"""
+
+
+def check_query_plans(db):
+    scans = collection_scans(db)
+    if scans:
+        raise QueryPlanError("Queries without a usable index: " + '; '.join(scans))
@@ -0,0 +1,280 @@
+"""Rule-based parsing of simple calendar commands so they can skip the LLM.
+
+parse() recognises a few unambiguous shapes - "remind me to X <when>",
+"schedule/add X <when>" and "add X to <list>" - and returns the same
+{output_llm, event_data, todo_data} structure the model is asked for.
+Anything it isn't sure about (no time, a bare "at 5", repeats, edits,
+several dates, unknown lists, questions, or any date or time word left
+over once the date and time it understood are taken out) returns None and
+goes to the LLM as before. Dates resolve the way the prompt's date table
+describes.
+"""
+import re
+from datetime import date, timedelta
+from app.utils.enums import EventType
+from app.utils.dates import DATE_FORMAT
+
+WEEKDAYS = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
+MONTHS = {name: i + 1 for i, name in enumerate([
+    'january', 'february', 'march', 'april', 'may', 'june', 'july',
+    'august', 'september', 'october', 'november', 'december'])}
+MONTHS.update({name[:3]: number for name, number in list(MONTHS.items())})
+MONTHS['sept'] = 9
+NUMBERS = {'a': 1, 'an': 1, 'one': 1, 'two': 2, 'three': 3, 'four': 4, 'five': 5, 'six': 6, 'seven': 7}
+
+MAX_WORDS = 25
+MAX_TITLE_WORDS = 10
+
+_MONTH = '|'.join(sorted(MONTHS, key=len, reverse=True))
+_WEEKDAY = '|'.join(WEEKDAYS)
+_NUMBER = r'\d+|' + '|'.join(NUMBERS)
+
+# Anything hinting at repeats, edits, conditions or a question is left to the LLM
+UNSURE_RE = re.compile(
+    r"\b(every|each|daily|weekly|monthly|yearly|annually|until|unless|or|not|don't|cancel|delete|"
+    r"remove|move|reschedule|change|rename|instead|if|between|from|what|when|which|who|how|"
+    r"show|complete|done)\b|\?", re.I)
+
+REMINDER_RE = re.compile(
+    r"^(?:please\s+)?(?:(?:can|could|would) you\s+)?(?:remind me|(?:set|create|add|make)\s+(?:me\s+)?an?\s+reminder)\b"
+    r"(?:\s+(?:to|about|for)\b)?", re.I)
+EVENT_RE = re.compile(
+    r"^(?:please\s+)?(?:(?:can|could|would) you\s+)?(?:schedule|book|add|create|put|set up|plan)\b"
+    r"(?:\s+(?:a|an|the|new)\b)*"
+    r"(?:\s+(?P<type>event|task)\b(?:\s+(?:called|named|titled|to|for)\b|\s*:)?)?", re.I)
+TODO_RE = re.compile(r"^(?:please\s+)?(?:(?:can|could|would) you\s+)?(?:add|put)\s+(?P<rest>.+?)[.!]?$", re.I)
+LIST_SPLIT_RE = re.compile(r"\s+(?:to|on|onto|into|in)\s+(?:my\s+|the\s+)?", re.I)
+LIST_SUFFIX_RE = re.compile(r"\s+list$", re.I)
+CALENDAR_RE = re.compile(r"\b(?:to|on|in|into)\s+(?:my|the)\s+calendar\b", re.I)
+
+# Date and time words; any left after _when() has taken out the date and
+# time it understood means part of the "when" was not understood
+# ("next week", "on mondays", "tomorrow morning"), so the LLM decides
+TEMPORAL_RE = re.compile(
+    rf"\b(?:(?:{_WEEKDAY})s?|mon|tues?|wed|thu|thurs?|fri|sat|sun|{_MONTH}|"
+    r"today|tomorrow|tmrw|tonight|yesterday|days?|weeks?|weekends?|weekdays?|fortnights?|months?|years?|"
+    r"mornings?|afternoons?|evenings?|noon|midday|midnight|hours?|hrs?|minutes?|mins?|"
+    r"[ap]\.?m|o'?clock|next|last|later|soon|early|late|ago|eod|asap)\b", re.I)
+# "night" is left to titles ("movie night") unless it follows a day
+NIGHT_RE = re.compile(rf"\b(?:today|tomorrow|tmrw|(?:{_WEEKDAY})|this|next|last)\s+night\b", re.I)
+
+MERIDIEM_HINT_RE = re.compile(r"\b(?:in the|this)\s+(morning|afternoon|evening)\b|\b(tonight)\b", re.I)
+TIME_PATTERNS = [
+    re.compile(r"\b(?:at\s+)?(?P<word>noon|midday|midnight)\b", re.I),
+    re.compile(r"\b(?:at\s+)?(?P<hour>\d{1,2})(?:[:.](?P<minute>\d{2}))?\s*(?P<ampm>[ap])\.?m\b\.?", re.I),
+    re.compile(r"\b(?:at\s+)?(?P<hour>\d{1,2}):(?P<minute>\d{2})\b", re.I),
+    re.compile(r"\bat\s+(?P<hour>\d{1,2})\b(?!\s*(?:st|nd|rd|th)\b)", re.I),
+]
+DATE_PATTERNS = [
+    ('relative', re.compile(r"\b(?:the\s+)?day after tomorrow\b", re.I)),
+    ('relative', re.compile(r"\b(?:tomorrow|tmrw|today|tonight)\b", re.I)),
+    ('offset', re.compile(rf"\bin\s+(?P<count>{_NUMBER})\s+(?P<unit>days?|weeks?)\b(?:'?\s+time\b)?", re.I)),
+    ('iso', re.compile(r"\b(?:on\s+)?(?P<year>\d{4})-(?P<month>\d{2})-(?P<day>\d{2})\b", re.I)),
+    ('day_month', re.compile(
+        rf"\b(?:on\s+)?(?:the\s+)?(?P<day>\d{{1,2}})(?:st|nd|rd|th)?\s+(?:of\s+)?(?P<month>{_MONTH})\.?"
+        rf"(?:,?\s+(?P<year>\d{{4}}))?\b", re.I)),
+    ('month_day', re.compile(
+        rf"\b(?:on\s+)?(?P<month>{_MONTH})\.?\s+(?P<day>\d{{1,2}})(?:st|nd|rd|th)?(?:,?\s+(?P<year>\d{{4}}))?\b", re.I)),
+    ('weekday', re.compile(rf"\b(?:on\s+)?(?:(?P<which>this|next|coming)\s+)?(?P<weekday>{_WEEKDAY})\b", re.I)),
+]
+
+
+def _extract(text, patterns):
+    """Pull every match of `patterns` out of text; returns (matches, remaining text)"""
+    found = []
+    for pattern in patterns:
+        key = pattern[0] if isinstance(pattern, tuple) else None
+        regex = pattern[1] if isinstance(pattern, tuple) else pattern
+        for match in regex.finditer(text):
+            found.append((key, match))
+        text = regex.sub(' ', text)
+    return found, text
+
+
+def _resolve_date(kind, match, today):
+    """Date for one date expression, or None if it is ambiguous or invalid"""
+    if kind == 'relative':
+        phrase = match.group(0).lower()
+        if 'after' in phrase:
+            return today + timedelta(days=2)
+        return today + timedelta(days=1) if phrase in ('tomorrow', 'tmrw') else today
+    if kind == 'offset':
+        count = match.group('count').lower()
+        count = NUMBERS[count] if count in NUMBERS else int(count)
+        return today + timedelta(days=count * (7 if match.group('unit').lower().startswith('w') else 1))
+    if kind == 'weekday':
+        days_until = (WEEKDAYS.index(match.group('weekday').lower()) - today.weekday()) % 7
+        if days_until == 0:
+            # "next friday" on a Friday is a week away; a bare "friday" is unclear
+            if not match.group('which') or match.group('which').lower() == 'this':
+                return None
+            days_until = 7
+        return today + timedelta(days=days_until)
+    try:
+        month = int(match.group('month')) if kind == 'iso' else MONTHS[match.group('month').lower()]
+        year = int(match.group('year')) if match.group('year') else today.year
+        resolved = date(year, month, int(match.group('day')))
+    except ValueError:
+        return None
+    if not match.group('year') and resolved < today:
+        try:
+            resolved = resolved.replace(year=today.year + 1)
+        except ValueError:
+            return None
+    return resolved
+
+
+def _resolve_time(match, hint):
+    """'HH:MM' for one time expression, or None if AM/PM can't be told"""
+    groups = match.groupdict()
+    if groups.get('word'):
+        return '00:00' if groups['word'].lower() == 'midnight' else '12:00'
+    hour = int(groups['hour'])
+    minute = int(groups.get('minute') or 0)
+    if minute > 59:
+        return None
+    ampm = (groups.get('ampm') or '').lower()
+    if ampm:
+        if not 1 <= hour <= 12:
+            return None
+        hour = hour % 12 + (12 if ampm == 'p' else 0)
+    elif hour == 0 or 13 <= hour <= 23 or groups['hour'].startswith('0'):
+        pass  # unmistakably 24-hour
+    elif hint and 1 <= hour <= 12:
+        if hint == 'morning':
+            hour %= 12
+        elif hour != 12:
+            hour += 12
+    else:
+        return None
+    if hour > 23:
+        return None
+    return f"{hour:02d}:{minute:02d}"
+
+
+def _when(text, today):
+    """(date, time, remaining text) for exactly one time and at most one date, else None"""
+    if NIGHT_RE.search(text):
+        return None
+    hint_match = MERIDIEM_HINT_RE.search(text)
+    hint = None
+    if hint_match:
+        hint = (hint_match.group(1) or 'evening').lower()
+        # "tonight" also names the day, so leave it for the date patterns
+        if hint_match.group(1):
+            text = MERIDIEM_HINT_RE.sub(' ', text, count=1)
+
+    times, text = _extract(text, TIME_PATTERNS)
+    if len(times) != 1:
+        return None
+    at = _resolve_time(times[0][1], hint)
+    if at is None:
+        return None
+
+    dates, text = _extract(text, DATE_PATTERNS)
+    if len(dates) > 1:
+        return None
+    day = _resolve_date(*dates[0], today) if dates else today
+    if day is None or re.search(r"\d", text) or TEMPORAL_RE.search(text):
+        # Leftover numbers or date words are a "when" we didn't understand
+        return None
+    return day, at, text
+
+
+def _title(text):
+    text = CALENDAR_RE.sub(' ', text)
+    text = re.sub(r"\s+", ' ', text).strip(' ,.!:;-')
+    # Prepositions left dangling where the date or time used to be
+    while True:
+        trimmed = re.sub(r"^(?:to|about|for|on|at|by)\s+|\s+(?:on|at|by|for)$", '', text, flags=re.I)
+        if trimmed == text:
+            break
+        text = trimmed
+    words = text.split()
+    if not words or len(words) > MAX_TITLE_WORDS:
+        return None
+    # A title ending in "with"/"and"/... lost a word to the date parser ("call with Jan 5")
+    if words[-1].lower() in ('with', 'and', 'to', 'the', 'a', 'an', 'of', 'my'):
+        return None
+    return text[0].upper() + text[1:]
+
+
+def _event(title, day, at, event_type):
+    return {
+        'output_llm': f"I've scheduled your {event_type.capitalize()}: '{title}' for "
+                      f"{day.strftime('%A, %B %d')} at {at}. You can view it in your calendar.",
+        'event_data': {
+            'title': title,
+            'description': '',
+            'date': day.strftime(DATE_FORMAT),
+            'time': at,
+            'recurrence': 'none',
+            'type': event_type,
+        },
+        'todo_data': None,
+    }
+
+
+def _list_key(name):
+    """Compare list names ignoring case, spaces and punctuation ("To-Do" == "todo")"""
+    return re.sub(r"[\W_]+", '', name.lower())
+
+
+def _todo(message, list_names):
+    match = TODO_RE.match(message)
+    if not match or list_names is None:
+        return None
+    rest = match.group('rest')
+    names = {_list_key(name): name for name in list_names()}
+    # The last split point whose tail names an existing list wins, so items may contain "to"
+    for split in reversed(list(LIST_SPLIT_RE.finditer(rest))):
+        candidate = rest[split.end():].strip()
+        name = names.get(_list_key(candidate)) or names.get(_list_key(LIST_SUFFIX_RE.sub('', candidate)))
+        if not name:
+            continue
+        items = [item.strip(' .') for item in re.split(r",|\s+and\s+", rest[:split.start()], flags=re.I)]
+        items = [item for item in items if item]
+        if not items:
+            return None
+        return {
+            'output_llm': f"I've added {', '.join(items)} to your '{name}' list.",
+            'event_data': None,
+            'todo_data': {
+                'action': 'add_item',
+                'list_name': name,
+                'item_text': ', '.join(items),
+                'item_index': None,
+            },
+        }
+    return None
+
+
+def parse(message, now, list_names=None):
+    """Response dict for a simple command, or None to fall through to the LLM.
+
+    `list_names` is a callable returning the user's to-do list names; it is
+    only called for messages shaped like "add X to Y".
+    """
+    message = message.strip()
+    if not message or len(message.split()) > MAX_WORDS or UNSURE_RE.search(message):
+        return None
+
+    todo = _todo(message, list_names)
+    if todo:
+        return todo
+
+    today = now.date()
+    for regex, default_type in ((REMINDER_RE, EventType.REMINDER.value), (EVENT_RE, EventType.EVENT.value)):
+        match = regex.match(message)
+        if not match:
+            continue
+        when = _when(message[match.end():], today)
+        if when is None:
+            return None
+        day, at, rest = when
+        title = _title(rest)
+        if title is None:
+            return None
+        event_type = (match.groupdict().get('type') or default_type).lower()
+        return _event(title, day, at, event_type)
+    return None
@@ -0,0 +1,205 @@
+import gzip
+import os
+import socket
+import threading
+import uuid
+from datetime import datetime, timedelta
+from bson import json_util
+from bson.json_util import RELAXED_JSON_OPTIONS
+from pymongo import ASCENDING
+from pymongo.errors import DuplicateKeyError
+from app.services import leases
+from app.services.indexes import ensure_ttl_index
+
+# Longest TTL the server accepts; keeps everything until the first archive pass
+HOLD_SECONDS = 2 ** 31 - 1
+
+
+class InteractionLog:
+    """The llm_info interaction log, kept to a bounded working set.
+
+    Raw interactions expire `retention_days` after they were created (TTL
+    on created_at). Every write also updates a per-user rollup in
+    llm_info_rollups holding the interaction count, first/last times and
+    the last `rollup_messages` exchanges, which is what chat history is
+    served from. When `archive_dir` is set, a background thread writes
+    each complete day of interactions to llm_info-YYYY-MM-DD.ndjson.gz
+    there before it can expire; a lease keeps it to one worker at a time.
+    """
+
+    def __init__(self, retention_days=90, rollup_messages=20, archive_dir=None,
+                 archive_after_days=1, archive_interval_minutes=360):
+        self.retention_days = retention_days
+        self.rollup_messages = rollup_messages
+        self.archive_dir = archive_dir
+        self.archive_after_days = archive_after_days
+        self.archive_interval_minutes = archive_interval_minutes
+        self.interactions = None
+        self.rollups = None
+        self.leases = None
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.stopping = threading.Event()
+
+    def init_app(self, app):
+        """Initialize the log with app configuration and start the archiver"""
+        # A TTL of 0 would expire every interaction as soon as it is written
+        self.retention_days = max(app.config.get('LLM_INFO_RETENTION_DAYS', self.retention_days), 1)
+        self.rollup_messages = app.config.get('LLM_INFO_ROLLUP_MESSAGES', self.rollup_messages)
+        self.archive_dir = app.config.get('LLM_INFO_ARCHIVE_DIR', self.archive_dir)
+        self.archive_after_days = app.config.get('LLM_INFO_ARCHIVE_AFTER_DAYS', self.archive_after_days)
+        self.archive_interval_minutes = app.config.get('LLM_INFO_ARCHIVE_INTERVAL_MINUTES',
+                                                       self.archive_interval_minutes)
+        self.interactions = app.repo.llm_info
+        self.rollups = app.repo.llm_info_rollups
+        self.leases = app.repo.leases
+
+        if not self.archive_dir:
+            ensure_ttl_index(self.interactions, 'created_at', self.retention_days * 86400)
+            return
+        if self.archive_after_days >= self.retention_days:
+            print(f"LLM_INFO_ARCHIVE_AFTER_DAYS ({self.archive_after_days}) is not below "
+                  f"LLM_INFO_RETENTION_DAYS ({self.retention_days}); interactions may expire unarchived")
+        if not self._has_ttl_index():
+            # First start with archiving: the index is needed for the archive's day
+            # scans, but nothing may expire before it has run, so the configured
+            # expiry is only applied after the first archive pass
+            ensure_ttl_index(self.interactions, 'created_at', HOLD_SECONDS)
+        os.makedirs(self.archive_dir, exist_ok=True)
+        threading.Thread(target=self._schedule, name='llm-info-archive', daemon=True).start()
+
+    def _has_ttl_index(self):
+        return any(info.get('key') == [('created_at', 1)] and 'expireAfterSeconds' in info
+                   for info in self.interactions.index_information().values())
+
+    def record(self, interaction):
+        """Save an interaction and fold it into its user's rollup; returns the rollup's new version"""
+        self.interactions.insert_one(interaction)
+        user_id = interaction['user_id']
+        update = {
+            '$inc': {'count': 1},
+            '$min': {'first_at': interaction['created_at']},
+            '$max': {'last_at': interaction['created_at']},
+            '$push': {'recent': {'$each': [self._entry(interaction)], '$slice': -self.rollup_messages}},
+        }
+        try:
+            before = self.rollups.find_one_and_update({'_id': user_id}, update, {'count': 1}, upsert=True)
+        except DuplicateKeyError:
+            # Another request created this user's rollup at the same moment
+            before = self.rollups.find_one_and_update({'_id': user_id}, update, {'count': 1})
+        if before is None:
+            # First rollup write for this user: take in the history that predates rollups
+            self._backfill(user_id, interaction['created_at'])
+            return self.version(user_id)
+        return before.get('count', 0) + 1
+
+    def version(self, user_id):
+        """The user's rollup version: its interaction count, which every record() increments"""
+        rollup = self.rollups.find_one({'_id': user_id}, {'count': 1})
+        return rollup.get('count', 0) if rollup else 0
+
+    @staticmethod
+    def _entry(interaction):
+        return {
+            'user_message': interaction.get('user_message'),
+            'output_llm': interaction.get('output_llm'),
+            'created_at': interaction.get('created_at'),
+        }
+
+    def _backfill(self, user_id, before):
+        """Fold the user's interactions from before `before` into their new rollup.
+
+        Requests recording at the same moment push onto the same rollup, so
+        the older history goes in with the same kind of atomic operators,
+        in front of whatever is there, rather than replacing it.
+        """
+        query = {'user_id': user_id, 'created_at': {'$lt': before}}
+        count = self.interactions.count_documents(query)
+        if not count:
+            return
+        older = list(self.interactions.find(query, sort=[('created_at', -1)], limit=self.rollup_messages))
+        first = self.interactions.find_one(query, {'created_at': 1}, sort=[('created_at', 1)])
+        self.rollups.update_one({'_id': user_id}, {
+            '$inc': {'count': count},
+            '$min': {'first_at': first['created_at']},
+            '$push': {'recent': {'$each': [self._entry(doc) for doc in reversed(older)],
+                                 '$position': 0, '$slice': -self.rollup_messages}},
+        })
+
+    def recent(self, user_id, limit):
+        """The user's last `limit` exchanges, oldest first, as (user_message, output_llm) pairs"""
+        return self.recent_at_version(user_id, limit)[1]
+
+    def recent_at_version(self, user_id, limit):
+        """(version, recent exchanges), both read from the same rollup document"""
+        rollup = self.rollups.find_one({'_id': user_id}, {'recent': {'$slice': -limit}, 'count': 1})
+        version = rollup.get('count', 0) if rollup else 0
+        if rollup is not None:
+            entries = rollup.get('recent', [])
+        else:
+            # No chat since rollups were introduced; read the raw log
+            entries = reversed(list(self.interactions.find(
+                {'user_id': user_id},
+                {'user_message': 1, 'output_llm': 1},
+                sort=[('created_at', -1)],
+                limit=limit
+            )))
+        return version, [(entry.get('user_message'), entry.get('output_llm')) for entry in entries]
+
+    def archive_path(self, day):
+        return os.path.join(self.archive_dir, f"llm_info-{day.strftime('%Y-%m-%d')}.ndjson.gz")
+
+    @staticmethod
+    def _day(day):
+        start = datetime.combine(day, datetime.min.time())
+        return {'created_at': {'$gte': start, '$lt': start + timedelta(days=1)}}
+
+    def archive_day(self, day):
+        """Write one day's interactions to a gzipped NDJSON file; returns how many were written"""
+        cursor = self.interactions.find(self._day(day), sort=[('created_at', ASCENDING)])
+        path = self.archive_path(day)
+        partial = path + '.partial'
+        written = 0
+        with gzip.open(partial, 'wt', encoding='utf-8') as out:
+            for doc in cursor:
+                out.write(json_util.dumps(doc, json_options=RELAXED_JSON_OPTIONS))
+                out.write('\n')
+                written += 1
+        if written:
+            # Only a complete file ever appears under the final name
+            os.replace(partial, path)
+        else:
+            os.remove(partial)
+        return written
+
+    def archive_pending(self, now=None):
+        """Archive every complete day at least archive_after_days old that has no archive yet"""
+        now = now or datetime.now()
+        oldest = next(iter(self.interactions.find(
+            {'created_at': {'$type': 'date'}}, {'created_at': 1}, sort=[('created_at', ASCENDING)], limit=1)), None)
+        if not oldest:
+            return 0
+        day = oldest['created_at'].date()
+        last = now.date() - timedelta(days=max(self.archive_after_days, 1))
+        archived = 0
+        while day <= last:
+            # Days without interactions are skipped without opening a file
+            if not os.path.exists(self.archive_path(day)) and self.interactions.count_documents(self._day(day)):
+                count = self.archive_day(day)
+                if count:
+                    print(f"Archived {count} interactions from {day} to {self.archive_path(day)}")
+                    archived += count
+            day += timedelta(days=1)
+        return archived
+
+    def _schedule(self):
+        interval = self.archive_interval_minutes * 60
+        while not self.stopping.is_set():
+            try:
+                if leases.acquire(self.leases, 'llm_info_archive', self.owner, interval):
+                    self.archive_pending()
+                    # Only now is it safe for interactions to start expiring
+                    ensure_ttl_index(self.interactions, 'created_at', self.retention_days * 86400)
+            except Exception as e:
+                print(f"Error archiving llm_info: {e}")
+            if self.stopping.wait(interval):
+                break
@@ -0,0 +1,28 @@
+from datetime import datetime, timedelta
+from pymongo.errors import DuplicateKeyError
+
+
+def acquire(leases, lease_id, owner, seconds):
+    """Take the named lease for `seconds` unless another owner holds an unexpired one.
+
+    Leases live in the leases collection, whose TTL index clears them out
+    a day after they lapse, so at most one thread across all worker
+    processes runs a given piece of background work at a time.
+    """
+    now = datetime.now()
+    lease = {'owner': owner, 'expires_at': now + timedelta(seconds=seconds)}
+    try:
+        leases.insert_one(dict(lease, _id=lease_id))
+        return True
+    except DuplicateKeyError:
+        taken = leases.find_one_and_update(
+            {'_id': lease_id, 'expires_at': {'$lt': now}}, {'$set': lease})
+        return taken is not None
+
+
+def renew(leases, lease_id, owner, seconds):
+    """Extend a lease `owner` still holds to `seconds` from now; False once another owner has taken it"""
+    renewed = leases.find_one_and_update(
+        {'_id': lease_id, 'owner': owner},
+        {'$set': {'expires_at': datetime.now() + timedelta(seconds=seconds)}})
+    return renewed is not None
@@ -0,0 +1,212 @@
+import random
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import ReadTimeoutError
+
+# Responses worth another attempt; anything else is returned or raised as is
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# Recent call latencies kept per provider, and how many are needed before
+# percentiles are trusted
+LATENCY_SAMPLES = 200
+MIN_LATENCY_SAMPLES = 20
+# Outcomes whose elapsed time is how long waiting on the provider cost.
+# Rejected calls never reached it and cancelled ones were cut short, so
+# both would drag the percentiles down
+TIMED_OUTCOMES = ('ok', 'error', 'timeout')
+
+
+def call_outcome(error):
+    """Outcome label for a call that raised `error`"""
+    if isinstance(error, ProviderUnavailable):
+        return 'rejected'
+    # A read timeout mid-stream surfaces as a ConnectionError wrapping urllib3's
+    if isinstance(error, requests.exceptions.Timeout) or (
+            error.args and isinstance(error.args[0], ReadTimeoutError)):
+        return 'timeout'
+    return 'error'
+
+
+def is_outage(status):
+    """Whether a response status says the provider is down or overloaded, as opposed to rejecting the request"""
+    return status == 429 or status >= 500
+
+
+class ProviderUnavailable(requests.exceptions.RequestException):
+    """Raised without touching the network when a provider is unconfigured or its circuit is open"""
+
+
+class CircuitBreaker:
+    """Stops calls to a provider after `threshold` consecutive failures.
+
+    Only outages count as failures: timeouts, connection errors, 429 and
+    5xx responses. A 4xx means the provider is up and answering.
+
+    While open every call fails fast. Once `cooldown` seconds have passed a
+    single trial call is let through; its success closes the circuit and
+    its failure opens it for another cool-down.
+    """
+
+    def __init__(self, threshold=3, cooldown=30.0):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self.trial = False
+        self.lock = threading.Lock()
+
+    def allow(self):
+        with self.lock:
+            if self.opened_at is None:
+                return True
+            if not self.trial and time.monotonic() - self.opened_at >= self.cooldown:
+                self.trial = True
+                return True
+            return False
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial = False
+
+    def release(self):
+        """End a trial call that proved nothing either way, so the next call can try again"""
+        with self.lock:
+            self.trial = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            self.trial = False
+            if self.failures >= self.threshold or self.opened_at is not None:
+                self.opened_at = time.monotonic()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return 'closed'
+        return 'half-open' if self.trial else 'open'
+
+
+class ProviderClient:
+    """Keep-alive HTTP client for one LLM provider endpoint.
+
+    Connections are pooled in a Session shared by all requests, every call
+    has separate connect and read timeouts, connection failures and
+    retryable statuses are retried with jittered exponential backoff, and
+    a CircuitBreaker turns a provider outage into an immediate
+    ProviderUnavailable instead of a timeout per request. Callers wrap each
+    whole call, body included, in timed() so every call's elapsed time and
+    outcome is kept for percentiles and outcome counts.
+    """
+
+    def __init__(self, name, url, headers=None, connect_timeout=3.05, read_timeout=60.0,
+                 retries=2, backoff=0.25, breaker=None, pool_size=10):
+        self.name = name
+        self.url = url
+        self.timeout = (connect_timeout, read_timeout)
+        self.retries = retries
+        self.backoff = backoff
+        self.breaker = breaker or CircuitBreaker()
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        if headers:
+            self.session.headers.update(headers)
+        self.latencies = deque(maxlen=LATENCY_SAMPLES)
+        self.latency_lock = threading.Lock()
+
+    def _sleep(self, attempt):
+        # "Full jitter": spread retries from many workers over the whole backoff window
+        time.sleep(random.uniform(0, self.backoff * 2 ** attempt))
+
+    def post(self, payload, stream=False):
+        """POST JSON and return the successful response; raises RequestException otherwise"""
+        if not self.url:
+            raise ProviderUnavailable(f"{self.name} is not configured")
+        if not self.breaker.allow():
+            raise ProviderUnavailable(f"{self.name} circuit is open")
+
+        for attempt in range(self.retries + 1):
+            try:
+                response = self.session.post(self.url, json=payload, timeout=self.timeout, stream=stream)
+            except requests.exceptions.ConnectionError:
+                # Includes connect timeouts; read timeouts are not retried since
+                # the provider may still be busy generating the first answer
+                if attempt < self.retries:
+                    self._sleep(attempt)
+                    continue
+                self.breaker.record_failure()
+                raise
+            except requests.exceptions.Timeout:
+                self.breaker.record_failure()
+                raise
+            except requests.exceptions.RequestException:
+                # A bad request or URL is our mistake, not a provider outage
+                self.breaker.release()
+                raise
+
+            if response.status_code in RETRY_STATUSES and attempt < self.retries:
+                response.close()
+                self._sleep(attempt)
+                continue
+            try:
+                response.raise_for_status()
+            except requests.exceptions.HTTPError:
+                response.close()
+                if is_outage(response.status_code):
+                    self.breaker.record_failure()
+                else:
+                    # Any other 4xx was answered by a healthy provider
+                    self.breaker.record_success()
+                raise
+            self.breaker.record_success()
+            return response
+
+    @contextmanager
+    def timed(self):
+        """Record how long the enclosed call took and how it ended: ok, error, timeout, rejected or cancelled"""
+        started = time.monotonic()
+        outcome = 'ok'
+        try:
+            yield
+        except GeneratorExit:
+            # A streaming caller stopped reading, e.g. the losing hedged call
+            outcome = 'cancelled'
+            raise
+        except Exception as e:
+            outcome = call_outcome(e)
+            raise
+        finally:
+            self.record_latency(time.monotonic() - started, outcome)
+
+    def record_latency(self, seconds, outcome='ok'):
+        """Remember how long a call took and how it ended"""
+        with self.latency_lock:
+            self.latencies.append((seconds, outcome))
+        if outcome != 'ok':
+            print(f"{self.name} call {outcome} after {seconds * 1000:.0f}ms")  # Debug log
+
+    def outcome_counts(self):
+        """How the recent calls ended, e.g. {'ok': 180, 'timeout': 3}"""
+        with self.latency_lock:
+            return Counter(outcome for _, outcome in self.latencies)
+
+    def percentile(self, fraction, default=None):
+        """Latency at `fraction` (e.g. 0.95) over recent calls, or `default` until enough are seen.
+
+        Failed and timed-out calls count with the time they took to fail.
+        """
+        with self.latency_lock:
+            samples = sorted(seconds for seconds, outcome in self.latencies if outcome in TIMED_OUTCOMES)
+        if len(samples) < MIN_LATENCY_SAMPLES:
+            return default
+        return samples[min(int(len(samples) * fraction), len(samples) - 1)]
+
+    def close(self):
+        self.session.close()
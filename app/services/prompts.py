@@ -0,0 +1,144 @@
+"""Calendar assistant prompt, split by how often each part changes.
+
+The system prompt is CALENDAR_INSTRUCTIONS (fixed for the life of the
+process) followed by date_context() (fixed for a calendar day), so every
+request on the same day sends a byte-identical prefix that Ollama and Groq
+can serve from their prompt caches. Only request_context() - the time,
+upcoming events, recent conversation and the message itself - changes
+per request.
+"""
+from datetime import date, timedelta
+from functools import lru_cache
+from app.utils.enums import EventType
+from app.utils.dates import DATE_FORMAT
+
+CALENDAR_INSTRUCTIONS = """You are an AI assistant for a calendar application. You can help users with:
+- Creating events
+- Managing reminders
+- Scheduling tasks
+- Creating and managing to-do lists (including adding, renaming, and removing to-do lists and items)
+- Showing existing events/reminders/tasks/to-do lists for a specific date, week, or month
+- Answering questions about their calendar
+- Providing calendar-related suggestions
+
+IMPORTANT: You MUST respond in valid JSON format with the following structure:
+{
+    "output_llm": "Your response message here",
+    "event_data": {
+        "title": "...",
+        "description": "...",
+        "date": "YYYY-MM-DD",
+        "time": "HH:MM",
+        "recurrence": "none",
+        "type": "%s"
+    },
+    "todo_data": {
+        "action": "create|add_item|rename|delete|toggle_complete",
+        "list_name": "...",
+        "item_text": "...",
+        "item_index": 0
+    }
+}
+
+To-Do List Handling:
+- If the user wants to create a new to-do list, set "todo_data.action" to "create" and provide "list_name".
+- If the user wants to add an item to a to-do list, set "todo_data.action" to "add_item", provide "list_name" and "item_text".
+- If the user wants to rename a to-do list, set "todo_data.action" to "rename", provide "list_name" (old name) and "item_text" (new name).
+- If the user wants to delete a to-do list, set "todo_data.action" to "delete" and provide "list_name".
+- If the user wants to mark an item as complete/incomplete, set "todo_data.action" to "toggle_complete", provide "list_name" and "item_index".
+- If the user request is not about to-do lists, set "todo_data" to null.
+
+Several actions in one reply:
+- If the user asks for more than one event, reminder or task at once (for example "standup every weekday next week"), put one object per occurrence in an "events" array instead of "event_data". Each object has the same fields as "event_data".
+- If the user asks for more than one to-do action at once, put them in a "todos" array instead of "todo_data". Each object has the same fields as "todo_data"; they are applied in order.
+
+Example of several events:
+{
+    "output_llm": "I've scheduled your standup for Monday to Wednesday at 09:30 AM.",
+    "events": [
+        {"title": "Standup", "description": "", "date": "2026-01-05", "time": "09:30", "recurrence": "none", "type": "event"},
+        {"title": "Standup", "description": "", "date": "2026-01-06", "time": "09:30", "recurrence": "none", "type": "event"},
+        {"title": "Standup", "description": "", "date": "2026-01-07", "time": "09:30", "recurrence": "none", "type": "event"}
+    ],
+    "todo_data": null
+}
+
+Example to-do list response:
+{
+    "output_llm": "I've created a new to-do list called 'Groceries' with items: milk, bread, eggs.",
+    "todo_data": {
+        "action": "create",
+        "list_name": "Groceries",
+        "item_text": "milk, bread, eggs",
+        "item_index": null
+    }
+}
+
+Example responses:
+1. Unclear time:
+{
+    "output_llm": "I need to clarify the time. Would you like to schedule this for 11:00 AM or 11:00 PM?",
+    "event_data": null
+}
+
+2. General greeting:
+{
+    "output_llm": "Hello! How can I help you with your calendar today?",
+    "event_data": null
+}
+""" % ', '.join(t.value for t in EventType)
+
+WEEKDAYS = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
+
+
+@lru_cache(maxsize=4)
+def date_context(day):
+    """Date reference table and dated example for `day`; built once per calendar day"""
+    if day.month == 12:
+        next_month = date(day.year + 1, 1, 1)
+    else:
+        next_month = date(day.year, day.month + 1, 1)
+    lines = [
+        "Current Date Information:",
+        f"- Today's date: {day.strftime(DATE_FORMAT)}",
+        f"- Current date display: {day.strftime('%A, %B %d')}",
+        f"- Current day: {day.strftime('%A')}",
+        f"- Tomorrow's date: {(day + timedelta(days=1)).strftime(DATE_FORMAT)}",
+        f"- Next month's first day: {next_month.strftime(DATE_FORMAT)}",
+        f"- Next month's second day: {(next_month + timedelta(days=1)).strftime(DATE_FORMAT)}",
+    ]
+    for i, name in enumerate(WEEKDAYS):
+        first = next_month + timedelta(days=(i - next_month.weekday()) % 7)
+        lines.append(f"- Next month's first {name.capitalize()}: {first.strftime(DATE_FORMAT)}")
+    for i, name in enumerate(WEEKDAYS):
+        # Today's weekday means the same day next week
+        upcoming = day + timedelta(days=(i - day.weekday()) % 7 or 7)
+        lines.append(f"- Next {name.capitalize()}: {upcoming.strftime(DATE_FORMAT)}")
+
+    example = f"""Example of creating a reminder:
+{{
+    "output_llm": "I've scheduled your Reminder: 'Bathing' for {day.strftime('%A, %B %d')} at 11:00 AM. You can view it in your calendar.",
+    "event_data": {{
+        "title": "Bathing",
+        "description": "Daily bathing reminder",
+        "date": "{day.strftime(DATE_FORMAT)}",
+        "time": "11:00",
+        "recurrence": "none",
+        "type": "reminder"
+    }}
+}}
+"""
+    return '\n'.join(lines) + '\n\n' + example
+
+
+def system_prompt(now):
+    """Static instructions plus today's date block; identical for every request on a day"""
+    return f"{CALENDAR_INSTRUCTIONS}\n{date_context(now.date())}"
+
+
+def request_context(now, conversation_context, upcoming_context, user_message):
+    """The part of the prompt that changes from one request to the next"""
+    return (f"Current time: {now.strftime('%H:%M')}\n\n"
+            f"{upcoming_context}\n\n"
+            f"{conversation_context}\n"
+            f"User: {user_message}\nAssistant:")
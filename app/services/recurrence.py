@@ -0,0 +1,132 @@
+import calendar
+from datetime import datetime, timedelta, MAXYEAR
+from app.utils.dates import range_query
+
+# Months between occurrences for each recurrence the UI offers
+RECURRENCE_MONTHS = {
+    'monthly': 1,
+    'quarterly': 3,
+    'half yearly': 6,
+    'yearly': 12,
+}
+ALLOWED_RECURRENCES = ['none'] + list(RECURRENCE_MONTHS)
+
+
+def _shift_months(start, months):
+    """start moved forward by whole months, or None if that month lacks the day.
+
+    A series on the 31st skips months without a 31st instead of drifting,
+    which is also how the calendar grid only has cells for real days.
+    """
+    month_index = start.month - 1 + months
+    year = start.year + month_index // 12
+    month = month_index % 12 + 1
+    if start.day > calendar.monthrange(year, month)[1]:
+        return None
+    return start.replace(year=year, month=month)
+
+
+def next_occurrence(start, recurrence, after):
+    """First occurrence of a series at or after `after`, computed in closed form.
+
+    Jumps straight to the right period instead of stepping from the
+    series start, so the cost does not depend on how old the series is.
+    Returns None for non-recurring events that started before `after`.
+    """
+    if start >= after:
+        return start
+    period = RECURRENCE_MONTHS.get(recurrence)
+    if not period:
+        return None
+
+    months_since = (after.year - start.year) * 12 + (after.month - start.month)
+    n = months_since // period
+    # At most a couple of candidates are needed: the period containing
+    # `after` may fall earlier in the month or land on a missing day.
+    while True:
+        candidate = _shift_months(start, n * period)
+        if candidate is not None and candidate >= after:
+            return candidate
+        n += 1
+
+
+def nth_occurrence(start, recurrence, n):
+    """The n-th (1-based) occurrence of a series, or None if it would fall after year 9999"""
+    period = RECURRENCE_MONTHS[recurrence]
+    months, found = 0, 0
+    while start.year + (start.month - 1 + months) // 12 <= MAXYEAR:
+        candidate = _shift_months(start, months)
+        if candidate is not None:
+            found += 1
+            if found >= n:
+                return candidate
+        months += period
+    return None
+
+
+def occurrences(start, recurrence, window_start, window_end, until=None):
+    """Yield occurrence datetimes of a series within [window_start, window_end), none after `until`"""
+    if until is not None:
+        window_end = min(window_end, until + timedelta(microseconds=1))
+    current = next_occurrence(start, recurrence, window_start)
+    period = RECURRENCE_MONTHS.get(recurrence)
+    if current is None:
+        return
+    n = ((current.year - start.year) * 12 + (current.month - start.month)) // period if period else 0
+    while current is not None and current < window_end:
+        yield current
+        if not period:
+            return
+        current = None
+        while current is None:
+            n += 1
+            current = _shift_months(start, n * period)
+
+
+def expand_event(event, window_start, window_end):
+    """Occurrences of a stored event inside the window, as event dicts.
+
+    Recurring occurrences carry their own 'date'/'start' and keep the
+    series' original date in 'series_date' so edits target the series.
+    A series with an 'until' datetime (e.g. imported with COUNT or UNTIL)
+    ends at its last occurrence on or before it.
+    """
+    recurrence = event.get('recurrence', 'none')
+    if recurrence not in RECURRENCE_MONTHS:
+        if window_start <= event['start'] < window_end:
+            return [event]
+        return []
+
+    until = event.get('until')
+    if not isinstance(until, datetime):
+        until = None
+    expanded = []
+    for at in occurrences(event['start'], recurrence, window_start, window_end, until):
+        occurrence = dict(event)
+        occurrence['start'] = at
+        occurrence['date'] = at.strftime('%Y-%m-%d')
+        occurrence['series_date'] = event['date']
+        expanded.append(occurrence)
+    return expanded
+
+
+def find_occurrences(events, user_id, window_start, window_end, projection=None):
+    """All of a user's event occurrences in [window_start, window_end), sorted by start.
+
+    One bounded index scan picks up everything starting inside the window,
+    and a second one picks up recurring series that started before it.
+    """
+    in_window = events.find(range_query(user_id, window_start, window_end), projection)
+    earlier_series = events.find({
+        'user_id': user_id,
+        'recurrence': {'$in': list(RECURRENCE_MONTHS)},
+        'start': {'$lt': window_start}
+    }, projection)
+
+    result = []
+    for event in list(in_window) + list(earlier_series):
+        if not isinstance(event.get('start'), datetime):
+            continue
+        result.extend(expand_event(event, window_start, window_end))
+    result.sort(key=lambda e: e['start'])
+    return result
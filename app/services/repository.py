@@ -0,0 +1,57 @@
+from pymongo import MongoClient
+
+COLLECTIONS = ['users', 'events', 'event_versions', 'llm_info', 'llm_info_rollups', 'daily_facts', 'todo_lists', 'todo_versions', 'ai_jobs', 'leases']
+
+
+def client_options(config):
+    """MongoClient keyword arguments from the MONGO_* settings; unset ones keep the driver default"""
+    options = {
+        'maxPoolSize': config.get('MONGO_MAX_POOL_SIZE'),
+        'minPoolSize': config.get('MONGO_MIN_POOL_SIZE'),
+        'maxIdleTimeMS': config.get('MONGO_MAX_IDLE_TIME_MS'),
+        'waitQueueTimeoutMS': config.get('MONGO_WAIT_QUEUE_TIMEOUT_MS'),
+        'connectTimeoutMS': config.get('MONGO_CONNECT_TIMEOUT_MS'),
+        'socketTimeoutMS': config.get('MONGO_SOCKET_TIMEOUT_MS'),
+        'serverSelectionTimeoutMS': config.get('MONGO_SERVER_SELECTION_TIMEOUT_MS'),
+        'readPreference': config.get('MONGO_READ_PREFERENCE'),
+        'appname': config.get('MONGO_APP_NAME'),
+    }
+    write_concern = config.get('MONGO_WRITE_CONCERN')
+    if write_concern:
+        options['w'] = int(write_concern) if str(write_concern).isdigit() else write_concern
+    if config.get('MONGO_JOURNAL'):
+        options['journal'] = True
+    return {name: value for name, value in options.items() if value is not None}
+
+
+class Repository:
+    """The app's single MongoClient and the collections it uses.
+
+    Every route and service reaches MongoDB through here, so each worker
+    process holds one connection pool, and pool size, timeouts, write
+    concern and read preference are tuned in one place (the MONGO_*
+    settings in Config).
+    """
+
+    def __init__(self):
+        self.client = None
+        self.db = None
+
+    def init_app(self, app):
+        """Connect using the app's configuration"""
+        self.connect(app.config)
+
+    def connect(self, config):
+        """Connect using a mapping of settings, e.g. app.config or vars(Config)"""
+        self.client = MongoClient(config['MONGO_URI'], **client_options(config))
+        self.db = self.client[config.get('MONGO_DB_NAME', 'calendar')]
+        for name in COLLECTIONS:
+            setattr(self, name, self.db[name])
+        return self
+
+    def collection(self, name):
+        return self.db[name]
+
+    def close(self):
+        if self.client is not None:
+            self.client.close()
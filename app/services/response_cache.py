@@ -0,0 +1,73 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+
+_SPACE_RE = re.compile(r'\s+')
+_TRAILING_RE = re.compile(r'[\s?!.,;:]+$')
+
+
+def normalize_message(message):
+    """Fold case, quotes, whitespace and trailing punctuation so trivial variants share a key"""
+    text = message.lower().replace('’', "'").replace('‘', "'")
+    return _TRAILING_RE.sub('', _SPACE_RE.sub(' ', text).strip())
+
+
+class ResponseCache:
+    """Bounded LRU of raw assistant replies with a TTL.
+
+    Keys are (user_id, normalised message, fingerprint), where the
+    fingerprint covers whatever else the reply depends on - the calendar
+    day, the user's event and to-do versions and a hash of the
+    conversation context - so a reply is only reused while it was produced
+    from the same inputs. Values are the model's raw text, and callers only
+    store replies with no event or to-do data, so a hit never repeats a
+    write.
+    """
+
+    def __init__(self, max_entries=1024, ttl=300):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def init_app(self, app):
+        """Initialize the cache with app configuration"""
+        self.max_entries = app.config.get('RESPONSE_CACHE_SIZE', self.max_entries)
+        self.ttl = app.config.get('RESPONSE_CACHE_TTL', self.ttl)
+
+    @staticmethod
+    def key(user_id, message, fingerprint):
+        return (user_id, normalize_message(message), fingerprint)
+
+    def get(self, key):
+        """Cached reply for key, or None if missing or expired"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self.entries[key]
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, response):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.ttl, response)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'entries': len(self.entries),
+            }
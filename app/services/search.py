@@ -0,0 +1,517 @@
+import bisect
+import heapq
+import math
+import re
+import threading
+from collections import OrderedDict, Counter
+
+from app.services.todo_actions import ensure_item_ids
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+# Titles count this many times towards a term's frequency
+TITLE_WEIGHT = 2
+# Shortest prefix that is expanded, and how many of the most common
+# completions a prefix expands to
+MIN_PREFIX = 2
+MAX_PREFIX_TERMS = 10
+# AND queries whose rarest group has at most this many postings are scored
+# by scanning that group instead of walking every group best-first
+EXHAUSTIVE_LIMIT = 4096
+# A prefix's completions with at most this many postings are folded into
+# one {key: score} dict per query, so a candidate costs one lookup for all
+# of them instead of one each
+MERGE_LIMIT = 512
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(text.lower()) if text else []
+
+
+def _prepare(group):
+    """(probes, walk, scale) for one query group of [(posting, ranked, idf)].
+
+    probes are the (posting, idf) pairs a candidate is looked up in - its
+    group score is the best of them - and walk yields (-weight, key) best
+    first, a document's score being weight * scale; a key may come round
+    again later with a lower score.
+    """
+    if len(group) == 1:
+        posting, ranked, idf = group[0]
+        return [(posting, idf)], iter(ranked), idf
+    probes, streams, merged = [], [], {}
+    for posting, ranked, idf in group:
+        if len(posting) <= MERGE_LIMIT:
+            for key, weight in posting.items():
+                score = weight * idf
+                if score > merged.get(key, 0):
+                    merged[key] = score
+            continue
+        probes.append((posting, idf))
+        streams.append((neg_weight * idf, key) for neg_weight, key in ranked)
+    if merged:
+        probes.append((merged, 1.0))
+        streams.append(_popping([(-score, key) for key, score in merged.items()]))
+    return probes, streams[0] if len(streams) == 1 else heapq.merge(*streams), 1.0
+
+
+def _popping(heap):
+    # Usually only the head of a merged group is walked, so heapify and pop
+    # rather than sorting it all
+    heapq.heapify(heap)
+    while heap:
+        yield heapq.heappop(heap)
+
+
+def _group_score(probes, key):
+    best = 0
+    for posting, idf in probes:
+        weight = posting.get(key)
+        if weight is not None and weight * idf > best:
+            best = weight * idf
+    return best
+
+
+def _matching(probes, keys):
+    """Keys in any of the probes' postings (and in keys, unless it is None)"""
+    if len(probes) == 1:
+        matched = probes[0][0].keys()
+        return matched if keys is None else keys & matched
+    if keys is None:
+        return set().union(*(posting.keys() for posting, _ in probes))
+    return set().union(*(keys & posting.keys() for posting, _ in probes))
+
+
+def top_documents(groups, limit):
+    """The `limit` best (score, key) pairs among documents matching every group, best first.
+
+    groups come from UserSearchIndex.plan(); nothing here touches the
+    index itself, so scoring needs no lock.
+    """
+    if len(groups) == 1:
+        # A document's score is its best term's, and every top document is
+        # among the top of the term it scores best on
+        best = {}
+        for posting, ranked, idf in groups[0]:
+            for neg_weight, key in ranked[:limit]:
+                if -neg_weight * idf > best.get(key, 0):
+                    best[key] = -neg_weight * idf
+        return heapq.nlargest(limit, ((score, key) for key, score in best.items()))
+
+    prepared = [_prepare(group) for group in groups]
+    probes = [group_probes for group_probes, _, _ in prepared]
+    sizes = [sum(len(posting) for posting, _ in group_probes) for group_probes in probes]
+
+    if min(sizes) <= EXHAUSTIVE_LIMIT:
+        # A short group bounds the result: intersect key sets (in C) down to
+        # the documents matching every group, then score just those
+        order = sorted(range(len(probes)), key=sizes.__getitem__)
+        keys = _matching(probes[order[0]], None)
+        for g in order[1:]:
+            keys = _matching(probes[g], keys)
+        scored = []
+        for key in keys:
+            total = 0
+            for group_probes in probes:
+                if len(group_probes) == 1:
+                    posting, idf = group_probes[0]
+                    total += posting[key] * idf
+                else:
+                    total += _group_score(group_probes, key)
+            scored.append((total, key))
+        return heapq.nlargest(limit, scored)
+
+    # Threshold algorithm: walk every group best-first in turn, score each
+    # new candidate fully by probing the other groups, and stop once the
+    # k-th best total beats the sum of the scores still ahead in each walk.
+    # Every matching document shows up in each walk, so the walk over the
+    # smallest group running out also ends the search.
+    # Probing is inlined for the usual single-term groups; it is most of
+    # the work
+    single = [group_probes[0] if len(group_probes) == 1 else (None, 0) for group_probes in probes]
+    heads = [float('inf')] * len(groups)
+    seen = set()
+    top = []  # min-heap of (score, key)
+    exhausted = False
+    while not exhausted:
+        for g, (_, walk, scale) in enumerate(prepared):
+            step = next(walk, None)
+            if step is None:
+                exhausted = True
+                break
+            heads[g] = total = -step[0] * scale
+            key = step[1]
+            if key in seen:
+                continue
+            seen.add(key)
+            # The first time a walk meets a key is at its best score there
+            for h, (posting, idf) in enumerate(single):
+                if h == g:
+                    continue
+                if posting is not None:
+                    weight = posting.get(key)
+                    if weight is None:
+                        break
+                    total += weight * idf
+                else:
+                    best = _group_score(probes[h], key)
+                    if not best:
+                        break
+                    total += best
+            else:
+                if len(top) < limit:
+                    heapq.heappush(top, (total, key))
+                elif total > top[0][0]:
+                    heapq.heapreplace(top, (total, key))
+        if len(top) == limit and top[0][0] >= sum(heads):
+            break
+    top.sort(reverse=True)
+    return top
+
+
+class UserSearchIndex:
+    """Inverted index over one user's events and to-do items.
+
+    Postings store each document's BM25 term-frequency weight, computed
+    against the average document length when it was indexed, so a query
+    only multiplies by idf. rank_all() orders every term's postings by
+    descending weight, which lets a query walk candidates best-first and
+    stop as soon as nothing further down can reach the current top results.
+
+    From rank_all() on, writes never change a posting or ranked list in
+    place: they swap in an updated copy. plan() takes references to what a
+    query needs and top_documents() scores them without holding any lock,
+    on a snapshot later writes cannot disturb.
+    """
+
+    def __init__(self, avg_length=1.0):
+        self.docs = {}          # key -> (terms, payload)
+        self.postings = {}      # term -> {key: weight}
+        self.todo_items = {}    # list_id -> keys of its indexed items
+        self.avg_length = avg_length
+        self.sorted_terms = None
+        self.ranked = {}        # term -> [(-weight, key)] ascending
+        self.ranking = False
+
+    def _weights(self, terms):
+        length = sum(terms.values())
+        norm = K1 * (1 - B + B * length / self.avg_length)
+        return {term: tf * (K1 + 1) / (tf + norm) for term, tf in terms.items()}
+
+    def add(self, key, text_fields, payload):
+        """Index a document; text_fields is [(text, weight), ...]"""
+        self.remove(key)
+        terms = Counter()
+        for text, weight in text_fields:
+            for token in tokenize(text):
+                terms[token] += weight
+        self.docs[key] = (terms, payload)
+        for term, weight in self._weights(terms).items():
+            posting = self.postings.get(term)
+            if posting is None:
+                posting = {}
+                if self.sorted_terms is not None:
+                    bisect.insort(self.sorted_terms, term)
+            elif self.ranking:
+                posting = dict(posting)
+            posting[key] = weight
+            self.postings[term] = posting
+            if self.ranking:
+                ranked = list(self.ranked.get(term, ()))
+                bisect.insort(ranked, (-weight, key))
+                self.ranked[term] = ranked
+
+    def remove(self, key):
+        entry = self.docs.pop(key, None)
+        if not entry:
+            return
+        for term in entry[0]:
+            posting = self.postings.get(term)
+            if posting is None or key not in posting:
+                continue
+            if len(posting) == 1:
+                del self.postings[term]
+                self.ranked.pop(term, None)
+                if self.sorted_terms is not None:
+                    del self.sorted_terms[bisect.bisect_left(self.sorted_terms, term)]
+                continue
+            if self.ranking:
+                posting = dict(posting)
+                self.postings[term] = posting
+            weight = posting.pop(key)
+            ranked = self.ranked.get(term)
+            if ranked is not None:
+                i = bisect.bisect_left(ranked, (-weight, key))
+                if i < len(ranked) and ranked[i][1] == key:
+                    self.ranked[term] = ranked[:i] + ranked[i + 1:]
+
+    def set_payload(self, key, payload):
+        """Replace a document's payload without reindexing its text"""
+        entry = self.docs.get(key)
+        if entry:
+            self.docs[key] = (entry[0], payload)
+
+    def _idf(self, term):
+        df = len(self.postings.get(term, ()))
+        return math.log(1 + (len(self.docs) - df + 0.5) / (df + 0.5))
+
+    def _expand(self, prefix):
+        """Most common indexed terms starting with prefix"""
+        if self.sorted_terms is None:
+            self.sorted_terms = sorted(self.postings)
+        lo = bisect.bisect_left(self.sorted_terms, prefix)
+        hi = bisect.bisect_left(self.sorted_terms, prefix + '\U0010ffff')
+        matches = self.sorted_terms[lo:hi]
+        if len(matches) > MAX_PREFIX_TERMS:
+            matches = heapq.nlargest(MAX_PREFIX_TERMS, matches, key=lambda t: len(self.postings[t]))
+        return matches
+
+    def rank_all(self):
+        """Order every term's postings (and the vocabulary) once; later writes keep them ordered"""
+        self.ranked = {term: sorted((-w, k) for k, w in posting.items())
+                       for term, posting in self.postings.items()}
+        self.ranking = True
+        self.sorted_terms = sorted(self.postings)
+
+    def _ranked(self, term):
+        ranked = self.ranked.get(term)
+        if ranked is None:
+            ranked = sorted((-w, k) for k, w in self.postings[term].items())
+            self.ranked[term] = ranked
+        return ranked
+
+    def plan(self, query, prefix=True):
+        """[(posting, ranked, idf)] per query term (its completions, for a prefix), or None if a term matches nothing.
+
+        With prefix=True the last term also matches the most common words
+        it begins, so results update as the user types.
+        """
+        tokens = tokenize(query)
+        if not tokens:
+            return None
+        last_is_prefix = prefix and len(tokens[-1]) >= MIN_PREFIX and not query[-1:].isspace()
+
+        groups = []
+        for i, token in enumerate(tokens):
+            if i == len(tokens) - 1 and last_is_prefix:
+                terms = self._expand(token)
+            else:
+                terms = [token] if token in self.postings else []
+            if not terms:
+                return None
+            groups.append([(self.postings[t], self._ranked(t), self._idf(t)) for t in terms])
+        return groups
+
+    def payloads(self, top):
+        """(score, payload) for scored keys still in the index"""
+        return [(score, self.docs[key][1]) for score, key in top if key in self.docs]
+
+    def search(self, query, limit=20, prefix=True):
+        """Top documents containing every query term, ranked by BM25"""
+        groups = self.plan(query, prefix)
+        return self.payloads(top_documents(groups, limit)) if groups else []
+
+
+def event_fields(event):
+    return [(event.get('title', ''), TITLE_WEIGHT), (event.get('description', ''), 1)]
+
+
+def event_payload(event):
+    return {
+        'kind': 'event',
+        'event_id': str(event['_id']),
+        'title': event.get('title', ''),
+        'date': event.get('date'),
+        'time': event.get('time'),
+    }
+
+
+class SearchService:
+    """Per-user in-memory search over events and to-do items.
+
+    A user's index is built from Mongo on their first search and then kept
+    current by the write paths, which call the index_*/remove_* hooks; the
+    hooks are no-ops for users whose index isn't loaded. Indexes live in a
+    bounded LRU.
+    """
+
+    def __init__(self, max_users=256):
+        self.max_users = max_users
+        self.repo = None
+        self.indexes = OrderedDict()
+        self.versions = {}
+        self.lock = threading.Lock()
+
+    def init_app(self, app):
+        """Initialize the service with app configuration"""
+        self.max_users = app.config.get('SEARCH_MAX_USERS', self.max_users)
+        self.repo = app.repo
+
+    def _build(self, user_id):
+        events = list(self.repo.events.find(
+            {'user_id': user_id}, {'title': 1, 'description': 1, 'date': 1, 'time': 1}))
+        todo_lists = [ensure_item_ids(self.repo.todo_lists, lst)
+                      for lst in self.repo.todo_lists.find({'user_id': user_id})]
+
+        lengths = [sum(len(tokenize(text)) * w for text, w in event_fields(e)) for e in events]
+        lengths += [len(tokenize(item.get('text', ''))) for lst in todo_lists for item in lst.get('items', [])]
+        index = UserSearchIndex(avg_length=max(sum(lengths) / len(lengths), 1.0) if lengths else 1.0)
+        for event in events:
+            index.add(('event', str(event['_id'])), event_fields(event), event_payload(event))
+        for todo_list in todo_lists:
+            self._add_todo_list(index, todo_list)
+        index.rank_all()
+        return index
+
+    def _loaded(self, user_id):
+        # Every hook goes through here, so this is where writes are counted
+        self.versions[user_id] = self.versions.get(user_id, 0) + 1
+        index = self.indexes.get(user_id)
+        if index is not None:
+            self.indexes.move_to_end(user_id)
+        return index
+
+    def search(self, user_id, query, limit=20, prefix=True):
+        """Only the lookups hold the lock; scoring runs on a snapshot of the postings"""
+        with self.lock:
+            index = self.indexes.get(user_id)
+            if index is not None:
+                self.indexes.move_to_end(user_id)
+                groups = index.plan(query, prefix)
+            else:
+                version = self.versions.get(user_id, 0)
+
+        if index is None:
+            # Build outside the lock so one cold user doesn't stall everyone else
+            index = self._build(user_id)
+            with self.lock:
+                # A write landed mid-build; answer from this index but don't keep it
+                if version == self.versions.get(user_id, 0):
+                    self.indexes[user_id] = index
+                    while len(self.indexes) > self.max_users:
+                        self.indexes.popitem(last=False)
+                groups = index.plan(query, prefix)
+
+        if not groups:
+            return []
+        top = top_documents(groups, limit)
+        with self.lock:
+            results = index.payloads(top)
+        return [dict(payload, score=round(score, 4)) for score, payload in results]
+
+    def index_event(self, user_id, event):
+        with self.lock:
+            index = self._loaded(user_id)
+            if index is not None:
+                index.add(('event', str(event['_id'])), event_fields(event), event_payload(event))
+
+    def remove_event(self, user_id, event_id):
+        with self.lock:
+            index = self._loaded(user_id)
+            if index is not None:
+                index.remove(('event', str(event_id)))
+
+    @staticmethod
+    def _remove_todo_list(index, list_id):
+        for key in index.todo_items.pop(list_id, ()):
+            index.remove(key)
+
+    @staticmethod
+    def _add_todo_item(index, list_id, list_name, item, position=None):
+        # Items are keyed by id so single-item writes can patch just their entry;
+        # the position only stands in for items a backfill hasn't reached yet
+        key = ('todo', list_id, item.get('id', position))
+        index.add(key, [(item.get('text', ''), 1)], {
+            'kind': 'todo',
+            'list_id': list_id,
+            'list_name': list_name,
+            'item_id': item.get('id'),
+            'text': item.get('text', ''),
+            'completed': item.get('completed', False),
+        })
+        index.todo_items.setdefault(list_id, set()).add(key)
+
+    @classmethod
+    def _add_todo_list(cls, index, todo_list):
+        list_id = str(todo_list['_id'])
+        cls._remove_todo_list(index, list_id)
+        index.todo_items[list_id] = set()
+        for i, item in enumerate(todo_list.get('items', [])):
+            cls._add_todo_item(index, list_id, todo_list.get('name', ''), item, i)
+
+    def index_todo_list(self, user_id, todo_list):
+        """Reindex every item of a to-do list, e.g. one just created"""
+        with self.lock:
+            index = self._loaded(user_id)
+            if index is not None:
+                self._add_todo_list(index, todo_list)
+
+    def index_todo_item(self, user_id, list_id, list_name, item):
+        """Index one item added to (or replaced in) a list"""
+        list_id = str(list_id)
+        with self.lock:
+            index = self._loaded(user_id)
+            if index is not None:
+                self._add_todo_item(index, list_id, list_name, item)
+
+    def remove_todo_item(self, user_id, list_id, item_id):
+        list_id = str(list_id)
+        key = ('todo', list_id, item_id)
+        with self.lock:
+            index = self._loaded(user_id)
+            if index is not None:
+                index.remove(key)
+                index.todo_items.get(list_id, set()).discard(key)
+
+    def set_todo_item_completed(self, user_id, list_id, item_id, completed):
+        """Update the completed flag an item is shown with; its text is unchanged"""
+        key = ('todo', str(list_id), item_id)
+        with self.lock:
+            index = self._loaded(user_id)
+            if index is not None and key in index.docs:
+                index.set_payload(key, dict(index.docs[key][1], completed=completed))
+
+    def rename_todo_list(self, user_id, list_id, name):
+        """Update the list name its items are shown with; their text is unchanged"""
+        list_id = str(list_id)
+        with self.lock:
+            index = self._loaded(user_id)
+            if index is not None:
+                for key in index.todo_items.get(list_id, ()):
+                    index.set_payload(key, dict(index.docs[key][1], list_name=name))
+
+    def refresh_todo_lists_named(self, user_id, names):
+        """Re-read and reindex the lists a write addressed by name, if this user's index is loaded"""
+        names = set(names)
+        with self.lock:
+            self.versions[user_id] = self.versions.get(user_id, 0) + 1
+            loaded = user_id in self.indexes
+        if not loaded or not names:
+            return
+        todo_lists = list(self.repo.todo_lists.find({'user_id': user_id, 'name': {'$in': list(names)}}))
+        with self.lock:
+            index = self._loaded(user_id)
+            if index is None:
+                return
+            stale = {key[1] for key, (_, payload) in index.docs.items()
+                     if key[0] == 'todo' and payload['list_name'] in names}
+            for list_id in stale:
+                self._remove_todo_list(index, list_id)
+            for todo_list in todo_lists:
+                self._add_todo_list(index, todo_list)
+
+    def remove_todo_list(self, user_id, list_id):
+        list_id = str(list_id)
+        with self.lock:
+            index = self._loaded(user_id)
+            if index is not None:
+                self._remove_todo_list(index, list_id)
+
+    def invalidate(self, user_id):
+        """Drop a user's index so the next search rebuilds it, e.g. after bulk writes"""
+        with self.lock:
+            self.versions[user_id] = self.versions.get(user_id, 0) + 1
+            self.indexes.pop(user_id, None)
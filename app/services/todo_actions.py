@@ -0,0 +1,165 @@
+import uuid
+from bson import ObjectId
+from pymongo import InsertOne, UpdateOne, DeleteOne
+from pymongo.errors import DuplicateKeyError
+
+ACTIONS = ('create', 'add_item', 'rename', 'delete', 'toggle_complete')
+
+
+def item_texts(item_text):
+    """Item texts from the assistant's item_text, a comma-separated string or a list"""
+    if isinstance(item_text, str):
+        return [i.strip() for i in item_text.split(',') if i.strip()]
+    if isinstance(item_text, list):
+        return [str(i).strip() for i in item_text if i is not None and str(i).strip()]
+    return []
+
+
+def new_item(text):
+    """A to-do item with a stable id, so it can be addressed regardless of its position"""
+    return {'id': str(ObjectId()), 'text': text, 'completed': False}
+
+
+def ensure_item_ids(collection, todo_list):
+    """Give items saved before item ids existed an id, in place.
+
+    The write only applies if the items are unchanged since they were
+    read, so a concurrent edit is never overwritten; the next read retries.
+    """
+    items = todo_list.get('items', [])
+    if all('id' in item for item in items):
+        return todo_list
+    updated = [item if 'id' in item else dict(item, id=str(ObjectId())) for item in items]
+    result = collection.update_one({'_id': todo_list['_id'], 'items': items}, {'$set': {'items': updated}})
+    if result.modified_count:
+        todo_list['items'] = updated
+    return todo_list
+
+
+def todo_version(versions, user_id):
+    """The user's to-do version from the todo_versions collection, as an opaque string"""
+    doc = versions.find_one({'_id': user_id})
+    return f"{doc['epoch']}.{doc['count']}" if doc else '0'
+
+
+def todo_lists_changed(versions, user_id):
+    """Bump the user's to-do version after any write to their lists, in every worker"""
+    update = {'$inc': {'count': 1}, '$setOnInsert': {'epoch': uuid.uuid4().hex[:8]}}
+    try:
+        versions.update_one({'_id': user_id}, update, upsert=True)
+    except DuplicateKeyError:
+        # Another write created this user's counter at the same moment
+        versions.update_one({'_id': user_id}, update)
+
+
+def toggle_item_pipeline(item_id):
+    """Update pipeline flipping the completed flag of the item with this id"""
+    return [{'$set': {'items': {'$map': {
+        'input': '$items',
+        'as': 'item',
+        'in': {'$cond': [
+            {'$eq': ['$$item.id', item_id]},
+            {'$mergeObjects': ['$$item', {'completed': {'$not': ['$$item.completed']}}]},
+            '$$item',
+        ]},
+    }}}}]
+
+
+def move_item_pipeline(item_id, position):
+    """Update pipeline moving the item with this id to `position` (clamped to the end)"""
+    rest = {'$filter': {'input': '$items', 'cond': {'$ne': ['$$this.id', item_id]}}}
+    moved = {'$filter': {'input': '$items', 'cond': {'$eq': ['$$this.id', item_id]}}}
+    return [{'$set': {'items': {'$let': {
+        'vars': {'rest': rest, 'moved': moved},
+        'in': {'$concatArrays': [
+            {'$slice': ['$$rest', position]},
+            '$$moved',
+            {'$slice': ['$$rest', position, {'$add': [{'$size': '$$rest'}, 1]}]},
+        ]},
+    }}}}]
+
+
+def toggle_pipeline(index):
+    """Update pipeline flipping items[index].completed in place, without reading the list first"""
+    return [{'$set': {'items': {'$map': {
+        'input': {'$range': [0, {'$size': '$items'}]},
+        'as': 'i',
+        'in': {'$let': {
+            'vars': {'item': {'$arrayElemAt': ['$items', '$$i']}},
+            'in': {'$cond': [
+                {'$eq': ['$$i', index]},
+                {'$mergeObjects': ['$$item', {'completed': {'$not': ['$$item.completed']}}]},
+                '$$item',
+            ]},
+        }},
+    }}}}]
+
+
+class TodoPlan:
+    """The to-do list writes requested by one assistant reply.
+
+    Actions are planned with add() and written by apply() in a single
+    ordered bulk_write, so a list created earlier in the plan can be
+    added to later in it. Existing lists are addressed by user and name
+    and are never read beforehand.
+    """
+
+    def __init__(self, user_id):
+        self.user_id = user_id
+        self.ops = []
+        self.created = []      # new list documents, with their _id already assigned
+        self.touched = set()   # names of existing lists that change
+        self.expected = 0      # updates/deletes that should each match a list
+
+    def add(self, todo_data):
+        """Plan one todo_data action; False if it is unknown or missing its arguments"""
+        action = todo_data.get('action')
+        list_name = todo_data.get('list_name')
+        if action not in ACTIONS or not list_name:
+            return False
+        match = {'user_id': self.user_id, 'name': list_name}
+
+        if action == 'create':
+            todo_list = {
+                '_id': ObjectId(),
+                'user_id': self.user_id,
+                'name': list_name,
+                'items': [new_item(text) for text in item_texts(todo_data.get('item_text'))],
+            }
+            self.ops.append(InsertOne(todo_list))
+            self.created.append(todo_list)
+            return True
+
+        if action == 'add_item':
+            texts = item_texts(todo_data.get('item_text'))
+            if not texts:
+                return False
+            op = UpdateOne(match, {'$push': {'items': {'$each': [new_item(text) for text in texts]}}})
+        elif action == 'rename':
+            new_name = todo_data.get('item_text')
+            if not isinstance(new_name, str) or not new_name.strip():
+                return False
+            op = UpdateOne(match, {'$set': {'name': new_name.strip()}})
+            self.touched.add(new_name.strip())
+        elif action == 'delete':
+            op = DeleteOne(match)
+        else:
+            try:
+                index = int(todo_data.get('item_index'))
+            except (TypeError, ValueError):
+                return False
+            if index < 0:
+                return False
+            op = UpdateOne(dict(match, **{f'items.{index}': {'$exists': True}}), toggle_pipeline(index))
+
+        self.ops.append(op)
+        self.touched.add(list_name)
+        self.expected += 1
+        return True
+
+    def apply(self, collection):
+        """Write every planned action in one round trip; returns how many updates/deletes missed"""
+        if not self.ops:
+            return 0
+        result = collection.bulk_write(self.ops, ordered=True)
+        return self.expected - result.matched_count - result.deleted_count
@@ -28,6 +28,54 @@ function hideAssistantPasswordModal() {
     modal.classList.add('hidden');
 }
 
+// Read a Server-Sent Events chat response, passing each token to onToken,
+// and resolve with the payload of the final 'done' or 'error' event
+async function readChatStream(response, onToken) {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    let result = null;
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+            const block = buffer.slice(0, boundary);
+            buffer = buffer.slice(boundary + 2);
+            let eventName = 'message';
+            const dataLines = [];
+            block.split('\n').forEach(line => {
+                if (line.startsWith('event:')) eventName = line.slice(6).trim();
+                else if (line.startsWith('data:')) dataLines.push(line.slice(5).trim());
+            });
+            if (!dataLines.length) continue;
+            const payload = JSON.parse(dataLines.join('\n'));
+            if (eventName === 'token') onToken(payload.text);
+            else if (eventName === 'done' || eventName === 'error') result = payload;
+        }
+    }
+    return result;
+}
+
+// Long-poll a queued chat job until it finishes, acknowledge it, and
+// resolve with its result (or an { error } object)
+async function waitForChatJob(job) {
+    while (true) {
+        const response = await fetch(`${job.status_url}?wait=25`);
+        if (!response.ok) throw new Error('Lost track of the assistant request');
+        const status = await response.json();
+        if (status.state !== 'done' && status.state !== 'failed') continue;
+        fetch('/process_pending_event', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ job_id: job.job_id })
+        }).catch(error => console.error('Error acknowledging AI job:', error));
+        if (status.state === 'done') return status.result;
+        return status.result && status.result.error ? status.result : { error: status.error || 'The assistant could not process your request' };
+    }
+}
+
 document.addEventListener('DOMContentLoaded', function () {
     const addButton = document.getElementById('addButton');
     const addOptions = document.getElementById('addOptions');
@@ -56,23 +104,26 @@ document.addEventListener('DOMContentLoaded', function () {
 
         fetch(`/get_events?year=${year}&month=${month}`)
             .then(response => response.json())
-            .then(data => {
-                events = data;
-                renderEvents();
-                
-                // Clear all existing icons first
-                document.querySelectorAll('.event-icons').forEach(iconContainer => {
-                    iconContainer.innerHTML = '';
-                });
-                
-                // Add icons for all events
-                events.forEach(event => {
-                    handleRecurringEvents(event);
-                });
-            })
+            .then(showEvents)
             .catch(error => console.error('Error loading events:', error));
     }
 
+    // Render a month's events (list and day icons)
+    function showEvents(data) {
+        events = data;
+        renderEvents();
+        
+        // Clear all existing icons first
+        document.querySelectorAll('.event-icons').forEach(iconContainer => {
+            iconContainer.innerHTML = '';
+        });
+        
+        // Add icons for all events
+        events.forEach(event => {
+            handleRecurringEvents(event);
+        });
+    }
+
     // Save events to backend
     function saveEvent(eventData) {
         return fetch('/save_event', {
@@ -149,7 +200,8 @@ document.addEventListener('DOMContentLoaded', function () {
             const event = events[index];
             document.getElementById('title').value = event.title || '';
             document.getElementById('description').value = event.description || '';
-            document.getElementById('eventDate').value = event.date || '';
+            // Occurrences of a recurring series edit the series itself
+            document.getElementById('eventDate').value = event.series_date || event.date || '';
             document.getElementById('eventTime').value = event.time || '';
             document.getElementById('recurrence').value = event.recurrence || 'none';
             
@@ -251,63 +303,22 @@ document.addEventListener('DOMContentLoaded', function () {
         }
     });
 
-    // Function to handle recurring events
+    // Place an event's icon on its day. Recurring series arrive from the
+    // server already expanded into one entry per occurrence in this month.
     function handleRecurringEvents(event) {
-        const eventDate = new Date(event.date);
+        const [year, month, day] = event.date.split('-').map(Number);
         const headerText = document.querySelector('h2').textContent;
-        const [monthName, year] = headerText.split(' ');
+        const [monthName, headerYear] = headerText.split(' ');
         const monthNames = [
             "January", "February", "March", "April", "May", "June", 
             "July", "August", "September", "October", "November", "December"
         ];
         const currentMonth = monthNames.indexOf(monthName) + 1;
-        const currentYear = parseInt(year);
+        const currentYear = parseInt(headerYear);
 
-        switch (event.recurrence) {
-            case 'monthly': {
-                if (eventDate.getDate() && eventDate.getDate() <= 31) {
-                    const dayElement = document.getElementById(`event-icons-${eventDate.getDate()}`);
-                    if (dayElement) addEventIcon(dayElement, event.type);
-                }
-                break;
-            }
-            case 'quarterly': {
-                const eventMonth = eventDate.getMonth() + 1;
-                // Show icon if the current month is the event month or 3, 6, 9 months after
-                if ((currentMonth - eventMonth) % 3 === 0 && currentMonth >= eventMonth) {
-                    const dayElement = document.getElementById(`event-icons-${eventDate.getDate()}`);
-                    if (dayElement) addEventIcon(dayElement, event.type);
-                }
-                break;
-            }
-            case 'half yearly': {
-                const eventMonth = eventDate.getMonth() + 1;
-                // Show icon if the current month is the event month or 6 months after
-                if ((currentMonth - eventMonth) % 6 === 0 && currentMonth >= eventMonth) {
-                    const dayElement = document.getElementById(`event-icons-${eventDate.getDate()}`);
-                    if (dayElement) addEventIcon(dayElement, event.type);
-                }
-                break;
-            }
-            case 'yearly': {
-                if (
-                    eventDate.getMonth() + 1 === currentMonth &&
-                    eventDate.getDate() && eventDate.getDate() <= 31
-                ) {
-                    const dayElement = document.getElementById(`event-icons-${eventDate.getDate()}`);
-                    if (dayElement) addEventIcon(dayElement, event.type);
-                }
-                break;
-            }
-            default: {
-                if (
-                    eventDate.getMonth() + 1 === currentMonth &&
-                    eventDate.getFullYear() === currentYear
-                ) {
-                    const dayElement = document.getElementById(`event-icons-${eventDate.getDate()}`);
-                    if (dayElement) addEventIcon(dayElement, event.type);
-                }
-            }
+        if (month === currentMonth && year === currentYear) {
+            const dayElement = document.getElementById(`event-icons-${day}`);
+            if (dayElement) addEventIcon(dayElement, event.type);
         }
     }
 
@@ -369,7 +380,7 @@ document.addEventListener('DOMContentLoaded', function () {
             eventList.appendChild(dateHeader);
 
             // Sort events by time for this date
-            dateEvents.sort((a, b) => a.time.localeCompare(b.time));
+            dateEvents.sort((a, b) => (a.time || '').localeCompare(b.time || ''));
 
             // Create events for this date
             dateEvents.forEach((ev, index) => {
@@ -498,26 +509,41 @@ document.addEventListener('DOMContentLoaded', function () {
                         return await sendChatRequest();
                     }
                     if (!response.ok) {
-                        throw new Error('Network response was not ok');
+                        const body = await response.json().catch(() => ({}));
+                        throw new Error(body.error || 'Network response was not ok');
                     }
-                    const data = await response.json();
-                    if (!data) return;
-                    // Display the AI's response
+                    // The request is normally queued (202) and polled; servers set to
+                    // stream answer with Server-Sent Events, shown token by token
                     const aiResponseDiv = document.createElement('div');
                     aiResponseDiv.classList.add('ai-message');
+                    let data;
+                    if (response.status === 202) {
+                        aiResponseDiv.textContent = 'AI: …';
+                        chatArea.appendChild(aiResponseDiv);
+                        chatArea.scrollTop = chatArea.scrollHeight;
+                        data = await waitForChatJob(await response.json());
+                    } else if ((response.headers.get('Content-Type') || '').startsWith('text/event-stream')) {
+                        aiResponseDiv.textContent = 'AI: ';
+                        chatArea.appendChild(aiResponseDiv);
+                        data = await readChatStream(response, text => {
+                            aiResponseDiv.textContent += text;
+                            chatArea.scrollTop = chatArea.scrollHeight;
+                        });
+                    } else {
+                        data = await response.json();
+                    }
+                    if (!data) return;
                     if (data.error) {
                         aiResponseDiv.classList.add('error');
                         aiResponseDiv.textContent = `AI: ${data.error}`;
                         console.error('AI Error:', data.error);
                     } else {
                         aiResponseDiv.textContent = `AI: ${data.output_llm}`;
-                        if (data.event_data) {
+                        // A reply can schedule several events; older replies carry just event_data
+                        const newEvents = data.events || (data.event_data ? [data.event_data] : []);
+                        if (newEvents.length) {
                             try {
-                                const newEvent = {
-                                    ...data.event_data,
-                                    _id: data.event_id
-                                };
-                                events.push(newEvent);
+                                events.push(...newEvents);
                                 renderEvents();
                                 document.querySelectorAll('.event-icons').forEach(iconContainer => {
                                     iconContainer.innerHTML = '';
@@ -616,11 +642,12 @@ document.addEventListener('DOMContentLoaded', function () {
         }
     });
 
-    // Function to update daily fact
-    function updateDailyFact() {
+    // Function to update daily fact; while the server is still generating
+    // it, check back every few seconds
+    function updateDailyFact(attempt = 0) {
         return new Promise((resolve, reject) => {
             const factElement = document.querySelector('.daily-fact');
-            if (factElement) {
+            if (factElement && attempt === 0 && !factElement.textContent.trim()) {
                 factElement.textContent = 'Loading...';
             }
             
@@ -631,6 +658,12 @@ document.addEventListener('DOMContentLoaded', function () {
                         if (factElement) {
                             factElement.textContent = data.fact;
                         }
+                    } else if (data.pending) {
+                        if (attempt < 20) {
+                            setTimeout(() => updateDailyFact(attempt + 1), 5000);
+                        } else if (factElement) {
+                            factElement.textContent = 'Unable to load daily fact';
+                        }
                     }
                     resolve();
                 })
@@ -651,18 +684,22 @@ document.addEventListener('DOMContentLoaded', function () {
             const year = document.getElementById('jumpYear').value;
 
             if (year > 0) {
-                // Update the daily fact before changing the page
-                updateDailyFact().then(() => {
-                    window.location.href = `/calendar/${year}/${month}`;
-                });
+                // The next page loads its own fact; don't wait on one here
+                window.location.href = `/calendar/${year}/${month}`;
             } else {
                 alert("Please enter a valid year.");
             }
         });
     }
 
-    // Initial load of events
-    loadEvents();
+    // Initial load of events: the page embeds this month's events, so only
+    // fall back to fetching them when that data is missing
+    const initialEvents = document.getElementById('initialEvents');
+    if (initialEvents) {
+        showEvents(JSON.parse(initialEvents.textContent));
+    } else {
+        loadEvents();
+    }
 
     // Modal event listeners (moved here to ensure DOM is ready)
     const submitBtn = document.getElementById('assistantPasswordSubmit');
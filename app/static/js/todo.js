@@ -2,8 +2,13 @@ document.addEventListener("DOMContentLoaded", () => {
   const container = document.getElementById("todo-container");
   const addListBtn = document.getElementById("add-list-btn");
 
+  const PAGE_SIZE = 50;
+  // Lists the user has opened -> how many of their items are loaded
+  const expanded = new Map();
+
+  // Only names and counts; items are fetched for expanded lists
   function fetchLists() {
-    fetch('/api/todo-lists')
+    fetch('/api/todo-lists/summary')
       .then(res => res.json())
       .then(renderTodoLists);
   }
@@ -11,35 +16,77 @@ document.addEventListener("DOMContentLoaded", () => {
   function renderTodoLists(lists) {
     container.innerHTML = '';
     lists.forEach(list => {
+      const open = expanded.has(list._id);
       const div = document.createElement('div');
       div.classList.add('todo-list-card');
+      div.dataset.id = list._id;
       div.innerHTML = `
         <div class="todo-list-header">
+          <button class="expand-list" data-id="${list._id}" title="Show items">
+            <i class="fas fa-chevron-${open ? 'down' : 'right'}"></i>
+          </button>
           <input value="${list.name}" data-id="${list._id}" class="todo-list-title list-name" />
+          <span class="todo-list-count">${list.completed_count}/${list.item_count}</span>
           <div class="todo-list-actions">
             <button class="delete-btn delete-list" data-id="${list._id}">
               <i class="fas fa-trash"></i>
             </button>
           </div>
         </div>
-        <ul class="todo-items">
-          ${list.items.map((item, i) => `
-            <li class="todo-item${item.completed ? ' completed' : ''}">
-              <input type="checkbox" ${item.completed ? 'checked' : ''} data-id="${list._id}" data-index="${i}" class="todo-checkbox tick-item"/>
-              <span class="todo-text">${item.text}</span>
-              <div class="todo-item-actions">
-                <button data-id="${list._id}" data-index="${i}" class="delete-btn delete-item">
-                    <i class="fas fa-trash"></i>
-                </button>
-              </div>
-            </li>`).join('')}
-        </ul>
+        <ul class="todo-items"></ul>
+        <button class="load-more-items" data-id="${list._id}" hidden>Show more</button>
         <input placeholder="New item..." class="new-item-input" data-id="${list._id}" />
       `;
       container.appendChild(div);
+      if (open) {
+        // Reload as many items as were showing before the refresh
+        loadItems(list._id, 0, Math.max(expanded.get(list._id), PAGE_SIZE));
+      }
     });
   }
 
+  function renderItem(listId, item) {
+    return `
+      <li class="todo-item${item.completed ? ' completed' : ''}">
+        <input type="checkbox" ${item.completed ? 'checked' : ''} data-id="${listId}" data-item-id="${item.id}" class="todo-checkbox tick-item"/>
+        <span class="todo-text">${item.text}</span>
+        <div class="todo-item-actions">
+          <button data-id="${listId}" data-item-id="${item.id}" class="delete-btn delete-item">
+              <i class="fas fa-trash"></i>
+          </button>
+        </div>
+      </li>`;
+  }
+
+  function loadItems(listId, offset, limit) {
+    return fetch(`/api/todo-list/${listId}/items?offset=${offset}&limit=${limit}`)
+      .then(res => res.json())
+      .then(page => {
+        const card = container.querySelector(`.todo-list-card[data-id="${listId}"]`);
+        if (!card || page.error || !expanded.has(listId)) return;
+        const ul = card.querySelector('.todo-items');
+        if (offset === 0) ul.innerHTML = '';
+        ul.insertAdjacentHTML('beforeend', page.items.map(item => renderItem(listId, item)).join(''));
+        expanded.set(listId, offset + page.items.length);
+        card.querySelector('.load-more-items').hidden = page.next_offset === null;
+      });
+  }
+
+  function toggleList(button) {
+    const listId = button.dataset.id;
+    const card = button.closest('.todo-list-card');
+    if (expanded.has(listId)) {
+      expanded.delete(listId);
+      card.querySelector('.todo-items').innerHTML = '';
+      card.querySelector('.load-more-items').hidden = true;
+      button.querySelector('i').className = 'fas fa-chevron-right';
+    } else {
+      expanded.set(listId, 0);
+      button.querySelector('i').className = 'fas fa-chevron-down';
+      loadItems(listId, 0, PAGE_SIZE);
+    }
+  }
+
   // Add new list
   addListBtn.addEventListener("click", () => {
     const name = prompt("Enter name for the new list:");
@@ -54,8 +101,11 @@ document.addEventListener("DOMContentLoaded", () => {
   // Delegate events
   container.addEventListener('change', e => {
     if (e.target.classList.contains('tick-item')) {
-      fetch(`/api/todo-list/${e.target.dataset.id}/item/${e.target.dataset.index}`, {
-        method: 'PUT'
+      // Send the new state rather than "toggle" so repeated or concurrent clicks agree
+      fetch(`/api/todo-list/${e.target.dataset.id}/item/${e.target.dataset.itemId}`, {
+        method: 'PUT',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ completed: e.target.checked })
       }).then(fetchLists);
     }
   });
@@ -64,9 +114,19 @@ document.addEventListener("DOMContentLoaded", () => {
     // Always get the button, even if an icon inside is clicked
     const deleteItemBtn = e.target.closest('.delete-item');
     const deleteListBtn = e.target.closest('.delete-list');
+    const expandBtn = e.target.closest('.expand-list');
+    const loadMoreBtn = e.target.closest('.load-more-items');
+
+    if (expandBtn) {
+      toggleList(expandBtn);
+    }
+
+    if (loadMoreBtn) {
+      loadItems(loadMoreBtn.dataset.id, expanded.get(loadMoreBtn.dataset.id), PAGE_SIZE);
+    }
 
     if (deleteItemBtn) {
-      await fetch(`/api/todo-list/${deleteItemBtn.dataset.id}/item/${deleteItemBtn.dataset.index}`, {
+      await fetch(`/api/todo-list/${deleteItemBtn.dataset.id}/item/${deleteItemBtn.dataset.itemId}`, {
         method: 'DELETE'
       });
       fetchLists();
@@ -77,6 +137,7 @@ document.addEventListener("DOMContentLoaded", () => {
         await fetch(`/api/todo-list/${deleteListBtn.dataset.id}`, {
           method: 'DELETE'
         });
+        expanded.delete(deleteListBtn.dataset.id);
         fetchLists();
       }
     }
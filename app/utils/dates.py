@@ -0,0 +1,57 @@
+from datetime import datetime, timedelta
+
+DATE_FORMAT = '%Y-%m-%d'
+TIME_FORMAT = '%H:%M'
+
+
+def event_start(date_str, time_str=None):
+    """Combine an event's string date and time into a naive datetime.
+
+    Events keep their 'date'/'time' strings for display, and the parsed
+    value is stored alongside as 'start' so range queries can use the
+    (user_id, start) index. A missing or malformed time falls back to
+    midnight; a malformed date raises ValueError.
+    """
+    day = datetime.strptime(date_str, DATE_FORMAT)
+    try:
+        at = datetime.strptime(time_str, TIME_FORMAT).time()
+    except (ValueError, TypeError):
+        return day
+    return datetime.combine(day.date(), at)
+
+
+def parse_datetime(value):
+    """An ISO date or datetime from a request as a naive local datetime.
+
+    Stored times are naive server-local times, so a value with a UTC
+    offset is converted to local time rather than compared as is (which
+    raises TypeError). Raises ValueError on anything malformed.
+    """
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone().replace(tzinfo=None)
+    return parsed
+
+
+def month_bounds(year, month):
+    """Half-open [start, end) datetimes covering a calendar month"""
+    start = datetime(year, month, 1)
+    if month == 12:
+        end = datetime(year + 1, 1, 1)
+    else:
+        end = datetime(year, month + 1, 1)
+    return start, end
+
+
+def day_bounds(day):
+    """Half-open [start, end) datetimes covering a single day"""
+    start = datetime(day.year, day.month, day.day)
+    return start, start + timedelta(days=1)
+
+
+def range_query(user_id, start, end):
+    """Mongo filter for a user's events starting in [start, end)"""
+    return {
+        'user_id': user_id,
+        'start': {'$gte': start, '$lt': end}
+    }
@@ -0,0 +1,27 @@
+import base64
+from datetime import datetime
+from bson import ObjectId
+
+
+def encode_cursor(start, object_id):
+    """Opaque keyset cursor for the last (start, _id) a client has seen"""
+    raw = f"{start.isoformat()}|{object_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    """Inverse of encode_cursor; raises ValueError on anything malformed"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        start, object_id = raw.split('|', 1)
+        return datetime.fromisoformat(start), ObjectId(object_id)
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+def after_cursor(start, object_id):
+    """Filter for documents strictly after (start, _id) in (start, _id) order"""
+    return {'$or': [
+        {'start': {'$gt': start}},
+        {'start': start, '_id': {'$gt': object_id}}
+    ]}
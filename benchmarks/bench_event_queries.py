@@ -0,0 +1,106 @@
+"""Compare the old `$regex` month lookup with the indexed `start` range scan.
+
+Needs a running MongoDB (MONGO_URI). Writes to a scratch `calendar_bench`
+database which is dropped afterwards.
+
+    python -m benchmarks.bench_event_queries [10000 100000 1000000]
+"""
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+from pymongo import MongoClient, ASCENDING
+
+from app.config.config import Config
+from app.utils.dates import month_bounds, range_query
+
+USERS = 20
+REPEAT = 50
+SIZES = [10_000, 100_000, 1_000_000]
+
+
+def seed(events, count):
+    base = datetime(2020, 1, 1)
+    batch = []
+    for i in range(count):
+        start = base + timedelta(minutes=random.randrange(6 * 365 * 24 * 60))
+        batch.append({
+            'user_id': f'user-{i % USERS}',
+            'title': f'Event {i}',
+            'description': '',
+            'date': start.strftime('%Y-%m-%d'),
+            'time': start.strftime('%H:%M'),
+            'start': start,
+            'recurrence': 'none',
+            'type': 'event',
+        })
+        if len(batch) == 10_000:
+            events.insert_many(batch, ordered=False)
+            batch = []
+    if batch:
+        events.insert_many(batch, ordered=False)
+
+
+def plan_summary(cursor):
+    explain = cursor.explain()
+    stats = explain.get('executionStats', {})
+    stage = explain['queryPlanner']['winningPlan']
+    stages = []
+    while stage:
+        stages.append(stage['stage'])
+        stage = stage.get('inputStage')
+    return ' <- '.join(stages), stats.get('totalDocsExamined'), stats.get('nReturned')
+
+
+def time_query(make_cursor):
+    samples = []
+    for _ in range(REPEAT):
+        started = time.perf_counter()
+        list(make_cursor())
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples), sorted(samples)[int(REPEAT * 0.95) - 1]
+
+
+def run(db, count):
+    events = db['events']
+    events.drop()
+    seed(events, count)
+
+    user_id, year, month = 'user-3', 2023, 6
+
+    def regex_cursor():
+        return events.find({
+            'user_id': user_id,
+            'date': {'$regex': f'^{year}-{month:02d}'}
+        }).sort([('date', 1), ('time', 1)])
+
+    start, end = month_bounds(year, month)
+
+    def range_cursor():
+        return events.find(range_query(user_id, start, end)).sort('start', 1)
+
+    before_plan = plan_summary(regex_cursor())
+    before_time = time_query(regex_cursor)
+
+    events.create_index([('user_id', ASCENDING), ('start', ASCENDING), ('_id', ASCENDING)])
+    after_plan = plan_summary(range_cursor())
+    after_time = time_query(range_cursor)
+
+    print(f"\n{count:,} events")
+    print(f"  before: {before_plan[0]}  examined={before_plan[1]} returned={before_plan[2]}"
+          f"  median={before_time[0]:.2f}ms p95={before_time[1]:.2f}ms")
+    print(f"  after:  {after_plan[0]}  examined={after_plan[1]} returned={after_plan[2]}"
+          f"  median={after_time[0]:.2f}ms p95={after_time[1]:.2f}ms")
+
+
+if __name__ == '__main__':
+    sizes = [int(arg) for arg in sys.argv[1:]] or SIZES
+    client = MongoClient(Config.MONGO_URI)
+    db = client['calendar_bench']
+    try:
+        for size in sizes:
+            run(db, size)
+    finally:
+        client.drop_database('calendar_bench')
@@ -0,0 +1,83 @@
+"""Accuracy and latency of the rule-based intent parser.
+
+Scores app.services.intent_parser against the labelled messages in
+benchmarks/intent_corpus_synthetic.jsonl (null = should fall through to
+the LLM), relative to a fixed "now". The corpus is hand-written: a
+regression check for shapes the parser must get right or leave alone, not
+a sample of real traffic, so its counts say nothing about how many real
+messages skip the LLM. With --mongo the script measures that on the chat
+messages stored in llm_info.
+
+    python -m benchmarks.bench_intents [--mongo]
+"""
+import json
+import os
+import statistics
+import sys
+import time
+from datetime import datetime
+
+from app.services.intent_parser import parse
+
+NOW = datetime(2026, 10, 14, 9, 30)  # a Wednesday
+LISTS = ['Groceries', 'Work', 'To-Do', 'Packing List']
+CORPUS = os.path.join(os.path.dirname(__file__), 'intent_corpus_synthetic.jsonl')
+REPEAT = 200
+
+
+def summarize(result):
+    if result is None:
+        return None
+    if result['todo_data']:
+        return {'list': result['todo_data']['list_name'], 'items': result['todo_data']['item_text']}
+    event = result['event_data']
+    return {key: event[key] for key in ('type', 'title', 'date', 'time')}
+
+
+def timed(messages, now, list_names):
+    samples = []
+    for _ in range(REPEAT):
+        for message in messages:
+            started = time.perf_counter()
+            parse(message, now, list_names)
+            samples.append((time.perf_counter() - started) * 1e6)
+    samples.sort()
+    return (f"p50={statistics.median(samples):.1f}us p99={samples[int(len(samples) * 0.99) - 1]:.1f}us "
+            f"max={samples[-1]:.1f}us")
+
+
+def main(use_mongo):
+    with open(CORPUS) as f:
+        corpus = [json.loads(line) for line in f if line.strip()]
+
+    counts = {'correct': 0, 'wrong': 0, 'false_positive': 0, 'missed': 0, 'fallthrough': 0}
+    for case in corpus:
+        got = summarize(parse(case['message'], NOW, lambda: LISTS))
+        expected = case['expected']
+        if expected is None:
+            key = 'fallthrough' if got is None else 'false_positive'
+        elif got is None:
+            key = 'missed'
+        else:
+            key = 'correct' if got == expected else 'wrong'
+        counts[key] += 1
+        if key in ('wrong', 'false_positive', 'missed'):
+            print(f"{key:>14}: {case['message']!r}\n{'':>16}expected {expected}\n{'':>16}got      {got}")
+
+    print(f"\n{len(corpus)} synthetic messages: {counts}")
+    print(f"latency: {timed([c['message'] for c in corpus], NOW, lambda: LISTS)}")
+
+    if use_mongo:
+        from app.config.config import Config
+        from app.services.repository import Repository
+        repo = Repository().connect(vars(Config))
+        messages = [doc['user_message'] for doc in repo.llm_info.find({}, {'user_message': 1})
+                    if doc.get('user_message')]
+        if messages:
+            hits = sum(parse(m, NOW, lambda: LISTS) is not None for m in messages)
+            print(f"\nllm_info: {hits}/{len(messages)} real messages ({hits / len(messages):.1%}) would skip the LLM")
+            print(f"latency: {timed(messages[:5000], NOW, lambda: LISTS)}")
+
+
+if __name__ == '__main__':
+    main('--mongo' in sys.argv[1:])
@@ -0,0 +1,74 @@
+"""Query latency of the in-memory search index at 100k documents per user.
+
+Runs entirely in process on a synthetic corpus with a Zipf-like word
+distribution, so no database is needed.
+
+    python -m benchmarks.bench_search [documents]
+"""
+import random
+import statistics
+import sys
+import time
+
+from app.services.search import UserSearchIndex, TITLE_WEIGHT
+
+DOCUMENTS = 100_000
+QUERIES = 2_000
+VOCABULARY = 20_000
+
+
+def make_vocabulary(rng):
+    letters = 'abcdefghijklmnopqrstuvwxyz'
+    words = set()
+    while len(words) < VOCABULARY:
+        words.add(''.join(rng.choice(letters) for _ in range(rng.randint(3, 10))))
+    # Frequency rank is independent of spelling, as in real text
+    words = sorted(words)
+    rng.shuffle(words)
+    return words
+
+
+def main(documents):
+    rng = random.Random(42)
+    vocabulary = make_vocabulary(rng)
+    cum_weights, total = [], 0.0
+    for rank in range(len(vocabulary)):
+        total += 1 / (rank + 1)
+        cum_weights.append(total)
+
+    def words(n):
+        return ' '.join(rng.choices(vocabulary, cum_weights=cum_weights, k=n))
+
+    started = time.perf_counter()
+    index = UserSearchIndex(avg_length=3 * TITLE_WEIGHT + 8)
+    for i in range(documents):
+        title, description = words(rng.randint(2, 4)), words(rng.randint(0, 12))
+        index.add(('event', str(i)), [(title, TITLE_WEIGHT), (description, 1)], {'event_id': str(i)})
+    index.rank_all()
+    print(f"Indexed {documents:,} documents in {time.perf_counter() - started:.1f}s, "
+          f"{len(index.postings):,} terms")
+
+    queries = []
+    for _ in range(QUERIES):
+        kind = rng.random()
+        if kind < 0.4:
+            queries.append(words(1))
+        elif kind < 0.7:
+            queries.append(words(1)[:rng.randint(2, 4)])
+        else:
+            first, second = words(2).split()
+            queries.append(f"{first} {second[:rng.randint(2, len(second))]}")
+
+    samples = []
+    for query in queries:
+        started = time.perf_counter()
+        index.search(query)
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    print(f"{QUERIES} queries: p50={statistics.median(samples):.3f}ms "
+          f"p95={samples[int(QUERIES * 0.95) - 1]:.3f}ms p99={samples[int(QUERIES * 0.99) - 1]:.3f}ms "
+          f"max={samples[-1]:.3f}ms")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else DOCUMENTS)
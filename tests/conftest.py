@@ -0,0 +1,73 @@
+import mongomock
+import pytest
+from flask import Flask
+from app.config.config import Config
+from app.services import repository
+from app.services.repository import Repository
+from app.services.event_cache import EventCache
+from app.services.freebusy import FreeBusyService
+from app.services.search import SearchService
+from app.services.interaction_log import InteractionLog
+
+USER_ID = 'user-1'
+
+
+def _ignore_sort(add):
+    # Newer pymongo passes `sort` to bulk builders; mongomock predates it
+    def wrapper(self, *args, sort=None, **kwargs):
+        return add(self, *args, **kwargs)
+    return wrapper
+
+
+for _name in ('add_update', 'add_replace'):
+    setattr(mongomock.collection.BulkOperationBuilder, _name,
+            _ignore_sort(getattr(mongomock.collection.BulkOperationBuilder, _name)))
+
+
+@pytest.fixture
+def repo(monkeypatch):
+    """A Repository backed by an in-memory mongomock client"""
+    monkeypatch.setattr(repository, 'MongoClient', mongomock.MongoClient)
+    return Repository().connect(vars(Config))
+
+
+def create_test_app(repo):
+    """The routes with the in-memory event views; no LLM, job pool or schedulers"""
+    app = Flask('app')
+    app.config.from_object(Config)
+    app.config['TESTING'] = True
+    app.repo = repo
+
+    app.event_cache = EventCache()
+    app.event_cache.init_app(app)
+    app.freebusy = FreeBusyService()
+    app.freebusy.init_app(app)
+    app.search = SearchService()
+    app.search.init_app(app)
+    app.interaction_log = InteractionLog()
+    app.interaction_log.init_app(app)
+
+    from app.routes.auth import auth_bp
+    from app.routes.main import main_bp
+    app.register_blueprint(auth_bp)
+    app.register_blueprint(main_bp)
+    return app
+
+
+@pytest.fixture
+def app(repo):
+    return create_test_app(repo)
+
+
+def logged_in_client(app, user_id=USER_ID):
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['user_id'] = user_id
+        session['username'] = 'tester'
+    return client
+
+
+@pytest.fixture
+def client(app):
+    """A test client logged in as USER_ID"""
+    return logged_in_client(app)
@@ -0,0 +1,63 @@
+from datetime import datetime
+from bson import ObjectId
+from app.routes.main import BATCH_MAX_OPERATIONS
+from tests.conftest import USER_ID
+
+
+def test_mixed_batch_reports_each_operation(client, repo):
+    mine = repo.events.insert_one({'user_id': USER_ID, 'title': 'old', 'date': '2026-03-01',
+                                   'start': datetime(2026, 3, 1)}).inserted_id
+    doomed = repo.events.insert_one({'user_id': USER_ID, 'title': 'doomed', 'date': '2026-03-02',
+                                     'start': datetime(2026, 3, 2)}).inserted_id
+    theirs = repo.events.insert_one({'user_id': 'someone-else', 'title': 'theirs', 'date': '2026-03-03',
+                                     'start': datetime(2026, 3, 3)}).inserted_id
+
+    response = client.post('/api/events/batch', json={'operations': [
+        {'op': 'create', 'event': {'title': 'new', 'date': '2026-03-04', 'time': '09:00'}},
+        {'op': 'update', 'event_id': str(mine), 'event': {'title': 'renamed', 'date': '2026-03-05'}},
+        {'op': 'delete', 'event_id': str(doomed)},
+        {'op': 'delete', 'event_id': str(theirs)},
+        {'op': 'update', 'event_id': 'not-an-id', 'event': {}},
+        {'op': 'create', 'event': {'title': 'bad date', 'date': 'soon'}},
+        {'op': 'rename'},
+    ]})
+    results = response.get_json()['results']
+
+    assert [r['status'] for r in results] == ['created', 'updated', 'deleted', 'error', 'error', 'error', 'error']
+    assert [r['index'] for r in results] == list(range(7))
+    assert results[3]['error'] == 'Event not found'
+    created = repo.events.find_one({'_id': ObjectId(results[0]['event_id'])})
+    assert created['start'] == datetime(2026, 3, 4, 9)
+    assert repo.events.find_one({'_id': mine})['start'] == datetime(2026, 3, 5)
+    assert repo.events.find_one({'_id': doomed}) is None
+    assert repo.events.find_one({'_id': theirs})['title'] == 'theirs'
+
+
+def test_batch_size_is_limited(client):
+    operations = [{'op': 'delete', 'event_id': str(ObjectId())}] * (BATCH_MAX_OPERATIONS + 1)
+    assert client.post('/api/events/batch', json={'operations': operations}).status_code == 400
+    assert client.post('/api/events/batch', json={'operations': []}).status_code == 400
+
+
+def test_batch_writes_refresh_the_month_etag(client):
+    etag = client.get('/get_events?year=2026&month=3').headers['ETag']
+    client.post('/api/events/batch', json={'operations': [
+        {'op': 'create', 'event': {'title': 'new', 'date': '2026-03-04'}}]})
+    response = client.get('/get_events?year=2026&month=3', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert [e['title'] for e in response.get_json()] == ['new']
+
+
+def test_non_object_event_fails_only_its_operation(client, repo):
+    mine = repo.events.insert_one({'user_id': USER_ID, 'title': 'old', 'date': '2026-03-01',
+                                   'start': datetime(2026, 3, 1)}).inserted_id
+    response = client.post('/api/events/batch', json={'operations': [
+        {'op': 'create', 'event': 'lunch at noon'},
+        {'op': 'update', 'event_id': str(mine), 'event': ['title', 'new']},
+        {'op': 'create', 'event': {'title': 'fine', 'date': '2026-03-04'}},
+    ]})
+    assert response.status_code == 200
+    results = response.get_json()['results']
+    assert [r['status'] for r in results] == ['error', 'error', 'created']
+    assert results[0]['error'] == results[1]['error'] == 'Event data must be an object'
+    assert repo.events.find_one({'_id': mine})['title'] == 'old'
@@ -0,0 +1,31 @@
+import json
+import re
+from datetime import datetime
+from tests.conftest import USER_ID
+
+INITIAL_EVENTS = re.compile(r'<script id="initialEvents" type="application/json">(.*?)</script>', re.S)
+
+
+def embedded_events(response):
+    return json.loads(INITIAL_EVENTS.search(response.get_data(as_text=True)).group(1))
+
+
+def test_month_page_embeds_its_occurrences(client, repo):
+    repo.events.insert_many([
+        {'user_id': USER_ID, 'title': 'rent', 'date': '2026-01-03', 'start': datetime(2026, 1, 3), 'recurrence': 'monthly'},
+        {'user_id': USER_ID, 'title': '</script><b>x', 'date': '2026-03-09', 'start': datetime(2026, 3, 9)},
+        {'user_id': USER_ID, 'title': 'april', 'date': '2026-04-01', 'start': datetime(2026, 4, 1)},
+    ])
+    events = embedded_events(client.get('/calendar/2026/3'))
+    assert [(e['title'], e['date']) for e in events] == [('rent', '2026-03-03'), ('</script><b>x', '2026-03-09')]
+
+
+def test_month_page_wraps_around_the_year(client, repo):
+    repo.events.insert_one({'user_id': USER_ID, 'title': 'new year', 'date': '2027-01-01', 'start': datetime(2027, 1, 1)})
+    events = embedded_events(client.get('/calendar/2026/13'))
+    assert [e['title'] for e in events] == ['new year']
+
+
+def test_month_page_requires_login(app):
+    response = app.test_client().get('/calendar/2026/3')
+    assert response.status_code == 302
@@ -0,0 +1,113 @@
+import threading
+from datetime import datetime
+import pytest
+from bson import ObjectId
+from app.services.ai_jobs import STALE_AFTER, AIJobQueue
+from tests.conftest import USER_ID
+
+
+class FakeAssistant:
+    def __init__(self):
+        self.calls = []
+
+    def process_calendar_request(self, user_message, user_id, job_id=None):
+        self.calls.append((user_message, user_id, job_id is not None))
+        return {'output_llm': f'Noted: {user_message}', 'event_data': None}
+
+    def stream_calendar_request(self, user_message, user_id):
+        self.calls.append((user_message, user_id, 'stream'))
+        yield 'done', {'output_llm': f'Noted: {user_message}', 'event_data': None}
+
+
+@pytest.fixture
+def assistant(app):
+    app.ai_assistant = FakeAssistant()
+    app.config['AI_JOB_WORKERS'] = 1
+    app.ai_jobs = AIJobQueue()
+    app.ai_jobs.init_app(app)
+    yield app.ai_assistant
+    app.ai_jobs.stopping.set()
+    app.ai_jobs.pool.shutdown(wait=True)
+
+
+def chat(app, client, **fields):
+    return client.post('/chat_with_ai', json=dict(
+        fields, message='call mom', assistant_password=app.config['AI_ASSISTANT_SECRET']))
+
+
+def test_chat_is_queued_and_polled_by_default(app, client, assistant):
+    response = chat(app, client)
+    assert response.status_code == 202
+    job = response.get_json()
+
+    status = client.get(f"{job['status_url']}?wait=5").get_json()
+    assert status['state'] == 'done'
+    assert status['result'] == {'output_llm': 'Noted: call mom', 'event_data': None}
+    assert assistant.calls == [('call mom', USER_ID, True)]
+
+    assert client.post('/process_pending_event', json={'job_id': job['job_id']}).status_code == 200
+    assert 'delivered_at' in client.get(job['status_url']).get_json()
+
+
+def test_streaming_and_sync_are_opt_in(app, client, assistant):
+    response = chat(app, client, stream=True)
+    assert response.mimetype == 'text/event-stream'
+    assert 'event: done' in response.get_data(as_text=True)
+
+    response = chat(app, client, **{'async': False})
+    assert response.status_code == 200
+    assert response.get_json()['output_llm'] == 'Noted: call mom'
+    assert assistant.calls == [('call mom', USER_ID, 'stream'), ('call mom', USER_ID, False)]
+
+
+def test_configured_default_mode(app, client, assistant):
+    app.config['AI_CHAT_MODE'] = 'stream'
+    assert chat(app, client).mimetype == 'text/event-stream'
+    assert chat(app, client, **{'async': True}).status_code == 202
+
+
+def test_full_queue_is_reported_busy(app, client, assistant):
+    while app.ai_jobs.slots.acquire(blocking=False):
+        pass
+    response = chat(app, client)
+    assert response.status_code == 503
+    assert assistant.calls == []
+
+
+class BlockingAssistant(FakeAssistant):
+    def __init__(self):
+        super().__init__()
+        self.release = threading.Event()
+
+    def process_calendar_request(self, user_message, user_id, job_id=None):
+        self.release.wait(5)
+        return super().process_calendar_request(user_message, user_id, job_id)
+
+
+def test_a_long_wait_in_the_queue_is_not_an_interruption(app, assistant):
+    jobs = app.ai_jobs
+    jobs.assistant = BlockingAssistant()
+    first, second = (ObjectId(jobs.submit('u', message)) for message in ('one', 'two'))
+    # The second job has waited behind the first for longer than STALE_AFTER
+    past = datetime.now() - 2 * STALE_AFTER
+    app.repo.ai_jobs.update_one({'_id': second}, {'$set': {'updated_at': past, 'heartbeat_at': past}})
+    jobs.beat()
+    assert jobs.get(str(second), 'u')['state'] == 'queued'
+
+    jobs.assistant.release.set()
+    assert jobs.get(str(first), 'u', wait=5)['state'] == 'done'
+    assert jobs.get(str(second), 'u', wait=5)['state'] == 'done'
+
+
+def test_jobs_of_a_dead_process_are_failed_and_never_run(app, assistant):
+    past = datetime.now() - 2 * STALE_AFTER
+    job_id = app.repo.ai_jobs.insert_one({'user_id': 'u', 'message': 'hi', 'state': 'queued',
+                                          'created_at': past, 'updated_at': past, 'heartbeat_at': past}).inserted_id
+    job = app.ai_jobs.get(str(job_id), 'u')
+    assert (job['state'], job['error']) == ('failed', 'Job was interrupted')
+
+    # A worker that only now gets to the job leaves the failure in place
+    app.ai_jobs.slots.acquire()
+    app.ai_jobs._run(job_id, 'u', 'hi')
+    assert app.repo.ai_jobs.find_one({'_id': job_id})['state'] == 'failed'
+    assert assistant.calls == []
@@ -0,0 +1,80 @@
+from datetime import datetime, timedelta
+from app.services.conversation import ConversationStore
+from tests.conftest import USER_ID
+
+# Recent enough that the llm_info TTL index (which mongomock applies) keeps them
+START = datetime.now().replace(microsecond=0) - timedelta(hours=1)
+
+
+def store(app, **kwargs):
+    conversations = ConversationStore(**kwargs)
+    conversations.log = app.interaction_log
+    return conversations
+
+
+def save(app, conversations, n, user_id=USER_ID):
+    interaction = {'user_id': user_id, 'user_message': f'q{n}', 'output_llm': f'a{n}',
+                   'created_at': START + timedelta(minutes=n)}
+    version = app.interaction_log.record(interaction)
+    conversations.record(user_id, interaction['user_message'], interaction['output_llm'], version)
+
+
+class CountingLog:
+    def __init__(self, log):
+        self.log = log
+        self.reads = 0
+
+    def version(self, user_id):
+        return self.log.version(user_id)
+
+    def recent_at_version(self, user_id, limit):
+        self.reads += 1
+        return self.log.recent_at_version(user_id, limit)
+
+
+def test_loads_once_then_writes_through(app):
+    for n in range(5):
+        save(app, store(app), n)
+    conversations = store(app, turns=3)
+    conversations.log = CountingLog(app.interaction_log)
+
+    assert conversations.recent(USER_ID) == [('q2', 'a2'), ('q3', 'a3'), ('q4', 'a4')]
+    save(app, conversations, 5)
+    assert conversations.recent(USER_ID) == [('q3', 'a3'), ('q4', 'a4'), ('q5', 'a5')]
+    assert conversations.log.reads == 1
+    # What the buffer holds is what a fresh load from the log would give
+    assert store(app, turns=3).recent(USER_ID) == conversations.recent(USER_ID)
+
+
+def test_messages_alternate_roles(app):
+    conversations = store(app)
+    save(app, conversations, 0)
+    assert conversations.messages(USER_ID) == [
+        {'role': 'user', 'content': 'q0'}, {'role': 'assistant', 'content': 'a0'}]
+    assert conversations.messages('nobody') == []
+
+
+def test_idle_users_are_evicted(app):
+    conversations = store(app, max_users=2)
+    for user_id in ('a', 'b', 'a', 'c'):
+        conversations.recent(user_id)
+    assert list(conversations.buffers) == ['a', 'c']
+
+
+def test_writes_by_other_workers_are_picked_up(app):
+    mine, theirs = store(app), store(app)
+    save(app, mine, 0)
+    assert theirs.recent(USER_ID) == [('q0', 'a0')]
+    save(app, mine, 1)
+    assert theirs.recent(USER_ID) == [('q0', 'a0'), ('q1', 'a1')]
+
+
+def test_a_missed_write_drops_the_buffer(app):
+    conversations = store(app)
+    save(app, conversations, 0)
+    assert conversations.recent(USER_ID) == [('q0', 'a0')]
+    # Another worker records in between, so this worker's write isn't the next version
+    save(app, store(app), 1)
+    save(app, conversations, 2)
+    assert USER_ID not in conversations.buffers
+    assert conversations.recent(USER_ID) == [('q0', 'a0'), ('q1', 'a1'), ('q2', 'a2')]
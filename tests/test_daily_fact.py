@@ -0,0 +1,65 @@
+import time
+from datetime import date, datetime
+from app.services import leases
+from app.services.daily_fact import DailyFactService
+
+DAY = date(2026, 3, 2)
+LEASE_ID = 'daily_fact:2026-03-02'
+
+
+class SlowAssistant:
+    """Stands in for the LLM call: takes `seconds`, then stores like the real one"""
+
+    def __init__(self, facts, seconds=0, during=None):
+        self.facts = facts
+        self.seconds = seconds
+        self.during = during
+
+    def generate_daily_fact(self, day, may_store=None):
+        time.sleep(self.seconds)
+        if self.during:
+            self.during()
+        if may_store is not None and not may_store():
+            return None
+        self.facts.update_one({'date': day.strftime('%Y-%m-%d')}, {'$set': {'fact': 'Fact'}}, upsert=True)
+        return 'Fact'
+
+
+def service(repo, assistant, lease_seconds=60):
+    facts = DailyFactService(lease_seconds=lease_seconds)
+    facts.facts, facts.leases = repo.daily_facts, repo.leases
+    facts.assistant = assistant(repo.daily_facts)
+    return facts
+
+
+def test_generates_once_and_caches(repo):
+    facts = service(repo, SlowAssistant)
+    facts._generate(DAY)
+    assert repo.daily_facts.find_one({'date': '2026-03-02'})['fact'] == 'Fact'
+    assert facts.get(datetime.combine(DAY, datetime.min.time())) == 'Fact'
+
+
+def test_lease_outlives_a_slow_call(repo):
+    taken = []
+
+    def compete():
+        taken.append(leases.acquire(repo.leases, LEASE_ID, 'other', 60))
+
+    facts = service(repo, lambda f: SlowAssistant(f, seconds=0.6, during=compete), lease_seconds=0.3)
+    facts._generate(DAY)
+    # Twice the lease went by, but it was renewed so nobody else could take it
+    assert taken == [False]
+    assert repo.daily_facts.count_documents({'date': '2026-03-02'}) == 1
+    assert repo.leases.find_one({'_id': LEASE_ID})['owner'] == facts.owner
+
+
+def test_fact_is_dropped_once_the_lease_is_lost(repo):
+    def steal():
+        repo.leases.update_one({'_id': LEASE_ID}, {'$set': {'owner': 'other'}})
+
+    facts = service(repo, lambda f: SlowAssistant(f, during=steal))
+    facts._generate(DAY)
+    assert repo.daily_facts.count_documents({}) == 0
+    assert facts.cache == {}
+    assert not leases.renew(repo.leases, LEASE_ID, facts.owner, 60)
+    assert leases.renew(repo.leases, LEASE_ID, 'other', 60)
@@ -0,0 +1,54 @@
+from datetime import datetime
+from app.migrations.backfill_event_start import backfill
+from app.utils.dates import event_start, month_bounds, day_bounds, range_query
+from tests.conftest import USER_ID
+
+
+def test_event_start_combines_date_and_time():
+    assert event_start('2026-03-05', '14:30') == datetime(2026, 3, 5, 14, 30)
+
+
+def test_event_start_falls_back_to_midnight():
+    assert event_start('2026-03-05') == datetime(2026, 3, 5)
+    assert event_start('2026-03-05', 'noonish') == datetime(2026, 3, 5)
+
+
+def test_event_start_rejects_bad_dates():
+    try:
+        event_start('05/03/2026', '10:00')
+    except ValueError:
+        return
+    raise AssertionError('expected ValueError')
+
+
+def test_bounds_are_half_open():
+    assert month_bounds(2026, 12) == (datetime(2026, 12, 1), datetime(2027, 1, 1))
+    assert day_bounds(datetime(2026, 3, 5, 9)) == (datetime(2026, 3, 5), datetime(2026, 3, 6))
+
+
+def test_range_query_matches_only_the_window(repo):
+    start, end = month_bounds(2026, 3)
+    repo.events.insert_many([
+        {'user_id': USER_ID, 'title': 'in', 'start': datetime(2026, 3, 31, 23, 59)},
+        {'user_id': USER_ID, 'title': 'next month', 'start': datetime(2026, 4, 1)},
+        {'user_id': 'someone-else', 'title': 'other user', 'start': datetime(2026, 3, 10)},
+    ])
+    titles = [e['title'] for e in repo.events.find(range_query(USER_ID, start, end))]
+    assert titles == ['in']
+
+
+def test_backfill_sets_start_and_skips_bad_dates(repo):
+    repo.events.insert_many([
+        {'user_id': USER_ID, 'date': '2026-03-05', 'time': '09:15'},
+        {'user_id': USER_ID, 'date': 'not a date'},
+        {'user_id': USER_ID, 'date': '2026-03-06', 'start': datetime(2026, 3, 6, 8)},
+    ])
+    assert backfill(repo.db) == (1, 1)
+    assert repo.events.find_one({'date': '2026-03-05'})['start'] == datetime(2026, 3, 5, 9, 15)
+    assert repo.events.find_one({'date': '2026-03-06'})['start'] == datetime(2026, 3, 6, 8)
+
+
+def test_saved_events_store_their_start(client, repo):
+    response = client.post('/save_event', json={'title': 'Dentist', 'date': '2026-03-05', 'time': '10:00'})
+    assert response.status_code == 200
+    assert repo.events.find_one({'title': 'Dentist'})['start'] == datetime(2026, 3, 5, 10)
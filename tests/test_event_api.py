@@ -0,0 +1,72 @@
+import json
+from datetime import datetime, timedelta
+import pytest
+from bson import ObjectId
+from app.services.indexes import ensure_indexes
+from app.utils.pagination import encode_cursor, decode_cursor, after_cursor
+from tests.conftest import USER_ID
+
+
+def test_cursor_round_trip():
+    object_id = ObjectId()
+    start = datetime(2026, 3, 5, 9, 30)
+    assert decode_cursor(encode_cursor(start, object_id)) == (start, object_id)
+
+
+@pytest.mark.parametrize('cursor', ['', 'not-base64!', encode_cursor(datetime(2026, 1, 1), 'x' * 24)])
+def test_malformed_cursor_raises_value_error(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+def test_after_cursor_breaks_start_ties_on_id(repo):
+    at = datetime(2026, 3, 5, 9)
+    ids = sorted(ObjectId() for _ in range(3))
+    repo.events.insert_many([{'_id': i, 'start': at} for i in ids] + [{'_id': ObjectId(), 'start': at + timedelta(hours=1)}])
+    after = repo.events.find(after_cursor(at, ids[0])).sort([('start', 1), ('_id', 1)])
+    assert [e['_id'] for e in after][:2] == ids[1:]
+
+
+def _seed(repo, count):
+    base = datetime(2026, 3, 1, 8)
+    repo.events.insert_many([
+        {'user_id': USER_ID, 'title': f'event {i}', 'description': 'x', 'start': base + timedelta(hours=i // 2)}
+        for i in range(count)
+    ])
+
+
+def test_pages_cover_every_event_once(client, repo):
+    _seed(repo, 7)
+    seen, cursor = [], None
+    while True:
+        url = '/api/events?start=2026-03-01&end=2026-04-01&limit=3&fields=title'
+        data = client.get(url + (f'&cursor={cursor}' if cursor else '')).get_json()
+        assert all(set(e) == {'_id', 'title'} for e in data['events'])
+        seen.extend(e['title'] for e in data['events'])
+        cursor = data['next_cursor']
+        if not cursor:
+            break
+    assert sorted(seen) == sorted(f'event {i}' for i in range(7))
+    assert len(seen) == len(set(seen))
+
+
+def test_ndjson_ends_with_the_next_cursor(client, repo):
+    _seed(repo, 2)
+    response = client.get('/api/events?start=2026-03-01&end=2026-04-01&limit=2&format=ndjson')
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert response.mimetype == 'application/x-ndjson'
+    assert [line['title'] for line in lines[:2]] == ['event 0', 'event 1']
+    assert lines[2]['next_cursor']
+
+
+def test_unknown_fields_and_bad_cursor_are_rejected(client):
+    assert client.get('/api/events?start=2026-03-01&end=2026-04-01&fields=password').status_code == 400
+    assert client.get('/api/events?start=2026-03-01&end=2026-04-01&cursor=junk').status_code == 400
+
+
+def test_ensure_indexes_drops_the_retired_start_index(repo):
+    repo.events.create_index([('user_id', 1), ('start', 1)])
+    ensure_indexes(repo.db)
+    names = set(repo.events.index_information())
+    assert 'user_id_1_start_1' not in names
+    assert 'user_id_1_start_1__id_1' in names
@@ -0,0 +1,52 @@
+from datetime import datetime
+from app.services.event_cache import EventCache
+from tests.conftest import USER_ID, create_test_app, logged_in_client
+
+
+def test_a_write_in_one_worker_is_seen_by_another(app, repo):
+    worker_a, worker_b = app.event_cache, EventCache()
+    worker_b.versions = repo.event_versions
+
+    version = worker_b.version(USER_ID)
+    worker_b.set(USER_ID, 2026, 3, ['old'], version)
+    assert worker_b.get(USER_ID, 2026, 3, worker_b.version(USER_ID)) == ['old']
+
+    worker_a.invalidate(USER_ID)
+    assert worker_b.version(USER_ID) != version
+    assert worker_b.get(USER_ID, 2026, 3, worker_b.version(USER_ID)) is None
+
+
+def test_versions_are_per_user(app):
+    cache = app.event_cache
+    before = cache.version('someone-else')
+    cache.invalidate(USER_ID)
+    assert cache.version('someone-else') == before
+
+
+def test_lru_is_bounded(app):
+    cache = app.event_cache
+    cache.max_entries = 2
+    for month in (1, 2, 3):
+        cache.set(USER_ID, 2026, month, [month], '0')
+    assert cache.get(USER_ID, 2026, 1, '0') is None
+    assert cache.get(USER_ID, 2026, 3, '0') == [3]
+
+
+def test_month_etag_revalidates_across_workers(app, repo):
+    worker_a = logged_in_client(app)
+    worker_b = logged_in_client(create_test_app(repo))
+    url = '/get_events?year=2026&month=3'
+
+    first = worker_b.get(url)
+    assert first.status_code == 200 and first.get_json() == []
+    etag = first.headers['ETag']
+    assert worker_b.get(url, headers={'If-None-Match': etag}).status_code == 304
+
+    saved = worker_a.post('/save_event', json={'title': 'Dentist', 'date': '2026-03-05', 'time': '10:00'})
+    assert saved.status_code == 200
+
+    fresh = worker_b.get(url, headers={'If-None-Match': etag})
+    assert fresh.status_code == 200
+    assert [e['title'] for e in fresh.get_json()] == ['Dentist']
+    assert fresh.headers['ETag'] != etag
+    assert repo.events.find_one({'title': 'Dentist'})['start'] == datetime(2026, 3, 5, 10)
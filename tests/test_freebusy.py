@@ -0,0 +1,110 @@
+import random
+import threading
+from datetime import datetime, timedelta
+from app.services.freebusy import Interval, IntervalIndex
+from tests.conftest import USER_ID
+
+DAY = datetime(2026, 3, 5)
+
+
+def interval(hour, hours=1, event_id=None):
+    start = DAY + timedelta(hours=hour)
+    return Interval(start, start + timedelta(hours=hours), event_id or f'e{hour}', '')
+
+
+def test_overlapping_matches_a_linear_scan():
+    rng = random.Random(7)
+    intervals = [interval(rng.uniform(0, 200), rng.uniform(0.1, 24), f'e{i}') for i in range(300)]
+    index = IntervalIndex(intervals)
+    for _ in range(200):
+        start = DAY + timedelta(hours=rng.uniform(-10, 230))
+        end = start + timedelta(hours=rng.uniform(0.1, 30))
+        expected = sorted((iv for iv in intervals if iv.start < end and iv.end > start), key=lambda iv: iv.start)
+        assert index.overlapping(start, end) == expected
+
+
+def test_overlap_is_half_open():
+    index = IntervalIndex([interval(9), interval(10)])
+    assert [iv.event_id for iv in index.overlapping(DAY + timedelta(hours=10), DAY + timedelta(hours=11))] == ['e10']
+
+
+def test_replace_moves_an_event():
+    index = IntervalIndex([interval(9, event_id='a'), interval(12, event_id='b')])
+    index.replace('a', [interval(14, event_id='a')])
+    assert [(iv.event_id, iv.start.hour) for iv in index.overlapping(DAY, DAY + timedelta(days=1))] == [('b', 12), ('a', 14)]
+    index.replace('b', [])
+    assert [iv.event_id for iv in index.overlapping(DAY, DAY + timedelta(days=1))] == ['a']
+
+
+def test_readers_never_see_a_half_applied_write():
+    fixed = [interval(h, event_id=f'fixed{h}') for h in range(0, 24, 2)]
+    index = IntervalIndex(fixed + [interval(1, event_id='moving')])
+    stop, torn = threading.Event(), []
+
+    def write():
+        hour = 1
+        while not stop.is_set():
+            hour = 1 + (hour + 2) % 22
+            index.replace('moving', [interval(hour, event_id='moving')])
+
+    def read():
+        for _ in range(2000):
+            ids = [iv.event_id for iv in index.overlapping(DAY, DAY + timedelta(days=1))]
+            if ids.count('moving') != 1 or len(ids) != len(fixed) + 1:
+                torn.append(ids)
+
+    writer = threading.Thread(target=write)
+    writer.start()
+    readers = [threading.Thread(target=read) for _ in range(4)]
+    for reader in readers:
+        reader.start()
+    for reader in readers:
+        reader.join()
+    stop.set()
+    writer.join()
+    assert torn == []
+
+
+def _event(repo, title, start, **fields):
+    return repo.events.insert_one(dict({'user_id': USER_ID, 'title': title, 'date': start.strftime('%Y-%m-%d'),
+                                        'start': start}, **fields)).inserted_id
+
+
+def test_busy_and_free_follow_writes(app, repo):
+    service = app.freebusy
+    _event(repo, 'standup', DAY + timedelta(hours=9), duration=30)
+    _event(repo, 'rent', datetime(2026, 1, 5, 12), recurrence='monthly')
+    start, end = DAY + timedelta(hours=8), DAY + timedelta(hours=14)
+
+    assert [iv.title for iv in service.busy(USER_ID, start, end)] == ['standup', 'rent']
+    assert service.free(USER_ID, start, end)[:2] == [
+        (start, DAY + timedelta(hours=9)), (DAY + timedelta(hours=9, minutes=30), DAY + timedelta(hours=12))]
+
+    lunch = {'_id': 'lunch', 'title': 'lunch', 'start': DAY + timedelta(hours=12, minutes=30)}
+    service.upsert_event(USER_ID, lunch)
+    assert [iv.title for iv in service.busy(USER_ID, start, end)] == ['standup', 'rent', 'lunch']
+    assert [iv.title for iv in service.conflicts(USER_ID, DAY + timedelta(hours=12, minutes=45), end, exclude_event_id='lunch')] == ['rent']
+    service.remove_event(USER_ID, 'lunch')
+    assert [iv.title for iv in service.busy(USER_ID, start, end)] == ['standup', 'rent']
+
+
+def test_next_free_slot_respects_day_hours(app, repo):
+    _event(repo, 'morning', DAY + timedelta(hours=9), duration=120)
+    slot = app.freebusy.next_free_slot(USER_ID, 60, DAY, day_start=datetime.strptime('09:00', '%H:%M').time(),
+                                       day_end=datetime.strptime('17:00', '%H:%M').time())
+    assert slot == (DAY + timedelta(hours=11), DAY + timedelta(hours=12))
+
+
+def test_freebusy_route_accepts_utc_offsets(client, repo):
+    _event(repo, 'standup', DAY + timedelta(hours=9))
+    response = client.get('/api/freebusy?start=2026-03-05T00:00:00%2B02:00&end=2026-03-06')
+    assert response.status_code == 200
+    assert 'busy' in response.get_json()
+    naive = client.get('/api/freebusy?start=2026-03-05&end=2026-03-06').get_json()
+    assert [iv['title'] for iv in naive['busy']] == ['standup']
+
+
+def test_freebusy_route_rejects_bad_ranges(client):
+    assert client.get('/api/freebusy?start=2026-03-06&end=2026-03-05').status_code == 400
+    assert client.get('/api/freebusy?start=tomorrow&end=2026-03-05').status_code == 400
+    assert client.get('/api/freebusy/next-free?after=2026-03-05T09:00:00Z&minutes=30').status_code == 200
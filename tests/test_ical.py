@@ -0,0 +1,150 @@
+import io
+import time
+from datetime import datetime
+import pytest
+from bson import ObjectId
+from app.services.ical import read_events, write_calendar
+from app.services.recurrence import expand_event
+from tests.conftest import USER_ID
+
+
+@pytest.fixture
+def berlin(monkeypatch):
+    """Run with the server's local time zone set to Europe/Berlin"""
+    monkeypatch.setenv('TZ', 'Europe/Berlin')
+    time.tzset()
+    yield
+    monkeypatch.undo()
+    time.tzset()
+
+
+def vevent(*lines):
+    return ['BEGIN:VCALENDAR', 'BEGIN:VEVENT', *lines, 'END:VEVENT', 'END:VCALENDAR']
+
+
+def only(lines):
+    [(event, warnings)] = list(read_events(lines))
+    return event, warnings
+
+
+def test_round_trip_keeps_the_event():
+    event = {'_id': ObjectId(), 'title': 'Rent; due, always', 'description': 'line one\nline two',
+             'time': '09:00', 'start': datetime(2026, 1, 31, 9), 'recurrence': 'monthly',
+             'until': datetime(2026, 7, 31, 9), 'type': 'reminder'}
+    text = ''.join(write_calendar([event], stamp=datetime(2026, 1, 1)))
+    got, warnings = only(io.StringIO(text))
+    assert warnings == []
+    fields = ('title', 'description', 'time', 'start', 'recurrence', 'until', 'type')
+    assert {k: got[k] for k in fields} == {k: event[k] for k in fields}
+    assert got['ical_uid'] == f"{event['_id']}@calendar-ai"
+
+
+def test_all_day_events_stay_all_day():
+    event, warnings = only(vevent('SUMMARY:Holiday', 'DTSTART;VALUE=DATE:20260305'))
+    assert warnings == [] and 'time' not in event
+    assert (event['date'], event['start']) == ('2026-03-05', datetime(2026, 3, 5))
+
+    text = ''.join(write_calendar([dict(event, _id=ObjectId())]))
+    assert 'DTSTART;VALUE=DATE:20260305\r\n' in text
+    got, _ = only(io.StringIO(text))
+    assert 'time' not in got and got['start'] == datetime(2026, 3, 5)
+
+
+def test_long_lines_are_folded_and_unfolded():
+    title = 'Ünïcödé ' * 30
+    event = {'_id': ObjectId(), 'title': title, 'start': datetime(2026, 3, 5, 9)}
+    text = ''.join(write_calendar([event]))
+    assert all(len(line.encode()) <= 75 for line in text.split('\r\n'))
+    assert only(io.StringIO(text))[0]['title'] == title
+
+
+def test_utc_times_are_converted_to_local_time(berlin):
+    event, warnings = only(vevent('SUMMARY:Call', 'DTSTART:20260305T090000Z'))
+    assert event['start'] == datetime(2026, 3, 5, 10)
+    assert (event['date'], event['time']) == ('2026-03-05', '10:00')
+    assert warnings == []
+
+
+def test_tzid_times_are_converted_to_local_time(berlin):
+    event, _ = only(vevent('SUMMARY:Call', 'DTSTART;TZID=America/New_York:20260705T090000'))
+    assert event['start'] == datetime(2026, 7, 5, 15)
+
+
+def test_unknown_tzid_is_kept_as_wall_time_with_a_warning():
+    event, warnings = only(vevent('SUMMARY:Call', 'DTSTART;TZID=Mars/Olympus:20260305T090000'))
+    assert event['start'] == datetime(2026, 3, 5, 9)
+    assert warnings == ['Call: unknown time zone Mars/Olympus; times kept as written']
+
+
+def test_count_bounds_the_series():
+    event, warnings = only(vevent('SUMMARY:Rent', 'DTSTART:20260131T090000', 'RRULE:FREQ=MONTHLY;COUNT=3'))
+    # The 31st skips months without one, so the third occurrence is in May
+    assert event['until'] == datetime(2026, 5, 31, 9)
+    got = [e['start'] for e in expand_event(event, datetime(2026, 1, 1), datetime(2027, 1, 1))]
+    assert got == [datetime(2026, m, 31, 9) for m in (1, 3, 5)]
+    assert warnings == []
+
+
+def test_date_only_until_includes_that_day():
+    event, _ = only(vevent('SUMMARY:Review', 'DTSTART:20260115T170000', 'RRULE:FREQ=MONTHLY;INTERVAL=3;UNTIL=20260715'))
+    assert event['recurrence'] == 'quarterly'
+    got = [e['start'] for e in expand_event(event, datetime(2026, 1, 1), datetime(2028, 1, 1))]
+    assert got == [datetime(2026, 1, 15, 17), datetime(2026, 4, 15, 17), datetime(2026, 7, 15, 17)]
+
+
+@pytest.mark.parametrize('rule', ['FREQ=WEEKLY', 'FREQ=DAILY;COUNT=5', 'FREQ=MONTHLY;BYDAY=1MO', 'FREQ=MONTHLY;INTERVAL=2'])
+def test_unsupported_rules_are_reported(rule):
+    event, warnings = only(vevent('SUMMARY:Standup', 'DTSTART:20260302T090000', f'RRULE:{rule}'))
+    assert event['recurrence'] == 'none'
+    assert warnings == [f'Standup: RRULE {rule} is not supported; imported as a single event']
+
+
+def test_by_parts_that_restate_dtstart_are_accepted():
+    event, warnings = only(vevent('SUMMARY:Rent', 'DTSTART:20260305T090000', 'RRULE:FREQ=MONTHLY;BYMONTHDAY=5'))
+    assert (event['recurrence'], warnings) == ('monthly', [])
+
+
+def test_overrides_and_missing_dtstart_are_skipped_with_a_reason():
+    results = list(read_events(
+        vevent('SUMMARY:Moved', 'DTSTART:20260305T100000', 'RECURRENCE-ID:20260305T090000') +
+        vevent('SUMMARY:Nowhere')))
+    assert [event for event, _ in results] == [None, None]
+    assert results[0][1] == ['Moved: skipped, changes to single occurrences of a series are not supported']
+    assert results[1][1] == ['Nowhere: skipped, it has no DTSTART']
+
+
+def _import(client, text):
+    return client.post('/api/events/import', data=text.encode(), content_type='text/calendar').get_json()
+
+
+CALENDAR = '\r\n'.join(
+    vevent('UID:standup-1@example.com', 'SUMMARY:Standup', 'DTSTART:20260302T090000', 'RRULE:FREQ=WEEKLY;BYDAY=MO') +
+    vevent('UID:rent-1@example.com', 'SUMMARY:Rent', 'DTSTART:20260301T090000', 'RRULE:FREQ=MONTHLY;COUNT=12')
+) + '\r\n'
+
+
+def test_importing_a_file_twice_does_not_duplicate(client, repo):
+    first = _import(client, CALENDAR)
+    assert (first['imported'], first['updated'], first['skipped']) == (2, 0, 0)
+    assert first['warnings'] == ['Standup: RRULE FREQ=WEEKLY;BYDAY=MO is not supported; imported as a single event']
+
+    second = _import(client, CALENDAR.replace('SUMMARY:Rent', 'SUMMARY:Rent (new)'))
+    assert (second['imported'], second['updated']) == (0, 2)
+    assert sorted(e['title'] for e in repo.events.find({'user_id': USER_ID})) == ['Rent (new)', 'Standup']
+
+
+def test_reimporting_an_export_updates_the_original_events(client, repo):
+    client.post('/save_event', json={'title': 'Dentist', 'date': '2026-03-05', 'time': '10:00'})
+    exported = client.get('/api/events/export.ics').get_data(as_text=True)
+    result = _import(client, exported.replace('SUMMARY:Dentist', 'SUMMARY:Dentist (moved)'))
+    assert (result['imported'], result['updated']) == (0, 1)
+    assert [e['title'] for e in repo.events.find({'user_id': USER_ID})] == ['Dentist (moved)']
+
+
+def test_reimporting_as_all_day_clears_the_time(client, repo):
+    client.post('/save_event', json={'title': 'Offsite', 'date': '2026-03-05', 'time': '10:00'})
+    exported = client.get('/api/events/export.ics').get_data(as_text=True)
+    result = _import(client, exported.replace('DTSTART:20260305T100000', 'DTSTART;VALUE=DATE:20260305'))
+    assert result['updated'] == 1
+    [event] = repo.events.find({'user_id': USER_ID})
+    assert 'time' not in event and event['start'] == datetime(2026, 3, 5)
@@ -0,0 +1,79 @@
+import pytest
+from app.services.indexes import (INDEXES, QueryPlanError, _stages, check_query_plans, collection_scans,
+                                  ensure_indexes, query_shapes)
+
+SCAN = {'queryPlanner': {'winningPlan': {'stage': 'LIMIT', 'inputStage': {'stage': 'COLLSCAN'}}}}
+INDEXED = {'queryPlanner': {'winningPlan': {'stage': 'LIMIT', 'inputStage': {
+    'stage': 'FETCH', 'inputStage': {'stage': 'IXSCAN', 'indexName': 'user_id_1'}}}}}
+
+
+class ExplainingDb:
+    """Answers explain() with a canned plan, COLLSCAN for the collections in `scanned`"""
+
+    def __init__(self, scanned=()):
+        self.scanned = scanned
+
+    def __getitem__(self, name):
+        plan = SCAN if name in self.scanned else INDEXED
+        return self.Collection(plan)
+
+    class Collection:
+        def __init__(self, plan):
+            self.plan = plan
+
+        def find(self, query):
+            return self
+
+        def limit(self, n):
+            return self
+
+        def sort(self, keys):
+            return self
+
+        def explain(self):
+            return self.plan
+
+
+def test_stages_walk_the_whole_plan():
+    plan = {'stage': 'SORT_MERGE', 'inputStages': [
+        {'stage': 'IXSCAN'}, {'stage': 'FETCH', 'inputStage': {'stage': 'COLLSCAN'}}]}
+    assert list(_stages(plan)) == ['SORT_MERGE', 'IXSCAN', 'FETCH', 'COLLSCAN']
+    assert 'COLLSCAN' not in _stages(INDEXED)
+
+
+def test_collection_scans_are_reported():
+    assert collection_scans(ExplainingDb()) == []
+    check_query_plans(ExplainingDb())
+
+    scans = collection_scans(ExplainingDb(scanned={'todo_lists'}))
+    assert scans == [f"todo_lists: {description}" for name, description, _, _ in query_shapes()
+                     if name == 'todo_lists']
+    with pytest.raises(QueryPlanError, match="todo_lists: a user's lists"):
+        check_query_plans(ExplainingDb(scanned={'todo_lists'}))
+
+
+def test_every_query_shape_leads_with_an_indexed_field(app, repo):
+    # mongomock can't explain, so check each filter's first field leads some
+    # index once the manifest and the services' TTL indexes are in place
+    ensure_indexes(repo.db)
+    for name, description, query, sort in query_shapes():
+        leading = {list(info['key'])[0][0] for info in repo.db[name].index_information().values()}
+        assert next(iter(query)) in leading | {'_id'}, f"{name}: {description}"
+
+
+def test_ensure_indexes_creates_the_manifest_and_drops_retired_ones(repo):
+    repo.events.create_index([('user_id', 1), ('start', 1)])
+    assert ensure_indexes(repo.db) == []
+    assert 'user_id_1_start_1' not in repo.events.index_information()
+    for name, models in INDEXES.items():
+        existing = repo.db[name].index_information()
+        assert {model.document['name'] for model in models} <= set(existing), name
+    # Running it again is a no-op
+    assert ensure_indexes(repo.db) == []
+
+
+def test_an_index_that_cannot_be_built_is_reported(repo):
+    repo.users.insert_many([{'username': 'sam'}, {'username': 'sam'}])
+    failed = ensure_indexes(repo.db)
+    assert [(name, index) for name, index, _ in failed] == [('users', 'username_1')]
+    assert 'user_id_1_created_at_-1' in repo.llm_info.index_information()
@@ -0,0 +1,37 @@
+import json
+import pytest
+from benchmarks.bench_intents import CORPUS, LISTS, NOW, summarize
+from app.services.intent_parser import parse
+
+
+def parsed(message):
+    return summarize(parse(message, NOW, lambda: LISTS))
+
+
+def test_simple_commands_skip_the_llm():
+    assert parsed('remind me to call mom tomorrow at 5pm') == {
+        'type': 'reminder', 'title': 'Call mom', 'date': '2026-10-15', 'time': '17:00'}
+    assert parsed('add dinner at 7pm') == {'type': 'event', 'title': 'Dinner', 'date': '2026-10-14', 'time': '19:00'}
+    assert parsed('plan a movie night on saturday at 8pm')['title'] == 'Movie night'
+    assert parsed('add milk and eggs to groceries') == {'list': 'Groceries', 'items': 'milk, eggs'}
+
+
+@pytest.mark.parametrize('message', [
+    'add dinner at 7pm next week',
+    'add dinner at 7pm on mondays',
+    'remind me to stretch at 8am on weekdays',
+    'schedule gym at 6pm this weekend',
+    'book a table at 8pm tomorrow night',
+    'add standup at 9am tomorrow morning',
+    'remind me to call the bank at 9am end of the month',
+    'schedule lunch at 1pm in march',
+])
+def test_unconsumed_date_words_go_to_the_llm(message):
+    assert parse(message, NOW, lambda: LISTS) is None
+
+
+def test_synthetic_corpus():
+    with open(CORPUS) as f:
+        corpus = [json.loads(line) for line in f if line.strip()]
+    assert [(case['message'], parsed(case['message'])) for case in corpus] == \
+        [(case['message'], case['expected']) for case in corpus]
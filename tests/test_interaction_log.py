@@ -0,0 +1,67 @@
+import gzip
+import json
+from datetime import datetime, timedelta
+from app.services.interaction_log import InteractionLog
+from tests.conftest import USER_ID
+
+# Recent enough that the llm_info TTL index (which mongomock applies) keeps them
+START = datetime.now().replace(hour=9, minute=0, second=0, microsecond=0) - timedelta(days=6)
+
+
+def interaction(n, at=None):
+    return {'user_id': USER_ID, 'user_message': f'q{n}', 'output_llm': f'a{n}',
+            'created_at': at or START + timedelta(minutes=n)}
+
+
+class RacingRollups:
+    """The rollups, where another request records an interaction just before the backfill writes"""
+
+    def __init__(self, log, collection):
+        self.log = log
+        self.collection = collection
+        self.updates = 0
+
+    def update_one(self, *args, **kwargs):
+        self.updates += 1
+        if self.updates == 1:
+            # record() creates the rollup with find_one_and_update; this is the backfill
+            self.log.record(interaction(4))
+        return self.collection.update_one(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self.collection, name)
+
+
+def test_first_rollup_keeps_history_and_concurrent_records(app, repo):
+    log = app.interaction_log
+    log.rollup_messages = 4
+    repo.llm_info.insert_many([interaction(n) for n in range(3)])
+    log.rollups = RacingRollups(log, repo.llm_info_rollups)
+    assert log.record(interaction(3)) == 5
+
+    rollup = repo.llm_info_rollups.find_one({'_id': USER_ID})
+    assert [entry['user_message'] for entry in rollup['recent']] == ['q1', 'q2', 'q3', 'q4']
+    assert rollup['count'] == 5
+    assert rollup['first_at'] == START and rollup['last_at'] == START + timedelta(minutes=4)
+    assert log.recent(USER_ID, 2) == [('q3', 'a3'), ('q4', 'a4')]
+
+
+def test_archive_skips_days_without_interactions(app, repo, tmp_path, monkeypatch):
+    log = app.interaction_log
+    log.archive_dir = str(tmp_path)
+    repo.llm_info.insert_many([interaction(0), interaction(1, START + timedelta(days=3))])
+    opened = []
+    archive_day = log.archive_day
+    monkeypatch.setattr(log, 'archive_day', lambda day: opened.append(day) or archive_day(day))
+
+    assert log.archive_pending() == 2
+    assert opened == [START.date(), START.date() + timedelta(days=3)]
+    assert sorted(p.name for p in tmp_path.iterdir()) == [
+        log.archive_path(day).rsplit('/', 1)[1] for day in opened]
+    with gzip.open(log.archive_path(START.date()), 'rt') as f:
+        assert [json.loads(line)['user_message'] for line in f] == ['q0']
+
+    # A second pass finds nothing left to do and opens nothing
+    opened.clear()
+    assert log.archive_pending() == 0
+    assert opened == []
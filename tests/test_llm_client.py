@@ -0,0 +1,137 @@
+import io
+import pytest
+import requests
+from urllib3.exceptions import ReadTimeoutError
+from app.services.llm_client import CircuitBreaker, ProviderClient, ProviderUnavailable
+
+
+class FakeSession:
+    """Answers each post with the next outcome: a status code or an exception"""
+
+    def __init__(self, outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = 0
+
+    def post(self, url, json=None, timeout=None, stream=False):
+        self.calls += 1
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        response = requests.Response()
+        response.status_code = outcome
+        response.url = url
+        response.raw = io.BytesIO(b'')
+        return response
+
+
+def client(outcomes, threshold=2, cooldown=60.0):
+    provider = ProviderClient('groq', 'http://llm', retries=0, breaker=CircuitBreaker(threshold, cooldown))
+    provider.session = FakeSession(outcomes)
+    return provider
+
+
+@pytest.mark.parametrize('outcome', [
+    500, 503, 429,
+    requests.exceptions.ReadTimeout('slow'),
+    requests.exceptions.ConnectionError('refused'),
+])
+def test_outages_open_the_circuit(outcome):
+    provider = client([outcome, outcome, 200])
+    for _ in range(2):
+        with pytest.raises(requests.exceptions.RequestException):
+            provider.post({})
+    assert provider.breaker.state == 'open'
+    with pytest.raises(ProviderUnavailable):
+        provider.post({})
+    assert provider.session.calls == 2
+
+
+@pytest.mark.parametrize('status', [400, 401, 404, 413, 422])
+def test_rejected_requests_do_not_count(status):
+    provider = client([status] * 5)
+    for _ in range(5):
+        with pytest.raises(requests.exceptions.HTTPError):
+            provider.post({})
+    assert provider.breaker.state == 'closed'
+    assert provider.session.calls == 5
+
+
+def test_a_4xx_between_outages_resets_the_count():
+    provider = client([503, 400, 503, 200])
+    for _ in range(3):
+        with pytest.raises(requests.exceptions.HTTPError):
+            provider.post({})
+    assert provider.breaker.state == 'closed'
+    assert provider.post({}).status_code == 200
+
+
+def test_half_open_trial_answered_with_4xx_closes_the_circuit():
+    provider = client([500, 500, 400, 200], cooldown=0)
+    for _ in range(2):
+        with pytest.raises(requests.exceptions.HTTPError):
+            provider.post({})
+    with pytest.raises(requests.exceptions.HTTPError):
+        provider.post({})
+    assert provider.breaker.state == 'closed'
+    assert provider.post({}).status_code == 200
+
+
+def test_client_side_errors_release_the_trial():
+    provider = client([500, 500, requests.exceptions.InvalidURL('bad'), 200], cooldown=0)
+    for _ in range(3):
+        with pytest.raises(requests.exceptions.RequestException):
+            provider.post({})
+    assert provider.breaker.state == 'open'
+    assert provider.post({}).status_code == 200
+    assert provider.breaker.state == 'closed'
+
+
+def test_retryable_statuses_are_retried_before_counting():
+    provider = client([503, 502, 200])
+    provider.retries, provider.backoff = 2, 0
+    assert provider.post({}).status_code == 200
+    assert provider.breaker.failures == 0
+    assert provider.session.calls == 3
+
+
+def timed_call(provider, error=None):
+    with provider.timed():
+        if error:
+            raise error
+
+
+def test_every_call_is_timed_with_its_outcome():
+    provider = client([])
+    timed_call(provider)
+    for error in (requests.exceptions.ReadTimeout('slow'),
+                  requests.exceptions.ConnectionError(ReadTimeoutError(None, 'http://llm', 'read timed out')),
+                  requests.exceptions.HTTPError('500'),
+                  ProviderUnavailable('open')):
+        with pytest.raises(type(error)):
+            timed_call(provider, error)
+
+    def stream():
+        with provider.timed():
+            yield 'token'
+            yield 'token'
+    tokens = stream()
+    next(tokens)
+    tokens.close()
+
+    assert provider.outcome_counts() == {'ok': 1, 'timeout': 2, 'error': 1, 'rejected': 1, 'cancelled': 1}
+
+
+def test_percentiles_include_failures_but_not_rejected_or_cancelled_calls():
+    provider = client([])
+    for i in range(10):
+        provider.record_latency(1.0)
+        if i:
+            provider.record_latency(9.0, 'timeout')
+    assert provider.percentile(0.95, default='warming up') == 'warming up'
+    for _ in range(50):
+        provider.record_latency(0.0, 'rejected')
+        provider.record_latency(0.1, 'cancelled')
+    assert provider.percentile(0.95, default='warming up') == 'warming up'
+    provider.record_latency(5.0, 'error')
+    assert provider.percentile(0.5) == 5.0
+    assert provider.percentile(0.95) == 9.0
@@ -0,0 +1,42 @@
+from datetime import datetime
+from app.services.ai_assistant import OllamaAssistant
+from app.services.prompts import CALENDAR_INSTRUCTIONS, system_prompt, request_context
+
+
+def test_system_prompt_is_identical_all_day():
+    morning, evening = datetime(2026, 3, 2, 8, 5), datetime(2026, 3, 2, 23, 59)
+    assert system_prompt(morning) == system_prompt(evening)
+    assert system_prompt(morning).startswith(CALENDAR_INSTRUCTIONS)
+    assert system_prompt(datetime(2026, 3, 3, 8, 5)) != system_prompt(morning)
+
+
+def test_request_specific_parts_stay_out_of_the_system_prompt():
+    now = datetime(2026, 3, 2, 14, 37)
+    system = system_prompt(now)
+    prompt = request_context(now, 'User: hi\nAssistant: hello\n', 'Upcoming: dentist', 'book lunch')
+    assert '14:37' not in system and 'book lunch' not in system
+    assert prompt.startswith('Current time: 14:37\n')
+    assert 'Upcoming: dentist' in prompt
+    assert prompt.endswith('User: book lunch\nAssistant:')
+
+
+def test_date_table():
+    # A Monday in December: "next Monday" is a week on, next month is January
+    system = system_prompt(datetime(2026, 12, 7, 9, 0))
+    assert "- Today's date: 2026-12-07" in system
+    assert "- Tomorrow's date: 2026-12-08" in system
+    assert "- Next month's first day: 2027-01-01" in system
+    assert "- Next month's first Friday: 2027-01-01" in system
+    assert "- Next month's first Monday: 2027-01-04" in system
+    assert "- Next Monday: 2026-12-14" in system
+    assert "- Next Tuesday: 2026-12-08" in system
+
+
+def test_providers_get_the_system_prompt_as_its_own_part():
+    assistant = OllamaAssistant(model_name='llama')
+    assistant.groq_model_name = 'groq-model'
+    assistant.keep_alive = '30m'
+    assert assistant._ollama_payload('prompt', 'system', False) == {
+        'model': 'llama', 'prompt': 'prompt', 'system': 'system', 'stream': False, 'keep_alive': '30m'}
+    assert assistant._groq_payload('prompt', 'system')['messages'] == [
+        {'role': 'system', 'content': 'system'}, {'role': 'user', 'content': 'prompt'}]
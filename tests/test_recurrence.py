@@ -0,0 +1,64 @@
+from datetime import datetime
+from app.services.recurrence import next_occurrence, occurrences, expand_event, find_occurrences
+from tests.conftest import USER_ID
+
+
+def test_next_occurrence_of_a_future_start_is_the_start():
+    start = datetime(2026, 5, 1, 9)
+    assert next_occurrence(start, 'monthly', datetime(2026, 1, 1)) == start
+
+
+def test_next_occurrence_jumps_to_the_right_period():
+    start = datetime(2000, 1, 15, 9)
+    assert next_occurrence(start, 'monthly', datetime(2026, 3, 16)) == datetime(2026, 4, 15, 9)
+    assert next_occurrence(start, 'quarterly', datetime(2026, 2, 1)) == datetime(2026, 4, 15, 9)
+    assert next_occurrence(start, 'yearly', datetime(2026, 1, 15, 9)) == datetime(2026, 1, 15, 9)
+
+
+def test_non_recurring_past_event_has_no_next_occurrence():
+    assert next_occurrence(datetime(2026, 1, 1), 'none', datetime(2026, 2, 1)) is None
+
+
+def test_series_on_the_31st_skips_short_months():
+    start = datetime(2026, 1, 31, 8)
+    got = list(occurrences(start, 'monthly', datetime(2026, 1, 1), datetime(2026, 8, 1)))
+    assert got == [datetime(2026, m, 31, 8) for m in (1, 3, 5, 7)]
+
+
+def test_occurrences_stay_inside_the_half_open_window():
+    start = datetime(2025, 6, 1)
+    got = list(occurrences(start, 'half yearly', datetime(2026, 6, 1), datetime(2027, 6, 1)))
+    assert got == [datetime(2026, 6, 1), datetime(2026, 12, 1)]
+
+
+def test_leap_day_yearly_series_only_lands_on_leap_years():
+    start = datetime(2024, 2, 29)
+    got = list(occurrences(start, 'yearly', datetime(2024, 1, 1), datetime(2029, 1, 1)))
+    assert got == [datetime(2024, 2, 29), datetime(2028, 2, 29)]
+
+
+def test_expand_event_keeps_the_series_date():
+    event = {'_id': 1, 'date': '2026-01-10', 'start': datetime(2026, 1, 10, 12), 'recurrence': 'monthly'}
+    expanded = expand_event(event, datetime(2026, 3, 1), datetime(2026, 4, 1))
+    assert [(e['date'], e['series_date'], e['start']) for e in expanded] == [
+        ('2026-03-10', '2026-01-10', datetime(2026, 3, 10, 12))]
+
+
+def test_expand_event_without_recurrence():
+    event = {'_id': 1, 'date': '2026-03-10', 'start': datetime(2026, 3, 10)}
+    assert expand_event(event, datetime(2026, 3, 1), datetime(2026, 4, 1)) == [event]
+    assert expand_event(event, datetime(2026, 4, 1), datetime(2026, 5, 1)) == []
+
+
+def test_find_occurrences_merges_window_and_earlier_series(repo):
+    repo.events.insert_many([
+        {'user_id': USER_ID, 'title': 'rent', 'date': '2025-11-03', 'start': datetime(2025, 11, 3), 'recurrence': 'monthly'},
+        {'user_id': USER_ID, 'title': 'dentist', 'date': '2026-03-02', 'start': datetime(2026, 3, 2, 10)},
+        {'user_id': USER_ID, 'title': 'trip', 'date': '2025-03-20', 'start': datetime(2025, 3, 20), 'recurrence': 'none'},
+        {'user_id': USER_ID, 'title': 'legacy', 'date': '2026-03-04'},
+    ])
+    got = find_occurrences(repo.events, USER_ID, datetime(2026, 3, 1), datetime(2026, 4, 1))
+    assert [(e['title'], e['start']) for e in got] == [
+        ('dentist', datetime(2026, 3, 2, 10)),
+        ('rent', datetime(2026, 3, 3)),
+    ]
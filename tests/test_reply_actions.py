@@ -0,0 +1,66 @@
+import json
+from datetime import datetime
+import pytest
+from app.services.ai_assistant import MAX_REPLY_ACTIONS, OllamaAssistant, reply_actions, scheduled_message
+from tests.conftest import USER_ID
+
+NOW = datetime(2026, 3, 2, 9, 30)
+
+
+@pytest.fixture
+def assistant(app):
+    assistant = OllamaAssistant()
+    assistant.init_app(app)
+    return assistant
+
+
+def test_reply_actions_prefer_the_array():
+    event = {'title': 'Dentist'}
+    assert reply_actions({'event_data': event}, 'event_data', 'events') == [event]
+    assert reply_actions({'event_data': event, 'events': [{'title': 'Gym'}, 'junk', None]},
+                         'event_data', 'events') == [{'title': 'Gym'}]
+    assert reply_actions({'event_data': None}, 'event_data', 'events') == []
+    many = {'events': [{'title': str(n)} for n in range(MAX_REPLY_ACTIONS + 5)]}
+    assert len(reply_actions(many, 'event_data', 'events')) == MAX_REPLY_ACTIONS
+
+
+def test_scheduled_message():
+    one = ('Event', 'Dentist', 'Tuesday, March 03', '09:00 AM')
+    assert scheduled_message([one]) == \
+        "I've scheduled your Event: 'Dentist' for Tuesday, March 03 at 09:00 AM. You can view it in your calendar."
+    two = scheduled_message([one, ('Reminder', 'Pills', 'Tuesday, March 03', '08:00 PM')])
+    assert two.startswith("I've scheduled 2 items: Event 'Dentist' for Tuesday, March 03 at 09:00 AM; ")
+    assert "Reminder 'Pills'" in two
+
+
+def test_one_reply_saves_every_event(assistant, repo):
+    repo.events.insert_one({'user_id': USER_ID, 'title': 'Standup', 'date': '2026-03-03', 'time': '09:00',
+                            'start': datetime(2026, 3, 3, 9)})
+    reply = json.dumps({'output_llm': 'Done', 'events': [
+        {'type': 'event', 'title': 'Dentist', 'date': '2026-03-03', 'time': '09:00'},
+        {'type': 'bogus', 'title': 'Pills', 'date': '2026-03-03', 'time': '20:00'},
+    ]})
+    response = assistant.handle_calendar_response(reply, 'dentist and pills tomorrow', USER_ID, NOW)
+
+    assert [e['title'] for e in response['events']] == ['Dentist', 'Pills']
+    assert response['event_data'] == response['events'][0]
+    assert response['events'][1]['type'] == 'event'
+    assert response['output_llm'].startswith("I've scheduled 2 items")
+    assert "'Dentist' on 2026-03-03 overlaps with 'Standup'" in response['output_llm']
+    assert [c['title'] for c in response['conflicts']] == ['Standup']
+    assert repo.events.count_documents({'user_id': USER_ID}) == 3
+
+
+def test_one_reply_applies_every_todo_action_in_order(assistant, repo):
+    reply = json.dumps({'output_llm': 'Done', 'todos': [
+        {'action': 'create', 'list_name': 'Errands'},
+        {'action': 'add_item', 'list_name': 'Errands', 'item_text': 'milk, stamps'},
+        {'action': 'add_item'},
+    ]})
+    response = assistant.handle_calendar_response(reply, 'errands: milk and stamps', USER_ID, NOW)
+
+    [todo_list] = repo.todo_lists.find({'user_id': USER_ID})
+    assert [item['text'] for item in todo_list['items']] == ['milk', 'stamps']
+    assert response['todos'][0]['_id'] == str(todo_list['_id'])
+    assert response['todo_data'] == response['todos'][0]
+    assert repo.events.count_documents({}) == 0
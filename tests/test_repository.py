@@ -0,0 +1,49 @@
+from pymongo import MongoClient
+from app.config.config import Config
+from app.services import repository
+from app.services.repository import COLLECTIONS, Repository, client_options
+
+
+def test_client_options_come_from_config():
+    options = client_options(vars(Config))
+    assert options['maxPoolSize'] == Config.MONGO_MAX_POOL_SIZE
+    assert options['serverSelectionTimeoutMS'] == Config.MONGO_SERVER_SELECTION_TIMEOUT_MS
+    assert options['appname'] == Config.MONGO_APP_NAME
+    # Unset settings keep the driver defaults
+    assert 'socketTimeoutMS' not in options and 'w' not in options and 'journal' not in options
+
+
+def test_write_concern_and_journal():
+    assert client_options({'MONGO_WRITE_CONCERN': '2', 'MONGO_JOURNAL': True}) == {'w': 2, 'journal': True}
+    assert client_options({'MONGO_WRITE_CONCERN': 'majority'}) == {'w': 'majority'}
+
+
+def test_options_are_accepted_by_the_driver():
+    # An unknown or invalid option raises here; the checks below use
+    # attributes both the pinned pymongo 3.12 and pymongo 4 expose
+    client = MongoClient('mongodb://localhost:27017', connect=False, **client_options(dict(
+        vars(Config), MONGO_WRITE_CONCERN='majority', MONGO_JOURNAL=True,
+        MONGO_READ_PREFERENCE='secondaryPreferred')))
+    try:
+        assert client.write_concern.document == {'w': 'majority', 'j': True}
+        assert client.read_preference.mongos_mode == 'secondaryPreferred'
+    finally:
+        client.close()
+
+
+def test_one_client_serves_every_collection(monkeypatch):
+    clients = []
+
+    class RecordingClient(dict):
+        def __init__(self, uri, **options):
+            super().__init__()
+            clients.append((uri, options))
+
+        def __missing__(self, name):
+            return {collection: (name, collection) for collection in COLLECTIONS}
+
+    monkeypatch.setattr(repository, 'MongoClient', RecordingClient)
+    repo = Repository().connect({'MONGO_URI': 'mongodb://db', 'MONGO_DB_NAME': 'cal', 'MONGO_MAX_POOL_SIZE': 7})
+    assert clients == [('mongodb://db', {'maxPoolSize': 7})]
+    assert repo.events == ('cal', 'events')
+    assert all(getattr(repo, name) == ('cal', name) for name in COLLECTIONS)
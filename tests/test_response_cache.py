@@ -0,0 +1,77 @@
+import json
+from datetime import datetime
+import pytest
+from app.services.ai_assistant import OllamaAssistant
+from app.services.response_cache import ResponseCache, normalize_message
+from tests.conftest import USER_ID
+
+NOW = datetime(2026, 3, 2, 9, 30)
+ANSWER = json.dumps({'output_llm': 'You have nothing on today.', 'event_data': None, 'todo_data': None})
+
+
+@pytest.fixture
+def assistant(app):
+    assistant = OllamaAssistant()
+    assistant.init_app(app)
+    return assistant
+
+
+def test_trivial_variants_share_a_key():
+    assert normalize_message("  What's   on TODAY?? ") == normalize_message("what’s on today")
+    assert ResponseCache.key('u', 'Hi!', 'f') == ResponseCache.key('u', 'hi', 'f')
+
+
+def test_entries_expire_and_stay_bounded():
+    cache = ResponseCache(max_entries=2, ttl=0)
+    cache.set('a', 'reply')
+    assert cache.get('a') is None
+    cache.ttl = 60
+    for key in 'abc':
+        cache.set(key, key)
+    assert [cache.get(key) for key in 'abc'] == [None, 'b', 'c']
+
+
+def test_key_follows_events_todos_and_conversation(app, assistant, client):
+    def key():
+        return assistant.response_cache_key('what is on today', USER_ID, NOW)
+
+    first = key()
+    assert key() == first
+
+    app.event_cache.invalidate(USER_ID)
+    after_event = key()
+    assert after_event != first
+
+    client.post('/api/todo-list', json={'name': 'Errands'})
+    after_todo = key()
+    assert after_todo != after_event
+
+    assistant.save_interaction({'user_id': USER_ID, 'user_message': 'hello', 'output_llm': 'Hi there',
+                                'created_at': datetime.now()})
+    assert key() != after_todo
+    assert assistant.response_cache_key('what is on today', USER_ID, NOW.replace(day=3)) != key()
+
+
+def test_replies_with_side_effects_are_not_cached(assistant):
+    key = assistant.response_cache_key('what is on today', USER_ID, NOW)
+    for reply in (
+        {'output_llm': 'Booked', 'event_data': {'title': 'Dentist', 'date': '2026-03-03'}},
+        {'output_llm': 'Booked', 'events': [{'title': 'Standup', 'date': '2026-03-03'}]},
+        {'output_llm': 'Added', 'todo_data': {'action': 'add_item', 'list_name': 'Errands', 'item_text': 'milk'}},
+        {'output_llm': 'Added', 'todos': [{'action': 'create', 'list_name': 'Errands'}]},
+    ):
+        assistant.remember_response(key, json.dumps(reply))
+        assert assistant.cached_response(key) is None
+
+    assistant.remember_response(key, 'not json')
+    assert assistant.cached_response(key) is None
+    assistant.remember_response(key, ANSWER)
+    assert assistant.cached_response(key) == ANSWER
+
+
+def test_todo_writes_by_the_assistant_change_the_key(app, assistant):
+    before = assistant.response_cache_key('what is on today', USER_ID, NOW)
+    reply = json.dumps({'output_llm': 'Created', 'todo_data': {'action': 'create', 'list_name': 'Errands'}})
+    assistant.handle_calendar_response(reply, 'make an errands list', USER_ID, NOW)
+    assert app.repo.todo_lists.count_documents({'user_id': USER_ID, 'name': 'Errands'}) == 1
+    assert assistant.response_cache_key('what is on today', USER_ID, NOW) != before
@@ -0,0 +1,177 @@
+import random
+import threading
+from app.services.search import UserSearchIndex, top_documents, tokenize
+from tests.conftest import USER_ID
+
+WORDS = ['alpha', 'beta', 'gamma', 'delta', 'dentist', 'dinner', 'dine', 'team', 'tea', 'review']
+
+
+def random_index(rng, documents=600):
+    index = UserSearchIndex(avg_length=6)
+    for i in range(documents):
+        title = ' '.join(rng.choices(WORDS, k=rng.randint(1, 3)))
+        description = ' '.join(rng.choices(WORDS, k=rng.randint(0, 6)))
+        index.add(('event', str(i)), [(title, 2), (description, 1)], {'event_id': str(i)})
+    index.rank_all()
+    return index
+
+
+def brute_force(index, query, limit, prefix=True):
+    """Score every document directly from the postings"""
+    tokens = tokenize(query)
+    groups = [[t] for t in tokens[:-1]]
+    groups.append(index._expand(tokens[-1]) if prefix else [tokens[-1]])
+    scored = []
+    for key in index.docs:
+        total = 0
+        for terms in groups:
+            best = max((index.postings[t][key] * index._idf(t) for t in terms if key in index.postings.get(t, {})),
+                       default=0)
+            if not best:
+                break
+            total += best
+        else:
+            scored.append(round(total, 9))
+    return sorted(scored, reverse=True)[:limit]
+
+
+def ranked_scores(index, query, limit):
+    groups = index.plan(query)
+    return [round(score, 9) for score, _ in top_documents(groups, limit)] if groups else []
+
+
+def test_search_matches_scoring_every_document():
+    rng = random.Random(3)
+    index = random_index(rng)
+    for query in ['alpha', 'de', 'alpha be', 'team tea', 'dinner dentist review', 'gamma di', 'beta alpha delta']:
+        for limit in (1, 5, 40):
+            assert ranked_scores(index, query, limit) == brute_force(index, query, limit), query
+
+
+def test_exhaustive_and_threshold_paths_agree(monkeypatch):
+    from app.services import search
+    index = random_index(random.Random(5))
+    for query in ['alpha beta', 'team re', 'dinner dine delta']:
+        monkeypatch.setattr(search, 'EXHAUSTIVE_LIMIT', 10 ** 6)
+        exhaustive = ranked_scores(index, query, 10)
+        monkeypatch.setattr(search, 'EXHAUSTIVE_LIMIT', 0)
+        threshold = ranked_scores(index, query, 10)
+        assert exhaustive == threshold == brute_force(index, query, 10)
+
+
+def test_titles_rank_above_descriptions_and_all_terms_must_match():
+    index = UserSearchIndex(avg_length=4)
+    index.add(('event', 'a'), [('dentist', 2), ('bring forms', 1)], {'event_id': 'a'})
+    index.add(('event', 'b'), [('checkup', 2), ('at the dentist', 1)], {'event_id': 'b'})
+    index.add(('event', 'c'), [('lunch', 2), ('', 1)], {'event_id': 'c'})
+    index.rank_all()
+    assert [p['event_id'] for _, p in index.search('dentist')] == ['a', 'b']
+    assert [p['event_id'] for _, p in index.search('dentist forms')] == ['a']
+    assert index.search('dentist lunch') == []
+    assert [p['event_id'] for _, p in index.search('lu')] == ['c']
+    assert index.search('lu', prefix=False) == []
+
+
+def test_plan_is_a_snapshot_later_writes_do_not_change():
+    index = UserSearchIndex(avg_length=2)
+    index.add(('event', 'a'), [('standup', 1)], {'event_id': 'a'})
+    index.rank_all()
+    groups = index.plan('standup')
+    index.add(('event', 'b'), [('standup', 1)], {'event_id': 'b'})
+    index.remove(('event', 'a'))
+    assert [key for _, key in top_documents(groups, 10)] == [('event', 'a')]
+    assert [p['event_id'] for _, p in index.search('standup')] == ['b']
+
+
+class ReadCounter:
+    """Passes calls through to a collection, counting the reads made directly on it"""
+
+    def __init__(self, collection):
+        self.collection = collection
+        self.reads = 0
+
+    def __getattr__(self, name):
+        if name in ('find', 'find_one'):
+            self.reads += 1
+        return getattr(self.collection, name)
+
+
+def todo_results(client, query):
+    return [r for r in client.get(f'/api/search?q={query}').get_json()['results'] if r['kind'] == 'todo']
+
+
+def test_todo_writes_patch_the_loaded_index(app, client):
+    repo = app.repo
+    repo.events.insert_one({'user_id': USER_ID, 'title': 'Groceries run', 'date': '2026-03-05', 'time': '10:00'})
+    list_id = client.post('/api/todo-list', json={'name': 'Errands'}).get_json()['_id']
+    # The first search loads the index; the writes after it patch it
+    assert [r['kind'] for r in client.get('/api/search?q=groceries').get_json()['results']] == ['event']
+
+    repo.todo_lists = ReadCounter(repo.todo_lists)
+    item_id = client.post(f'/api/todo-list/{list_id}/item', json={'text': 'Buy groceries'}).get_json()['id']
+    client.put(f'/api/todo-list/{list_id}', json={'name': 'Shopping'})
+    client.put(f'/api/todo-list/{list_id}/item/{item_id}', json={'completed': True})
+    todo = todo_results(client, 'groceries')
+    assert todo == [dict(todo[0], list_id=list_id, list_name='Shopping', item_id=item_id,
+                         text='Buy groceries', completed=True)]
+
+    client.delete(f'/api/todo-list/{list_id}/item/{item_id}')
+    assert todo_results(client, 'groceries') == []
+    assert repo.todo_lists.reads == 0
+
+    client.delete(f'/api/todo-list/{list_id}')
+    assert [r['kind'] for r in client.get('/api/search?q=groceries').get_json()['results']] == ['event']
+
+
+def test_flipping_an_item_indexes_the_returned_flag(app, client, monkeypatch):
+    list_id = client.post('/api/todo-list', json={'name': 'Errands'}).get_json()['_id']
+    item_id = client.post(f'/api/todo-list/{list_id}/item', json={'text': 'Buy milk'}).get_json()['id']
+    assert todo_results(client, 'milk')[0]['completed'] is False
+
+    # mongomock can't run the toggle pipeline, so answer for it as the server would
+    calls = []
+
+    def find_one_and_update(selector, update, projection=None, return_document=None):
+        calls.append(projection)
+        return {'_id': selector['_id'], 'items': [{'id': item_id, 'text': 'Buy milk', 'completed': True}]}
+
+    monkeypatch.setattr(app.repo.todo_lists, 'find_one_and_update', find_one_and_update)
+    response = client.put(f'/api/todo-list/{list_id}/item/{item_id}')
+    assert response.get_json() == {'status': 'toggled', 'completed': True}
+    assert calls == [{'items': {'$elemMatch': {'id': item_id}}}]
+    assert todo_results(client, 'milk')[0]['completed'] is True
+
+
+def test_searches_run_while_the_index_is_written(app):
+    search = app.search
+    app.repo.events.insert_many([{'user_id': USER_ID, 'title': f'Meeting {i}'} for i in range(200)])
+    assert len(search.search(USER_ID, 'meeting', limit=500)) == 200
+    stop, errors = threading.Event(), []
+
+    def write():
+        rng = random.Random(1)
+        while not stop.is_set():
+            event_id = f'extra{rng.randint(0, 20)}'
+            if rng.random() < 0.5:
+                search.index_event(USER_ID, {'_id': event_id, 'title': 'Meeting notes'})
+            else:
+                search.remove_event(USER_ID, event_id)
+
+    def read():
+        try:
+            for _ in range(200):
+                results = search.search(USER_ID, 'meeting', limit=500)
+                assert 200 <= len(results) <= 221
+        except Exception as e:  # surfaced below
+            errors.append(e)
+
+    writer = threading.Thread(target=write)
+    writer.start()
+    readers = [threading.Thread(target=read) for _ in range(4)]
+    for reader in readers:
+        reader.start()
+    for reader in readers:
+        reader.join()
+    stop.set()
+    writer.join()
+    assert errors == []
@@ -0,0 +1,110 @@
+import json
+import pytest
+import requests
+from app.services.ai_assistant import OllamaAssistant, OutputTextExtractor
+from app.services.llm_client import ProviderClient
+from tests.conftest import logged_in_client
+
+
+def extract(chunks):
+    extractor = OutputTextExtractor()
+    return ''.join(extractor.feed(chunk) for chunk in chunks)
+
+
+def test_extractor_streams_only_the_output_text():
+    reply = json.dumps({'output_llm': 'Lunch "at" noon\nsee you é', 'event_data': {'title': 'Lunch'}})
+    # Every split point, including inside escapes and the field name
+    for size in (1, 2, 3, 7):
+        assert extract(reply[i:i + size] for i in range(0, len(reply), size)) == 'Lunch "at" noon\nsee you é'
+
+
+def test_extractor_passes_plain_text_through():
+    assert extract(['  Sorry, ', 'the service is down']) == '  Sorry, the service is down'
+
+
+class FakeResponse:
+    def __init__(self, lines):
+        self.lines = lines
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def iter_lines(self, decode_unicode=False):
+        for line in self.lines:
+            if isinstance(line, Exception):
+                raise line
+            yield line
+
+
+class FakeProvider(ProviderClient):
+    def __init__(self, lines):
+        super().__init__('fake', 'http://llm')
+        self.lines = lines
+        self.payloads = []
+
+    def post(self, payload, stream=False):
+        self.payloads.append(payload)
+        if isinstance(self.lines, Exception):
+            raise self.lines
+        return FakeResponse(self.lines)
+
+
+def assistant(groq_lines, ollama_lines):
+    assistant = OllamaAssistant(model_name='llama', base_url='http://ollama')
+    assistant.groq_model_name = 'groq-model'
+    assistant.groq = FakeProvider(groq_lines)
+    assistant.ollama = FakeProvider(ollama_lines)
+    return assistant
+
+
+def groq_line(content):
+    return 'data: ' + json.dumps({'choices': [{'delta': {'content': content}}]})
+
+
+def ollama_line(text, done=False):
+    return json.dumps({'response': text, 'done': done}).encode()
+
+
+def test_groq_stream_parses_sse_deltas():
+    a = assistant([groq_line('Hel'), '', ': keep-alive', groq_line('lo'), 'data: [DONE]', groq_line('ignored')], [])
+    assert list(a.generate_stream_with_fallback('hi', 'system')) == ['Hel', 'lo']
+    assert a.groq.payloads[0]['stream'] is True
+    assert a.groq.payloads[0]['messages'][0] == {'role': 'system', 'content': 'system'}
+
+
+def test_falls_back_to_ollama_only_before_the_first_token():
+    a = assistant(requests.exceptions.ConnectionError('down'), [ollama_line('Hi'), ollama_line(' there', done=True)])
+    assert list(a.generate_stream_with_fallback('hi')) == ['Hi', ' there']
+
+    a = assistant([groq_line('Hel'), requests.exceptions.ChunkedEncodingError('cut')], [ollama_line('never')])
+    tokens = a.generate_stream_with_fallback('hi')
+    assert next(tokens) == 'Hel'
+    # A reply that already started can't restart on Ollama
+    with pytest.raises(requests.exceptions.ChunkedEncodingError):
+        next(tokens)
+    assert a.ollama.payloads == []
+
+
+class StreamingAssistant:
+    def stream_calendar_request(self, user_message, user_id):
+        yield 'token', 'Booked '
+        yield 'token', 'it'
+        yield 'done', {'output_llm': 'Booked it', 'event_data': {'title': user_message}}
+
+
+def test_chat_streams_server_sent_events(app):
+    app.ai_assistant = StreamingAssistant()
+    client = logged_in_client(app)
+    response = client.post('/chat_with_ai', json={
+        'message': 'Dentist', 'stream': True, 'assistant_password': app.config['AI_ASSISTANT_SECRET']})
+    assert response.mimetype == 'text/event-stream'
+    assert response.headers['Cache-Control'] == 'no-cache'
+    events = [block.split('\n') for block in response.get_data(as_text=True).strip().split('\n\n')]
+    assert [(name, json.loads(data[len('data: '):])) for name, data in events] == [
+        ('event: token', {'text': 'Booked '}),
+        ('event: token', {'text': 'it'}),
+        ('event: done', {'output_llm': 'Booked it', 'event_data': {'title': 'Dentist'}}),
+    ]
@@ -0,0 +1,98 @@
+import json
+from datetime import datetime
+import pytest
+from pymongo import UpdateOne
+from app.services.ai_assistant import OllamaAssistant
+from app.services.todo_actions import TodoPlan, item_texts, new_item, toggle_pipeline
+from tests.conftest import USER_ID
+
+NOW = datetime(2026, 3, 2, 9, 30)
+
+
+class Recording:
+    """Passes calls through to a collection, noting which methods were used"""
+
+    def __init__(self, collection):
+        self.collection = collection
+        self.calls = []
+
+    def __getattr__(self, name):
+        self.calls.append(name)
+        return getattr(self.collection, name)
+
+
+@pytest.fixture
+def assistant(app):
+    assistant = OllamaAssistant()
+    assistant.init_app(app)
+    return assistant
+
+
+def test_item_texts():
+    assert item_texts(' milk, eggs ,, ') == ['milk', 'eggs']
+    assert item_texts(['milk', None, ' ', 3]) == ['milk', '3']
+    assert item_texts(None) == []
+
+
+def test_new_items_have_distinct_ids():
+    first, second = new_item('milk'), new_item('milk')
+    assert first['id'] != second['id']
+    assert first == {'id': first['id'], 'text': 'milk', 'completed': False}
+
+
+def test_plan_is_written_in_one_bulk_write(repo):
+    repo.todo_lists.insert_one({'user_id': USER_ID, 'name': 'Old', 'items': []})
+    todo_lists = Recording(repo.todo_lists)
+    plan = TodoPlan(USER_ID)
+    assert plan.add({'action': 'create', 'list_name': 'Errands', 'item_text': 'milk, eggs'})
+    assert plan.add({'action': 'add_item', 'list_name': 'Errands', 'item_text': ['bread']})
+    assert plan.add({'action': 'rename', 'list_name': 'Errands', 'item_text': ' Shopping '})
+    assert plan.add({'action': 'delete', 'list_name': 'Old'})
+    assert plan.add({'action': 'delete', 'list_name': 'Missing'})
+
+    assert plan.apply(todo_lists) == 1
+    assert todo_lists.calls == ['bulk_write']
+    [saved] = repo.todo_lists.find()
+    assert saved['_id'] == plan.created[0]['_id']
+    assert saved['name'] == 'Shopping'
+    assert [item['text'] for item in saved['items']] == ['milk', 'eggs', 'bread']
+    assert plan.touched == {'Errands', 'Shopping', 'Old', 'Missing'}
+
+
+def test_incomplete_actions_are_not_planned():
+    plan = TodoPlan(USER_ID)
+    for todo_data in (
+        {'action': 'explode', 'list_name': 'Errands'},
+        {'action': 'create'},
+        {'action': 'add_item', 'list_name': 'Errands', 'item_text': ' , '},
+        {'action': 'rename', 'list_name': 'Errands', 'item_text': ''},
+        {'action': 'toggle_complete', 'list_name': 'Errands', 'item_index': 'first'},
+        {'action': 'toggle_complete', 'list_name': 'Errands', 'item_index': -1},
+    ):
+        assert not plan.add(todo_data)
+    assert plan.ops == [] and plan.apply(None) == 0
+
+
+def test_toggle_is_planned_without_a_read():
+    # mongomock cannot run the update pipeline, so check the planned write itself
+    plan = TodoPlan(USER_ID)
+    assert plan.add({'action': 'toggle_complete', 'list_name': 'Errands', 'item_index': '2'})
+    assert plan.ops == [UpdateOne({'user_id': USER_ID, 'name': 'Errands', 'items.2': {'$exists': True}},
+                                  toggle_pipeline(2))]
+    assert plan.expected == 1
+
+
+def test_reply_events_are_inserted_once_without_reading_back(app, assistant, repo):
+    assistant.events = Recording(repo.events)
+    reply = json.dumps({'output_llm': 'Booked', 'events': [
+        {'title': 'Standup', 'date': '2026-03-03', 'time': '09:00'},
+        {'title': 'Review', 'date': '2026-03-03', 'time': '15:00'},
+    ]})
+    response = assistant.handle_calendar_response(reply, 'book standup and review', USER_ID, NOW)
+
+    assert assistant.events.calls == ['insert_many']
+    saved = {str(e['_id']): e['title'] for e in repo.events.find()}
+    assert {e['_id']: e['title'] for e in response['events']} == saved
+    [interaction] = repo.llm_info.find()
+    assert str(interaction['event_id']) == response['event_data']['_id']
+    assert [str(i) for i in interaction['event_ids']] == [e['_id'] for e in response['events']]
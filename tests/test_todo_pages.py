@@ -0,0 +1,55 @@
+from bson import ObjectId
+from app.routes.main import TODO_ITEMS_MAX_LIMIT
+from tests.conftest import USER_ID
+
+
+def make_list(repo, name, items, user_id=USER_ID):
+    return str(repo.todo_lists.insert_one({'user_id': user_id, 'name': name, 'items': items}).inserted_id)
+
+
+def item(n, completed=False):
+    return {'id': f'item{n}', 'text': f'Item {n}', 'completed': completed}
+
+
+def test_summaries_carry_counts_not_items(client, repo):
+    errands = make_list(repo, 'Errands', [item(0, True), item(1), item(2, True)])
+    empty = str(repo.todo_lists.insert_one({'user_id': USER_ID, 'name': 'Empty'}).inserted_id)
+    make_list(repo, 'Theirs', [item(0)], user_id='someone-else')
+
+    summaries = client.get('/api/todo-lists/summary').get_json()
+    assert sorted(summaries, key=lambda s: s['name']) == [
+        {'_id': empty, 'name': 'Empty', 'item_count': 0, 'completed_count': 0},
+        {'_id': errands, 'name': 'Errands', 'item_count': 3, 'completed_count': 2},
+    ]
+
+
+def test_items_are_paged(client, repo):
+    list_id = make_list(repo, 'Errands', [item(n) for n in range(5)])
+
+    page = client.get(f'/api/todo-list/{list_id}/items?limit=2').get_json()
+    assert [i['id'] for i in page['items']] == ['item0', 'item1']
+    assert (page['name'], page['offset'], page['total'], page['next_offset']) == ('Errands', 0, 5, 2)
+
+    page = client.get(f'/api/todo-list/{list_id}/items?offset=4&limit=2').get_json()
+    assert [i['id'] for i in page['items']] == ['item4']
+    assert page['next_offset'] is None
+
+
+def test_legacy_items_get_ids_when_paged(client, repo):
+    list_id = make_list(repo, 'Old', [{'text': 'a', 'completed': False}, {'text': 'b', 'completed': False}])
+    page = client.get(f'/api/todo-list/{list_id}/items?offset=1').get_json()
+    assert [i['text'] for i in page['items']] == ['b']
+    stored = repo.todo_lists.find_one({'_id': ObjectId(list_id)})['items']
+    assert page['items'][0]['id'] == stored[1]['id']
+
+
+def test_bad_paging_requests(client, repo):
+    list_id = make_list(repo, 'Errands', [item(n) for n in range(TODO_ITEMS_MAX_LIMIT + 10)])
+    page = client.get(f'/api/todo-list/{list_id}/items?limit=100000').get_json()
+    assert len(page['items']) == TODO_ITEMS_MAX_LIMIT
+    assert client.get(f'/api/todo-list/{list_id}/items?limit=ten').status_code == 400
+    assert client.get(f'/api/todo-list/{list_id}/items?offset=-1').status_code == 400
+    assert client.get(f'/api/todo-list/{list_id}/items?limit=0').status_code == 400
+    assert client.get(f'/api/todo-list/{ObjectId()}/items').status_code == 404
+    theirs = make_list(repo, 'Theirs', [item(0)], user_id='someone-else')
+    assert client.get(f'/api/todo-list/{theirs}/items').status_code == 404